@@ -8,12 +8,28 @@ chmod +x build.sh
 # Install Python dependencies
 pip install -r requirements.txt
 
+# The async JSON APIs are served through uvicorn workers
+if [ "${ASYNC_API,,}" = "true" ]; then
+    pip install -r requirements-asgi.txt
+fi
+
+# The shared cache tier uses Redis when it is configured
+if [ -n "${REDIS_URL}" ]; then
+    pip install -r requirements-redis.txt
+fi
+
 # Collect static files
 python manage.py collectstatic --no-input
 
 # Run database migrations
 python manage.py migrate
 
+# Table of the database cache tier (no-op for other cache backends)
+python manage.py createcachetable
+
+# Responsive variants of images uploaded before the last deploy (no-op when up to date)
+python manage.py generate_image_variants
+
 # Create superuser if it doesn't exist
 python manage.py shell << EOF
 from django.contrib.auth import get_user_model
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Skill, Project, Experience, Education, Contact, Profile
+from .models import Skill, Project, Experience, Education, Contact, Profile, OutboxEmail
 
 
 @admin.register(Skill)
@@ -44,6 +44,15 @@ class ContactAdmin(admin.ModelAdmin):
     ordering = ['-created_date']
 
 
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'sent_date']
+    list_filter = ['status', 'created_date']
+    search_fields = ['subject', 'recipients']
+    readonly_fields = ['created_date', 'sent_date', 'last_error']
+    ordering = ['-created_date']
+
+
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ['name', 'title', 'email']
@@ -0,0 +1,165 @@
+"""
+Async versions of the read-only JSON APIs.
+
+They answer exactly like their counterparts in ``portfolio.views`` but use the
+async ORM, so under ASGI (see DEPLOYMENT.md) one worker can hold many slow
+clients without a thread each. ``portfolio.urls`` routes to them when
+``settings.ASYNC_API`` is on.
+"""
+import math
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import JsonResponse
+
+from .conditional import conditional
+from .models import Project, Skill
+from .pagination import InvalidCursor, PROJECT_ORDERING, apaginate_by_cursor
+from .search import search_project_ids
+from .serializers import (
+    InvalidFields, ProjectCardSerializer, ProjectDetailSerializer, ProjectSearchSerializer, SkillSerializer,
+)
+from .throttling import throttle
+from .views import MAX_PAGE_SIZE, _project_counters_version, invalid_fields_response
+
+PER_PAGE = 6
+
+
+@throttle('api')
+@conditional('projects', 'skills')
+async def projects_api(request):
+    """Async ``projects_api``: page numbers or ``cursor``, ``filter`` and ``fields``"""
+    try:
+        serializer = ProjectCardSerializer(request.GET.get('fields'))
+    except InvalidFields as exc:
+        return invalid_fields_response(exc)
+
+    try:
+        filter_param = request.GET.get('filter', 'all')
+        projects = Project.objects.all()
+        if filter_param != 'all':
+            matching = Project.technologies.through.objects.filter(
+                Q(skill__name__icontains=filter_param) |
+                Q(skill__category__icontains=filter_param)
+            ).values('project_id')
+            projects = projects.filter(pk__in=matching)
+
+        if 'cursor' in request.GET:
+            return await cursor_projects_response(request, projects, serializer)
+
+        # Same rules as Paginator.get_page: out of range numbers are clamped
+        page = int(request.GET.get('page', 1))
+        total_pages = max(1, math.ceil(await projects.acount() / PER_PAGE))
+        number = min(max(page, 1), total_pages)
+        offset = (number - 1) * PER_PAGE
+        rows = serializer.values(projects)[offset:offset + PER_PAGE]
+
+        return JsonResponse({
+            'success': True,
+            'projects': await serializer.aserialize(rows),
+            'has_next': number < total_pages,
+            'has_previous': number > 1,
+            'current_page': page,
+            'total_pages': total_pages
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        })
+
+
+async def cursor_projects_response(request, projects, serializer):
+    try:
+        limit = min(max(int(request.GET.get('limit', 6)), 1), MAX_PAGE_SIZE)
+        rows, next_cursor = await apaginate_by_cursor(
+            serializer.values(projects, *(field.lstrip('-') for field in PROJECT_ORDERING)),
+            request.GET['cursor'], limit)
+    except (ValueError, InvalidCursor):
+        return JsonResponse({'success': False, 'message': 'Invalid cursor or limit.'}, status=400)
+
+    data = {
+        'success': True,
+        'projects': await serializer.aserialize(rows),
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor,
+        'limit': limit,
+    }
+    if request.GET.get('count') in ('1', 'true'):
+        data['total'] = await projects.acount()
+    return JsonResponse(data)
+
+
+@throttle('api')
+@conditional('projects', 'skills', extra=_project_counters_version)
+async def project_detail_api(request, project_id):
+    """Async ``project_detail_api``"""
+    try:
+        serializer = ProjectDetailSerializer(request.GET.get('fields'))
+    except InvalidFields as exc:
+        return invalid_fields_response(exc)
+
+    try:
+        row = await serializer.values(Project.objects.all()).aget(pk=project_id)
+    except Project.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Project not found.'}, status=404)
+
+    try:
+        projects = await serializer.aserialize([row])
+        return JsonResponse(projects[0])
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        })
+
+
+@throttle('api')
+@conditional('skills')
+async def skills_api(request):
+    """Async ``skills_api``"""
+    try:
+        serializer = SkillSerializer(request.GET.get('fields'))
+    except InvalidFields as exc:
+        return invalid_fields_response(exc)
+
+    try:
+        return JsonResponse({
+            'success': True,
+            'skills': await serializer.aserialize(serializer.values(Skill.objects.all()).aiterator())
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        })
+
+
+@throttle('search')
+@conditional('projects', 'skills')
+async def search_projects(request):
+    """Async ``search_projects``; the full-text query itself runs in a thread"""
+    query = request.GET.get('q', '')
+    if not query:
+        return JsonResponse({'projects': []})
+
+    try:
+        serializer = ProjectSearchSerializer(request.GET.get('fields'))
+    except InvalidFields as exc:
+        return invalid_fields_response(exc)
+
+    try:
+        # Raw SQL against the FTS index has no async API
+        ids = await sync_to_async(search_project_ids)(query, limit=10)
+        rows = {}
+        async for row in serializer.values(Project.objects.filter(pk__in=ids), 'id'):
+            rows[row['id']] = row
+
+        return JsonResponse({'projects': await serializer.aserialize(rows[pk] for pk in ids if pk in rows)})
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        })
@@ -0,0 +1,163 @@
+"""
+In-memory typeahead index over project titles and skill names.
+
+Each worker keeps a sorted list of ``(token, kind, id)`` entries, so a prefix
+lookup is a bisect plus a scan of the matching slice and never touches the
+database. The index is built lazily on first use and patched in place from
+model signals. Edits to the indexed fields (``INDEXED_FIELDS``) bump the
+``autocomplete`` cache tag, which makes the other workers rebuild on their next
+lookup; other edits, ratings and likes leave the index alone.
+"""
+import bisect
+import heapq
+import threading
+from urllib.parse import urlencode
+
+from django.urls import reverse
+
+from .cache import bump_tags, get_tag_versions
+from .models import Project, Skill
+from .search import parse_terms
+
+TAG = 'autocomplete'
+# Fields the entries are built from; saves changing none of them are ignored.
+# Views are left out: they only nudge the rank and change on every visit.
+INDEXED_FIELDS = {
+    Project: ('title', 'featured'),
+    Skill: ('name', 'proficiency'),
+}
+
+# Typeahead traffic repeats the same prefixes, so answers are memoized until the
+# index changes; the memo is simply dropped when it grows past this size
+MEMO_SIZE = 2048
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._tokens = []
+        self._version = None
+        self._memo = {}
+
+    @property
+    def is_built(self):
+        return self._version is not None
+
+    def _tokenize(self, label):
+        return sorted(set(parse_terms(label)))
+
+    def _add(self, entry):
+        self._memo = {}
+        key = (entry['type'], entry['id'])
+        self._entries[key] = entry
+        for token in entry['tokens']:
+            bisect.insort(self._tokens, (token,) + key)
+
+    def _remove(self, kind, pk):
+        self._memo = {}
+        entry = self._entries.pop((kind, pk), None)
+        if entry is None:
+            return
+        for token in entry['tokens']:
+            position = bisect.bisect_left(self._tokens, (token, kind, pk))
+            if position < len(self._tokens) and self._tokens[position] == (token, kind, pk):
+                del self._tokens[position]
+
+    def _project_entry(self, pk, title, featured, views):
+        return {
+            'type': 'project', 'id': pk, 'label': title, 'rank': (0, not featured, -views),
+            'url': reverse('project_detail', args=[pk]), 'tokens': self._tokenize(title),
+        }
+
+    def _skill_entry(self, pk, name, proficiency):
+        return {
+            'type': 'skill', 'id': pk, 'label': name, 'rank': (1, False, -proficiency),
+            'url': f"{reverse('projects')}?{urlencode({'tech': name})}", 'tokens': self._tokenize(name),
+        }
+
+    def rebuild(self):
+        [version] = get_tag_versions([TAG])
+        with self._lock:
+            self._entries = {}
+            self._tokens = []
+            for row in Project.objects.values_list('id', 'title', 'featured', 'views').order_by():
+                self._add(self._project_entry(*row))
+            for row in Skill.objects.values_list('id', 'name', 'proficiency').order_by():
+                self._add(self._skill_entry(*row))
+            self._version = version
+
+    def _changed(self, apply):
+        """Bump the tag for the other workers and ``apply`` the edit here if our index was current."""
+        with self._lock:
+            [version] = bump_tags(TAG)
+            # A bump from another worker since our build means we missed an
+            # edit: keep the old version so the next lookup rebuilds
+            if self.is_built and self._version == version - 1:
+                apply()
+                self._version = version
+
+    def update_project(self, project):
+        def apply():
+            self._remove('project', project.pk)
+            self._add(self._project_entry(project.pk, project.title, project.featured, project.views))
+        self._changed(apply)
+
+    def update_skill(self, skill):
+        def apply():
+            self._remove('skill', skill.pk)
+            self._add(self._skill_entry(skill.pk, skill.name, skill.proficiency))
+        self._changed(apply)
+
+    def remove(self, kind, pk):
+        self._changed(lambda: self._remove(kind, pk))
+
+    def suggest(self, query, limit=8):
+        """
+        Return up to ``limit`` suggestions whose words start with the query's words.
+
+        Labels starting with the whole query come first, then projects by
+        featured flag and views, then skills by proficiency.
+        """
+        terms = parse_terms(query)
+        if not terms:
+            return []
+        if get_tag_versions([TAG])[0] != self._version:
+            self.rebuild()
+        memo_key = (' '.join(terms), query.strip().lower(), limit)
+        with self._lock:
+            suggestions = self._memo.get(memo_key)
+            if suggestions is None:
+                suggestions = self._search(terms, memo_key[1], limit)
+                if len(self._memo) >= MEMO_SIZE:
+                    self._memo = {}
+                self._memo[memo_key] = suggestions
+        return [dict(suggestion) for suggestion in suggestions]
+
+    def _search(self, terms, needle, limit):
+        # Scan the slice for the longest term, then check the others per entry
+        anchor = max(terms, key=len)
+        others = list(terms)
+        others.remove(anchor)
+        position = bisect.bisect_left(self._tokens, (anchor,))
+        keys = set()
+        while position < len(self._tokens) and self._tokens[position][0].startswith(anchor):
+            keys.add(self._tokens[position][1:])
+            position += 1
+        candidates = []
+        for key in keys:
+            entry = self._entries[key]
+            if all(any(token.startswith(term) for token in entry['tokens']) for term in others):
+                candidates.append(entry)
+        best = heapq.nsmallest(limit, candidates, key=lambda entry: (
+            not entry['label'].lower().startswith(needle),
+            entry['rank'],
+            entry['label'].lower(),
+        ))
+        return [
+            {'type': entry['type'], 'id': entry['id'], 'label': entry['label'], 'url': entry['url']}
+            for entry in best
+        ]
+
+
+index = AutocompleteIndex()
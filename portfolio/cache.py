@@ -0,0 +1,180 @@
+"""
+Tag-based caching for page contexts, safe against stampedes.
+
+Every cached value records the current version of each tag it depends on
+(``projects``, ``skills``, ``profile``...). Bumping a tag makes the values
+built under the old version out of date. Tags are bumped from model signals,
+see ``portfolio.signals``.
+
+``get_or_compute`` makes sure that when a value expires under load one caller
+rebuilds it while the others carry on:
+
+* The caller that takes a short lock in the cache (``add``) rebuilds the
+  value. The others serve the expired value, which is kept for as long again
+  as its timeout (stale-while-revalidate). The lock holds a token of its
+  owner, so a rebuild outlasting ``LOCK_TIMEOUT`` does not release the lock
+  another caller has taken since.
+* Values out of date because a tag was bumped are never served: the others
+  wait for the rebuilt value instead, up to ``LOCK_WAIT`` seconds.
+* Shortly before expiry a caller may rebuild early, with a probability growing
+  as expiry nears and with the time the last build took ("XFetch", Vattani et
+  al., "Optimal Probabilistic Cache Stampede Prevention"). Popular values are
+  thus usually rebuilt before anyone sees them expire.
+
+The database therefore sees one rebuild per key and expiry, not one per worker.
+"""
+import hashlib
+import logging
+import math
+import random
+import time
+import uuid
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+TAG_PREFIX = 'portfolio:tag:'
+KEY_PREFIX = 'portfolio:ctx:'
+LOCK_PREFIX = 'portfolio:lock:'
+DEFAULT_TIMEOUT = 60 * 15
+# Longest a rebuild may take before another caller may start one
+LOCK_TIMEOUT = 30
+# How long callers without a usable value wait for someone else's rebuild
+LOCK_WAIT = 5
+LOCK_POLL_INTERVAL = 0.05
+# XFetch eagerness: above 1 refreshes earlier, 0 never early
+BETA = 1.0
+
+_MISSING = object()
+
+
+def _tag_key(tag):
+    return f'{TAG_PREFIX}{tag}'
+
+
+def _initial_version():
+    # Seed from the clock so a tag that was evicted never reuses an old version
+    return int(time.time() * 1000)
+
+
+def get_tag_versions(tags):
+    """Return the current version of each tag, in order, creating missing ones."""
+    keys = [_tag_key(tag) for tag in tags]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = _initial_version()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions.append(version)
+    return versions
+
+
+def bump_tags(*tags):
+    """Invalidate every cached value that depends on any of ``tags``; return their new versions."""
+    versions = []
+    for tag in tags:
+        key = _tag_key(tag)
+        try:
+            version = cache.incr(key)
+        except ValueError:
+            version = _initial_version()
+            if not cache.add(key, version, None):
+                version = cache.incr(key)
+        versions.append(version)
+    return versions
+
+
+def _parts_key(name, parts):
+    key = f'{KEY_PREFIX}{name}'
+    if parts:
+        # Parts may come from the query string, so keep keys short and safe
+        key = f'{key}:{hashlib.md5(repr(parts).encode("utf-8")).hexdigest()}'
+    return key
+
+
+def _should_refresh(expires, delta, beta, now):
+    if now >= expires:
+        return True
+    # -log(random()) is exponentially distributed: usually small, now and then large
+    return beta > 0 and now - delta * beta * math.log(1 - random.random()) >= expires
+
+
+def _store(key, builder, versions, timeout):
+    started = time.monotonic()
+    value = builder()
+    delta = time.monotonic() - started
+    if timeout is None:
+        cache.set(key, (value, versions, math.inf, delta), None)
+    else:
+        # Kept as long again so it can be served while being rebuilt
+        cache.set(key, (value, versions, time.time() + timeout, delta), timeout * 2)
+    return value
+
+
+def _current(entry, versions):
+    return entry is not None and entry[1] == versions
+
+
+def _wait_for(key, versions):
+    """Poll for the value another caller is building; ``None`` if it does not come."""
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if _current(entry, versions):
+            return entry
+        if not cache.has_key(LOCK_PREFIX + key):
+            # Released: stored just now, or the rebuild failed
+            entry = cache.get(key)
+            return entry if _current(entry, versions) else None
+    return None
+
+
+def get_or_compute(key, builder, timeout=DEFAULT_TIMEOUT, tags=(), beta=BETA):
+    """
+    Return the value cached under ``key``, calling ``builder`` to (re)build it.
+
+    The value is current while no tag of ``tags`` was bumped and ``timeout``
+    seconds have not passed. See the module docstring for how concurrent
+    callers share a single rebuild. ``builder`` must return a picklable value
+    with all querysets evaluated, otherwise the cache would only store the
+    unevaluated query.
+    """
+    versions = tuple(get_tag_versions(tags)) if tags else ()
+    entry = cache.get(key)
+    usable = _current(entry, versions)
+    if usable and not _should_refresh(entry[2], entry[3], beta, time.time()):
+        return entry[0]
+
+    lock_key = LOCK_PREFIX + key
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, LOCK_TIMEOUT):
+        if usable:
+            # Someone is rebuilding it: serve the value we have meanwhile
+            return entry[0]
+        entry = _wait_for(key, versions)
+        if entry is not None:
+            return entry[0]
+        # Nobody delivered in time; build it without waiting any longer
+        return _store(key, builder, versions, timeout)
+    try:
+        return _store(key, builder, versions, timeout)
+    except Exception:
+        if not usable:
+            raise
+        logger.exception('Serving the expired value of %s, rebuilding it failed', key)
+        return entry[0]
+    finally:
+        # Not atomic: the lock may still expire and change hands between the
+        # get and the delete, a window of one round trip
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def cached(name, tags, builder, *parts, timeout=DEFAULT_TIMEOUT):
+    """Return the value cached for ``name``/``parts`` and ``tags``, building it on a miss."""
+    return get_or_compute(_parts_key(name, parts), builder, timeout, tags)
@@ -0,0 +1,684 @@
+"""
+Cache backends for running several worker processes.
+
+``TwoTierCache`` puts a small in-process LRU (L1) in front of a shared cache
+(L2). ``LocMemCache`` gives every gunicorn worker its own cache: each one warms up
+separately, and a tag bumped in one worker is never seen by the others. A
+shared backend (database, files, Redis) fixes that, but costs a round trip and
+an unpickle on every read, and pages read the same few keys (tag versions,
+card fragments, whole pages) on every request.
+
+``TwoTierCache`` keeps recently read values in the worker and checks them
+against version stamps held in L2. Keys are spread over ``BUCKETS`` buckets;
+every write to a key (``set``, ``add``, ``delete``, ``incr``, ``touch``...)
+bumps the stamp of its bucket in L2. An L1 entry remembers the stamp it was
+read under and is only served while the stamp is unchanged. A worker fetches
+all stamps in one ``get_many`` at most every ``STAMP_INTERVAL`` seconds, so a
+hit is a dictionary lookup and a write elsewhere is seen within that interval.
+A write only drops the writer's own L1 copy, so it sees its own writes at once
+and never keeps its value after a concurrent writer's one has reached L2.
+
+L1 holds values read from L2 without knowing their L2 expiry, so it keeps them
+for ``L1_TIMEOUT`` seconds at most: a key that expires in L2 sooner (a short
+timeout set by another worker) is served at most that much longer.
+
+Counters and locks (``L1_BYPASS`` key prefixes) are read and written in L2
+only: they change on nearly every request and must never be read stale.
+
+Stamps, tag versions, counters and throttles rely on an atomic ``incr`` that
+keeps the key's expiry. Django's database and file backends emulate it with a
+``get`` and a ``set``, which loses concurrent increments and gives the key the
+default timeout; use ``DatabaseCache`` and ``FileBasedCache`` from this module
+for L2 instead.
+
+Configuration, with L2 as its own alias::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'portfolio.cache_backends.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {'L1_MAX_ENTRIES': 1000, 'L1_TIMEOUT': 10, 'STAMP_INTERVAL': 1},
+        },
+        'shared': {'BACKEND': 'portfolio.cache_backends.DatabaseCache', 'LOCATION': 'portfolio_cache'},
+    }
+
+``MmapCache`` is shared by the processes of one host through a memory-mapped
+file, for several workers on one box without Redis. Every process mapping the
+file reads and writes the same cache, with no copy per worker as with
+``LocMemCache`` and no SQL round trip as with ``DatabaseCache``.
+
+The file is a fixed-size hash table, so memory use is bounded by
+``MAX_ENTRIES`` x ``SLOT_SIZE``. It is set-associative: a key hashes to a set
+of ``WAYS`` slots and lives in one of them. A set is locked while it is read
+or written, with a ``threading.Lock`` within the process and an ``fcntl``
+byte-range lock on the set between processes. When a set is full the least
+recently used entry of the set is evicted, preferring expired ones.
+
+A slot holds the key hash, expiry, last access time, the key and the pickled
+value (compressed with zlib when that helps). Values that still do not fit in
+a slot are not stored: ``set`` leaves the key absent, ``add`` returns
+``False`` and ``set_many`` reports the key as failed.
+
+Changing the geometry (``MAX_ENTRIES``, ``SLOT_SIZE``, ``WAYS``) empties the
+cache the next time the file is opened: an empty file is renamed over the old
+one, which processes still mapping it keep using until they restart (shrinking
+a mapped file would crash them with ``SIGBUS``).
+
+``MmapCache`` needs a POSIX system (``fcntl`` locks, ``MAP_SHARED``,
+``pread``/``pwrite``).
+"""
+import base64
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends import db, filebased
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import locks
+from django.core.files.move import file_move_safe
+from django.db import connections, router
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: MmapCache is unavailable
+    fcntl = None
+
+STAMP_PREFIX = 'portfolio:l1stamp:'
+# Returned as they are from L1; anything else is pickled so callers cannot
+# mutate the cached copy
+_IMMUTABLE = (int, float, str, bytes, bool, type(None))
+
+
+class _Tier:
+    """L1 state shared by the threads of a process (``caches`` holds one backend per thread)."""
+
+    def __init__(self, buckets):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.stamps = [None] * buckets
+        self.checked = float('-inf')
+
+
+_tiers = {}
+_tiers_guard = threading.Lock()
+
+
+def _freeze(value):
+    if type(value) in _IMMUTABLE:
+        return False, value
+    return True, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _thaw(pickled, value):
+    return pickle.loads(value) if pickled else value
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 10))
+        self._stamp_interval = float(options.get('STAMP_INTERVAL', 1))
+        self._buckets = int(options.get('BUCKETS', 64))
+        self._bypass = tuple(options.get('L1_BYPASS', ()))
+        with _tiers_guard:
+            self._tier = _tiers.setdefault(location, _Tier(self._buckets))
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # L1 bookkeeping
+
+    def _local_key(self, key, version):
+        local_key = self.make_and_validate_key(key, version=version)
+        return local_key, zlib.crc32(local_key.encode('utf-8')) % self._buckets
+
+    def _bypassed(self, key):
+        return key.startswith(self._bypass) if self._bypass else False
+
+    def _stamp_key(self, bucket):
+        return f'{STAMP_PREFIX}{bucket}'
+
+    def _current_stamps(self):
+        tier = self._tier
+        now = time.monotonic()
+        if now - tier.checked < self._stamp_interval:
+            return tier.stamps
+        keys = [self._stamp_key(bucket) for bucket in range(self._buckets)]
+        found = self.l2.get_many(keys)
+        stamps = []
+        for key in keys:
+            stamp = found.get(key)
+            if stamp is None:
+                # Seeded from the clock so a stamp lost to eviction or clear()
+                # never matches the entries read under the old one
+                stamp = time.time_ns()
+                if not self.l2.add(key, stamp, None):
+                    stamp = self.l2.get(key, stamp)
+            stamps.append(stamp)
+        with tier.lock:
+            tier.stamps, tier.checked = stamps, now
+        return stamps
+
+    def _bump(self, buckets):
+        """Bump the stamps of ``buckets`` in L2 and adopt the new ones locally."""
+        new = {}
+        for bucket in buckets:
+            key = self._stamp_key(bucket)
+            try:
+                new[bucket] = self.l2.incr(key)
+            except ValueError:
+                new[bucket] = time.time_ns()
+                if not self.l2.add(key, new[bucket], None):
+                    new[bucket] = self.l2.incr(key)
+        with self._tier.lock:
+            for bucket, stamp in new.items():
+                self._tier.stamps[bucket] = stamp
+
+    def _lookup(self, local_key, bucket):
+        stamps = self._current_stamps()
+        tier = self._tier
+        with tier.lock:
+            entry = tier.entries.get(local_key)
+            if entry is None:
+                return False, None
+            stamp, expires, pickled, value = entry
+            if stamp != stamps[bucket] or expires <= time.monotonic():
+                del tier.entries[local_key]
+                return False, None
+            tier.entries.move_to_end(local_key)
+        return True, _thaw(pickled, value)
+
+    def _remember(self, local_key, bucket, value, stamp):
+        """Keep ``value`` read from L2 under ``stamp`` for at most ``L1_TIMEOUT`` seconds."""
+        entry = (stamp, time.monotonic() + self._l1_timeout, *_freeze(value))
+        tier = self._tier
+        with tier.lock:
+            tier.entries[local_key] = entry
+            tier.entries.move_to_end(local_key)
+            while len(tier.entries) > self._max_entries:
+                tier.entries.popitem(last=False)
+
+    def _forget(self, local_key):
+        with self._tier.lock:
+            self._tier.entries.pop(local_key, None)
+
+    def _written(self, keys):
+        """Record writes of ``(local_key, bucket)`` pairs.
+
+        The local copies are dropped rather than replaced: another worker may
+        have written L2 between our write and our bump, and the next read
+        fetches whichever value won.
+        """
+        keys = list(keys)
+        self._bump({bucket for _, bucket in keys})
+        for local_key, _ in keys:
+            self._forget(local_key)
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        if self._bypassed(key):
+            return self.l2.get(key, default, version=version)
+        local_key, bucket = self._local_key(key, version)
+        # Read the stamp before L2, so a write racing with us leaves a stale stamp
+        stamp = self._current_stamps()[bucket]
+        found, value = self._lookup(local_key, bucket)
+        if found:
+            return value
+        value = self.l2.get(key, self._missing_key, version=version)
+        if value is self._missing_key:
+            return default
+        self._remember(local_key, bucket, value, stamp)
+        return value
+
+    def get_many(self, keys, version=None):
+        result, missing = {}, {}
+        for key in keys:
+            if self._bypassed(key):
+                missing[key] = None
+                continue
+            local_key, bucket = self._local_key(key, version)
+            found, value = self._lookup(local_key, bucket)
+            if found:
+                result[key] = value
+            else:
+                missing[key] = (local_key, bucket)
+        if missing:
+            stamps = list(self._current_stamps())
+            for key, value in self.l2.get_many(list(missing), version=version).items():
+                result[key] = value
+                if missing[key] is not None:
+                    local_key, bucket = missing[key]
+                    self._remember(local_key, bucket, value, stamps[bucket])
+        return result
+
+    def has_key(self, key, version=None):
+        if not self._bypassed(key) and self._lookup(*self._local_key(key, version))[0]:
+            return True
+        return self.l2.has_key(key, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, self._l2_timeout(timeout), version=version)
+        if not self._bypassed(key):
+            self._written([self._local_key(key, version)])
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, self._l2_timeout(timeout), version=version)
+        if added and not self._bypassed(key):
+            self._written([self._local_key(key, version)])
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.l2.touch(key, self._l2_timeout(timeout), version=version)
+        if not self._bypassed(key):
+            self._written([self._local_key(key, version)])
+        return touched
+
+    def delete(self, key, version=None):
+        deleted = self.l2.delete(key, version=version)
+        if not self._bypassed(key):
+            self._written([self._local_key(key, version)])
+        return deleted
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        if not self._bypassed(key):
+            self._written([self._local_key(key, version)])
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, self._l2_timeout(timeout), version=version)
+        self._written([self._local_key(key, version) for key in data if not self._bypassed(key)])
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(keys, version=version)
+        self._written([self._local_key(key, version) for key in keys if not self._bypassed(key)])
+
+    def clear(self):
+        self.l2.clear()
+        with self._tier.lock:
+            self._tier.entries.clear()
+            self._tier.checked = float('-inf')
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+    def _l2_timeout(self, timeout):
+        # Our own default applies, not the L2 alias' one
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    async def aget_many(self, keys, version=None):
+        # BaseCache awaits aget() once per key
+        return await sync_to_async(self.get_many, thread_sensitive=True)(keys, version)
+
+    # BaseCache builds these from get() and set(), which is neither atomic nor
+    # keeps the expiry
+    async def aincr(self, key, delta=1, version=None):
+        return await sync_to_async(self.incr, thread_sensitive=True)(key, delta, version)
+
+    async def adecr(self, key, delta=1, version=None):
+        return await sync_to_async(self.decr, thread_sensitive=True)(key, delta, version)
+
+
+class DatabaseCache(db.DatabaseCache):
+    """Django's ``DatabaseCache`` with an atomic ``incr`` that keeps the expiry."""
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = connections[router.db_for_write(self.cache_model_class)]
+        quote_name = connection.ops.quote_name
+        table, key_column, value_column = quote_name(self._table), quote_name('cache_key'), quote_name('value')
+        select = f'SELECT {value_column} FROM {table} WHERE {key_column} = %s AND {quote_name("expires")} > %s'
+        # Compare-and-set: only the writer that read the current value wins
+        update = f'UPDATE {table} SET {value_column} = %s WHERE {key_column} = %s AND {value_column} = %s'
+        with connection.cursor() as cursor:
+            while True:
+                now = timezone.now().replace(microsecond=0, tzinfo=None)
+                cursor.execute(select, [key, connection.ops.adapt_datetimefield_value(now)])
+                row = cursor.fetchone()
+                if row is None:
+                    raise ValueError(f"Key '{key}' not found")
+                current = connection.ops.process_clob(row[0])
+                value = pickle.loads(base64.b64decode(current.encode())) + delta
+                encoded = base64.b64encode(pickle.dumps(value, self.pickle_protocol)).decode('latin1')
+                cursor.execute(update, [encoded, key, current])
+                if cursor.rowcount:
+                    return value
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """Django's ``FileBasedCache`` with an atomic ``incr`` that keeps the expiry."""
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        while True:
+            try:
+                with open(fname, 'rb') as f:
+                    locks.lock(f, locks.LOCK_EX)
+                    try:
+                        if os.fstat(f.fileno()).st_ino != os.stat(fname).st_ino:
+                            # Replaced while we waited for the lock
+                            continue
+                        expiry = pickle.load(f)
+                        if expiry is not None and expiry < time.time():
+                            break
+                        value = pickle.loads(zlib.decompress(f.read())) + delta
+                        self._replace(fname, expiry, value)
+                        return value
+                    finally:
+                        locks.unlock(f)
+            except (FileNotFoundError, EOFError):
+                break
+        raise ValueError(f"Key '{key}' not found")
+
+    def _replace(self, fname, expiry, value):
+        # A new file renamed into place, so readers never see a partial write
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        renamed = False
+        try:
+            with open(fd, 'wb') as f:
+                f.write(pickle.dumps(expiry, self.pickle_protocol))
+                f.write(zlib.compress(pickle.dumps(value, self.pickle_protocol)))
+            file_move_safe(tmp_path, fname, allow_overwrite=True)
+            renamed = True
+        finally:
+            if not renamed:
+                os.remove(tmp_path)
+
+
+MAGIC = b'PFMC'
+FORMAT_VERSION = 1
+# magic, format version, sets, ways, slot size
+FILE_HEADER = struct.Struct('<4sIIII')
+HEADER_SIZE = 4096
+# key hash (0 = empty), expiry (inf = never), last access, key length, value length, flags
+SLOT_HEADER = struct.Struct('<QddIIB')
+COMPRESSED = 1
+# Smaller pickles are not worth compressing
+COMPRESS_MIN = 1024
+
+
+class _Table:
+    """One mapping of the file per process, shared by its threads."""
+
+    def __init__(self, path, sets, ways, slot_size):
+        self.path, self.sets, self.ways, self.slot_size = path, sets, ways, slot_size
+        self.set_size = ways * slot_size
+        self.size = HEADER_SIZE + sets * self.set_size
+        self.pid = os.getpid()
+        self.locks = [threading.Lock() for _ in range(sets)]
+        self.fd = self._open()
+        try:
+            self.map = mmap.mmap(self.fd, self.size, mmap.MAP_SHARED)
+        except BaseException:
+            os.close(self.fd)
+            raise
+
+    def _open(self):
+        """Descriptor of the file, created or replaced when its geometry differs."""
+        expected = FILE_HEADER.pack(MAGIC, FORMAT_VERSION, self.sets, self.ways, self.slot_size)
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX)
+                if os.fstat(fd).st_ino != os.stat(self.path).st_ino:
+                    # Replaced by another process while we waited for the lock
+                    os.close(fd)
+                    continue
+                if os.pread(fd, FILE_HEADER.size, 0) == expected and os.fstat(fd).st_size == self.size:
+                    fcntl.lockf(fd, fcntl.LOCK_UN)
+                    return fd
+                self._replace(expected)
+            except BaseException:
+                os.close(fd)
+                raise
+            # Unlocks the old file: processes waiting on it retry on the new one
+            os.close(fd)
+
+    def _replace(self, header):
+        # Never truncate the file in place: other processes may have it mapped
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+        try:
+            # Sparse: pages are only allocated once written
+            os.ftruncate(fd, self.size)
+            os.pwrite(fd, header, 0)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def locked(self, index):
+        offset = HEADER_SIZE + index * self.set_size
+        with self.locks[index]:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.set_size, offset)
+            try:
+                yield offset
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, self.set_size, offset)
+
+
+_tables = {}
+_tables_guard = threading.Lock()
+
+
+def _key_hash(key):
+    digest = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+    return digest or 1
+
+
+def _encode(value):
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) >= COMPRESS_MIN:
+        compressed = zlib.compress(data, 1)
+        if len(compressed) < len(data):
+            return compressed, COMPRESSED
+    return data, 0
+
+
+def _decode(data, flags):
+    if flags & COMPRESSED:
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+
+class MmapCache(BaseCache):
+    def __init__(self, location, params):
+        if fcntl is None:
+            raise ImproperlyConfigured('MmapCache needs fcntl locks and MAP_SHARED mappings (POSIX only).')
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._ways = int(options.get('WAYS', 8))
+        self._slot_size = int(options.get('SLOT_SIZE', 16 * 1024))
+        self._sets = max(1, int(options.get('MAX_ENTRIES', 8192)) // self._ways)
+
+    @property
+    def _table(self):
+        table = _tables.get(self._path)
+        # A forked worker must not share the parent's locks
+        if table is None or table.pid != os.getpid():
+            with _tables_guard:
+                table = _tables.get(self._path)
+                if table is None or table.pid != os.getpid():
+                    table = _tables[self._path] = _Table(self._path, self._sets, self._ways, self._slot_size)
+        return table
+
+    # Slots
+
+    def _locate(self, key, version):
+        key = self.make_and_validate_key(key, version=version).encode('utf-8')
+        key_hash = _key_hash(key)
+        return key, key_hash, key_hash % self._sets
+
+    def _slots(self, offset):
+        return range(offset, offset + self._ways * self._slot_size, self._slot_size)
+
+    def _find(self, table, offset, key, key_hash):
+        """Offset of the live slot holding ``key``, or ``None``; clears it if expired."""
+        for slot in self._slots(offset):
+            slot_hash, expires, _, key_len, _, _ = SLOT_HEADER.unpack_from(table.map, slot)
+            if slot_hash != key_hash:
+                continue
+            start = slot + SLOT_HEADER.size
+            if table.map[start:start + key_len] != key:
+                continue
+            if expires <= time.time():
+                self._clear_slot(table, slot)
+                return None
+            return slot
+        return None
+
+    def _read(self, table, slot):
+        _, _, _, key_len, value_len, flags = SLOT_HEADER.unpack_from(table.map, slot)
+        start = slot + SLOT_HEADER.size + key_len
+        return _decode(table.map[start:start + value_len], flags)
+
+    def _touch_access(self, table, slot):
+        # Last access is the third field, after the hash and the expiry
+        struct.pack_into('<d', table.map, slot + 16, time.time())
+
+    def _victim(self, table, offset):
+        """Empty or expired slot if any, else the least recently used one."""
+        now = time.time()
+        victim, oldest = None, None
+        for slot in self._slots(offset):
+            slot_hash, expires, accessed, _, _, _ = SLOT_HEADER.unpack_from(table.map, slot)
+            if not slot_hash or expires <= now:
+                return slot
+            if oldest is None or accessed < oldest:
+                victim, oldest = slot, accessed
+        return victim
+
+    def _write(self, table, offset, key, key_hash, value, expires, slot=None):
+        """Store ``value`` in the set at ``offset``; ``False`` when it does not fit a slot."""
+        data, flags = _encode(value)
+        if SLOT_HEADER.size + len(key) + len(data) > self._slot_size:
+            if slot is not None:
+                self._clear_slot(table, slot)
+            return False
+        if slot is None:
+            slot = self._victim(table, offset)
+        # Invalidate first: a crashed writer leaves an empty slot, not a torn entry
+        self._clear_slot(table, slot)
+        start = slot + SLOT_HEADER.size
+        table.map[start:start + len(key)] = key
+        table.map[start + len(key):start + len(key) + len(data)] = data
+        SLOT_HEADER.pack_into(table.map, slot, key_hash, expires, time.time(), len(key), len(data), flags)
+        return True
+
+    def _clear_slot(self, table, slot):
+        struct.pack_into('<Q', table.map, slot, 0)
+
+    def _expiry(self, timeout):
+        expiry = self.get_backend_timeout(timeout)
+        return float('inf') if expiry is None else expiry
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        key, key_hash, index = self._locate(key, version)
+        table = self._table
+        with table.locked(index) as offset:
+            slot = self._find(table, offset, key, key_hash)
+            if slot is None:
+                return default
+            self._touch_access(table, slot)
+            return self._read(table, slot)
+
+    def has_key(self, key, version=None):
+        key, key_hash, index = self._locate(key, version)
+        table = self._table
+        with table.locked(index) as offset:
+            return self._find(table, offset, key, key_hash) is not None
+
+    def _store(self, key, value, timeout, version, only_new=False):
+        key, key_hash, index = self._locate(key, version)
+        expires = self._expiry(timeout)
+        table = self._table
+        with table.locked(index) as offset:
+            slot = self._find(table, offset, key, key_hash)
+            if slot is not None and only_new:
+                return False
+            if expires <= time.time():
+                # A timeout of 0 or less removes the key
+                if slot is not None:
+                    self._clear_slot(table, slot)
+                return not only_new
+            return self._write(table, offset, key, key_hash, value, expires, slot)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store(key, value, timeout, version, only_new=True)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return [key for key, value in data.items() if not self._store(key, value, timeout, version)]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key, key_hash, index = self._locate(key, version)
+        table = self._table
+        with table.locked(index) as offset:
+            slot = self._find(table, offset, key, key_hash)
+            if slot is None:
+                return False
+            struct.pack_into('<d', table.map, slot + 8, self._expiry(timeout))
+            return True
+
+    def delete(self, key, version=None):
+        key, key_hash, index = self._locate(key, version)
+        table = self._table
+        with table.locked(index) as offset:
+            slot = self._find(table, offset, key, key_hash)
+            if slot is None:
+                return False
+            self._clear_slot(table, slot)
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key, key_hash, index = self._locate(key, version)
+        table = self._table
+        with table.locked(index) as offset:
+            slot = self._find(table, offset, key, key_hash)
+            if slot is None:
+                raise ValueError(f"Key '{key.decode()}' not found")
+            value = self._read(table, slot) + delta
+            expires = SLOT_HEADER.unpack_from(table.map, slot)[1]
+            if not self._write(table, offset, key, key_hash, value, expires, slot):
+                raise ValueError(f"Key '{key.decode()}' no longer fits a slot")
+            return value
+
+    def clear(self):
+        table = self._table
+        for index in range(self._sets):
+            with table.locked(index) as offset:
+                for slot in self._slots(offset):
+                    self._clear_slot(table, slot)
+
+    def close(self, **kwargs):
+        # Called after every request; the mapping lives as long as the process
+        pass
@@ -0,0 +1,54 @@
+"""
+Conditional GET (ETag / 304) for pages and JSON APIs.
+
+A resource's ETag is derived from the current versions of the cache tags it
+depends on (bumped by ``portfolio.signals``) and the request path and query
+string. Validating a request therefore costs one cache lookup and never runs
+the query the view would run; on a match Django's ``condition`` decorator
+answers 304 before the view is called.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.views.decorators.http import condition
+
+from .cache import get_tag_versions
+
+
+def resource_etag(*tags, extra=None):
+    """
+    Build an ``etag_func`` for views depending on ``tags``.
+
+    ``extra(request, *args, **kwargs)`` may contribute more state that is not
+    covered by the tags. Requests carrying flash messages get no ETag, since
+    the page they render is a one-off.
+    """
+    def etag_func(request, *args, **kwargs):
+        if len(messages.get_messages(request)):
+            return None
+        parts = [request.get_full_path(), get_tag_versions(tags)]
+        if extra is not None:
+            parts.append(extra(request, *args, **kwargs))
+        return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return etag_func
+
+
+def conditional(*tags, extra=None):
+    """Decorator answering 304 when the client's ETag for ``tags`` is current."""
+    etag_func = resource_etag(*tags, extra=extra)
+
+    def decorator(view):
+        if not iscoroutinefunction(view):
+            return condition(etag_func=etag_func)(view)
+        # ``condition`` calls etag_func on the event loop, where a database
+        # cache backend may not run; compute the ETag in a thread beforehand
+        checked = condition(etag_func=lambda request, *args, **kwargs: request.resource_etag)(view)
+
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            request.resource_etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+            return await checked(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,193 @@
+"""
+Write-behind counters for ``Project.views``, ``likes`` and ``bookmarks``.
+
+Increments land in the cache with ``incr`` instead of touching the project
+row, so a page view never takes a row lock. Pending deltas are applied in
+batches with ``F()`` expressions, either opportunistically from the web
+process every ``COUNTER_FLUSH_INTERVAL`` seconds or by the ``flush_counters``
+management command (which needs a cache shared between processes). Readers
+add the pending delta to the stored value so numbers stay current between
+flushes.
+
+Rows with pending deltas are tracked in a journal: the first increment after
+a flush sets a dirty flag and records ``(field, pk)`` under the next sequence
+number, so a flush only reads the journal entries written since the last one.
+The sequence number is taken before its entry is written; a flush finding no
+entry for a number stops there and waits up to ``JOURNAL_WAIT`` seconds for the
+writer to catch up, so the delta is not skipped.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Project
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('views', 'likes', 'bookmarks')
+PREFIX = 'portfolio:counter:'
+SEQ_KEY = f'{PREFIX}seq'
+FLUSHED_KEY = f'{PREFIX}flushed'
+LOCK_KEY = f'{PREFIX}lock'
+# Keep pending deltas around for a week in case flushing stalls
+TIMEOUT = 60 * 60 * 24 * 7
+# Dirty flags expire much sooner, so a journal entry lost to eviction (or to a
+# writer dying before writing it) only delays that row until its next increment
+DIRTY_TIMEOUT = 60 * 10
+# How long a flush waits for the journal entry of a taken sequence number
+JOURNAL_WAIT = 60
+
+_last_flush = time.monotonic()
+
+
+def _delta_key(field, pk):
+    return f'{PREFIX}{field}:{pk}'
+
+
+def _dirty_key(field, pk):
+    return f'{PREFIX}dirty:{field}:{pk}'
+
+
+def _journal_key(seq):
+    return f'{PREFIX}journal:{seq}'
+
+
+def _gap_key(seq):
+    return f'{PREFIX}gap:{seq}'
+
+
+def _incr(key, delta, timeout=TIMEOUT):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout):
+            return delta
+        return cache.incr(key, delta)
+
+
+def increment(pk, field='views', delta=1):
+    """Record ``delta`` more ``field`` for project ``pk`` without writing to the database."""
+    if field not in FIELDS:
+        raise ValueError(f'Unknown counter {field!r}')
+    _incr(_delta_key(field, pk), delta)
+    if cache.add(_dirty_key(field, pk), 1, DIRTY_TIMEOUT):
+        seq = _incr(SEQ_KEY, 1, None)
+        cache.set(_journal_key(seq), (field, pk), TIMEOUT)
+    maybe_flush()
+
+
+def pending(pks):
+    """Return ``{pk: {field: delta}}`` of deltas not yet written for ``pks``."""
+    keys = {_delta_key(field, pk): (pk, field) for pk in pks for field in FIELDS}
+    result = {pk: dict.fromkeys(FIELDS, 0) for pk in pks}
+    for key, value in cache.get_many(keys).items():
+        pk, field = keys[key]
+        result[pk][field] = value
+    return result
+
+
+def current_counts(project):
+    """Stored counters of ``project`` plus whatever is still pending."""
+    deltas = pending([project.pk])[project.pk]
+    return {field: getattr(project, field) + deltas[field] for field in FIELDS}
+
+
+def _take(entries):
+    """Claim the pending deltas of ``entries``, leaving later increments in place."""
+    # Clear the dirty flags first: an increment racing with us re-journals itself
+    cache.delete_many([_dirty_key(field, pk) for field, pk in entries])
+    keys = {_delta_key(field, pk): (field, pk) for field, pk in entries}
+    taken = {}
+    for key, value in cache.get_many(keys).items():
+        if value:
+            cache.decr(key, value)
+            taken[keys[key]] = value
+    return taken
+
+
+def _unwritten(seqs, found):
+    """First of ``seqs`` whose journal entry may still be on its way, or ``None``."""
+    now = time.time()
+    for seq in seqs:
+        if _journal_key(seq) in found:
+            continue
+        # Remember when the gap was first seen; past JOURNAL_WAIT it is given up
+        cache.add(_gap_key(seq), now, TIMEOUT)
+        if now - cache.get(_gap_key(seq), now) < JOURNAL_WAIT:
+            return seq
+    return None
+
+
+def _apply(taken):
+    by_field = {}
+    for (field, pk), delta in taken.items():
+        by_field.setdefault(field, {})[pk] = delta
+    with transaction.atomic():
+        for field, deltas in by_field.items():
+            # One UPDATE per field and batch, whatever the number of rows
+            Project.objects.filter(pk__in=deltas).update(**{field: F(field) + Case(
+                *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )})
+
+
+def flush(batch_size=500):
+    """Write all pending deltas to the database; return the number of counters written."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    last = cache.get(FLUSHED_KEY, 0)
+    current = cache.get(SEQ_KEY, 0)
+    if current < last:
+        # The sequence was evicted and restarted
+        last = 0
+    touched = 0
+    for start in range(last + 1, current + 1, batch_size):
+        seqs = range(start, min(start + batch_size, current + 1))
+        found = cache.get_many([_journal_key(seq) for seq in seqs])
+        waiting = _unwritten(seqs, found)
+        if waiting is not None:
+            # Flush up to the gap; the next flush resumes from there
+            seqs = range(start, waiting)
+            if not seqs:
+                break
+        journal_keys = [_journal_key(seq) for seq in seqs]
+        taken = _take({found[key] for key in journal_keys if key in found})
+        try:
+            _apply(taken)
+        except Exception:
+            # Put the deltas back so the next flush retries them
+            for (field, pk), delta in taken.items():
+                increment(pk, field, delta)
+            raise
+        cache.delete_many(journal_keys + [_gap_key(seq) for seq in seqs])
+        cache.set(FLUSHED_KEY, seqs[-1], None)
+        touched += len(taken)
+        if waiting is not None:
+            break
+    return touched
+
+
+def maybe_flush():
+    """Flush from the current process if ``COUNTER_FLUSH_INTERVAL`` has passed."""
+    interval = getattr(settings, 'COUNTER_FLUSH_INTERVAL', 30)
+    if interval is None or time.monotonic() - _last_flush < interval:
+        return
+    try:
+        flush_exclusive()
+    except Exception:
+        logger.exception('Flushing project counters failed')
+
+
+def flush_exclusive(batch_size=500):
+    """Run ``flush`` unless another process is already flushing (then return ``None``)."""
+    if not cache.add(LOCK_KEY, 1, 60):
+        return None
+    try:
+        return flush(batch_size)
+    finally:
+        cache.delete(LOCK_KEY)
@@ -0,0 +1,143 @@
+"""
+Likes, bookmarks and ratings.
+
+Each action is a single conflict-tolerant INSERT (``INSERT OR IGNORE`` /
+``ON CONFLICT DO NOTHING``) relying on the models' ``unique_together``
+constraints, so concurrent clicks never SELECT first and never retry on
+``IntegrityError``. When the insert creates a row, the denormalized counter on
+``Project`` is bumped with ``F()`` in the same transaction.
+
+Ratings keep count, sum, average and a 5-bucket histogram on ``Project`` up
+to date incrementally, so listings never aggregate the ratings table.
+"""
+from django.db import connection, transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
+from django.db.models.constants import OnConflict
+
+from .cache import bump_tags
+from .models import Project, ProjectBookmark, ProjectLike, ProjectRating
+from .pagecache import project_pages, purge
+
+
+def insert_ignore(model, **values):
+    """
+    Insert one row unless it violates a unique constraint.
+
+    Returns ``True`` when a row was inserted. This is the statement
+    ``bulk_create(ignore_conflicts=True)`` issues, but it keeps the row count,
+    which tells us whether the row is new.
+    """
+    obj = model(**values)
+    meta = model._meta
+    fields = [field for field in meta.concrete_fields if not field.primary_key]
+    ops = connection.ops
+    sql = '{} {} ({}) VALUES ({}) {}'.format(
+        ops.insert_statement(on_conflict=OnConflict.IGNORE),
+        ops.quote_name(meta.db_table),
+        ', '.join(ops.quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+        ops.on_conflict_suffix_sql(fields, OnConflict.IGNORE, None, None),
+    )
+    params = [field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount == 1
+
+
+def project_tag(project_id):
+    """Cache tag covering the engagement counters of one project."""
+    return f'project-{project_id}'
+
+
+def _record(model, counter, project_id, **values):
+    with transaction.atomic():
+        created = insert_ignore(model, project_id=project_id, **values)
+        if created:
+            if not Project.objects.filter(pk=project_id).update(**{counter: F(counter) + 1}):
+                # Foreign keys may be checked only at commit; roll the insert back now
+                raise Project.DoesNotExist
+            transaction.on_commit(lambda: bump_tags(project_tag(project_id)))
+    return created
+
+
+def like(project_id, ip_address):
+    """Like ``project_id`` once per IP address; return whether this call added the like."""
+    return _record(ProjectLike, 'likes', project_id, ip_address=ip_address)
+
+
+def bookmark(project_id, session_key):
+    """Bookmark ``project_id`` once per session; return whether this call added it."""
+    return _record(ProjectBookmark, 'bookmarks', project_id, session_key=session_key)
+
+
+def _rating_changes(old, new):
+    """UPDATE expressions moving one rating from ``old`` (``None`` if new) to ``new``."""
+    added = 1 if old is None else 0
+    diff = new - (old or 0)
+    # Every expression reads the pre-UPDATE row, so the average uses old sum/count
+    changes = {
+        f'rating_{new}': F(f'rating_{new}') + 1,
+        'rating_sum': F('rating_sum') + diff,
+        'rating_count': F('rating_count') + added,
+        'rating_avg': Cast(F('rating_sum') + diff, FloatField()) / (F('rating_count') + added),
+    }
+    if old is not None:
+        changes[f'rating_{old}'] = F(f'rating_{old}') - 1
+    return changes
+
+
+def rate(project_id, ip_address, rating):
+    """
+    Record ``rating`` from ``ip_address``, replacing any earlier score.
+
+    A first rating is a single conflict-ignoring INSERT. Changing a rating
+    locks the existing row to learn the score it replaces.
+    """
+    with transaction.atomic():
+        if insert_ignore(ProjectRating, project_id=project_id, ip_address=ip_address, rating=rating):
+            old = None
+        else:
+            existing = ProjectRating.objects.select_for_update().filter(
+                project_id=project_id, ip_address=ip_address)
+            old = existing.values_list('rating', flat=True).first()
+            if old is None or old == rating:
+                return
+            existing.update(rating=rating)
+        if not Project.objects.filter(pk=project_id).update(**_rating_changes(old, rating)):
+            raise Project.DoesNotExist
+        transaction.on_commit(lambda: ratings_changed([project_id]))
+
+
+def ratings_changed(project_ids):
+    """Drop the cached contexts and pages showing the ratings of ``project_ids``."""
+    # Cards show the average, so cached listings must be rebuilt
+    bump_tags('projects', *(project_tag(pk) for pk in project_ids))
+    purge(project_pages(project_ids))
+
+
+def rebuild_rating_aggregates(project_model=Project, rating_model=ProjectRating, batch_size=1000):
+    """
+    Recompute every project's rating aggregates from the ratings table.
+
+    ``bulk_update`` sends no signals, so the caches showing the rewritten
+    projects are invalidated here, as ``rate`` does for one project.
+    """
+    buckets = {f'rating_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+    rows = (rating_model.objects.values('project_id')
+            .annotate(rating_count=Count('id'), rating_sum=Sum('rating'), **buckets)
+            .order_by())
+    fields = ['rating_count', 'rating_sum', 'rating_avg', *buckets]
+    with transaction.atomic():
+        changed = set(project_model.objects.exclude(rating_count=0).values_list('pk', flat=True))
+        project_model.objects.update(**dict.fromkeys(fields, 0))
+        projects = []
+        for row in rows:
+            row['rating_avg'] = row['rating_sum'] / row['rating_count']
+            projects.append(project_model(pk=row.pop('project_id'), **row))
+        project_model.objects.bulk_update(projects, fields, batch_size=batch_size)
+    changed.update(project.pk for project in projects)
+    # Historical models mean a migration, which runs before the cache table exists
+    if project_model is Project and changed:
+        ratings_changed(sorted(changed))
+    return len(projects)
@@ -1,7 +1,13 @@
+import time
+
 from django import forms
 from .models import Contact
 
 
+# Humans take longer than this to fill in the form
+MIN_FILL_SECONDS = 3
+
+
 class ContactForm(forms.ModelForm):
     # Honeypot hidden field (should stay empty). Using CharField without required and adding CSS to hide.
     website = forms.CharField(required=False, widget=forms.TextInput(attrs={
@@ -43,6 +49,8 @@ class ContactForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         for field in ['name', 'email', 'subject', 'message']:
             self.fields[field].widget.attrs.update({'class': 'form-control'})
+        if not self.is_bound:
+            self.fields['timestamp'].initial = int(time.time())
 
     def clean_website(self):
         value = self.cleaned_data.get('website')
@@ -52,6 +60,14 @@ class ContactForm(forms.ModelForm):
         return value
 
     def clean_timestamp(self):
-        # Basic time-based spam measure (optional placeholder)
-        # Could parse epoch ms and ensure not instantaneous, but keeping simple.
-        return self.cleaned_data.get('timestamp')
+        # Reject forms submitted faster than a human could type them; a missing
+        # value (old cached page) is let through to the throttle
+        value = self.cleaned_data.get('timestamp')
+        if value:
+            try:
+                rendered = int(value)
+            except ValueError:
+                raise forms.ValidationError('Invalid submission.')
+            if time.time() - rendered < MIN_FILL_SECONDS:
+                raise forms.ValidationError('Invalid submission.')
+        return value
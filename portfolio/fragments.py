@@ -0,0 +1,99 @@
+"""
+Cached project card fragments.
+
+A card's markup depends only on its project row and on the skills it lists,
+so it is cached under a key made of the project id, ``updated_date`` (moved
+forward by ``portfolio.signals`` when the technologies change too), the rating
+columns and image size (updated without saving the row) and the ``skills``
+tag version. Editing one project re-renders one card instead of every card on
+every page that shows it.
+
+Hits and misses are counted in memory and added to shared cache counters
+every ``STATS_FLUSH_INTERVAL`` seconds, so monitoring costs no cache round
+trip per card.
+"""
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from .cache import get_tag_versions
+
+KEY_PREFIX = 'portfolio:card:'
+STATS_PREFIX = 'portfolio:cardstats:'
+VARIANTS = ('grid', 'featured', 'related')
+# Keys change with the project, so entries can live long and age out when unused
+TIMEOUT = 60 * 60 * 24
+STATS_FLUSH_INTERVAL = 10
+
+_stats = Counter()
+_last_flush = time.monotonic()
+
+
+def card_key(project, variant, skills_version):
+    # image_width changes when generate_image_variants processes an old upload
+    return (f'{KEY_PREFIX}{variant}:{project.pk}:{project.updated_date.timestamp()}:'
+            f'{project.rating_count}:{project.rating_avg}:{project.image_width}:{skills_version}')
+
+
+def render_card(project, variant, skills_version=None):
+    """Return the ``portfolio/cards/<variant>.html`` markup of ``project``, from the cache if possible."""
+    if variant not in VARIANTS:
+        raise ValueError(f'Unknown card variant {variant!r}')
+    if skills_version is None:
+        skills_version, = get_tag_versions(('skills',))
+    key = card_key(project, variant, skills_version)
+    html = cache.get(key)
+    if html is None:
+        html = get_template(f'portfolio/cards/{variant}.html').render({'project': project})
+        cache.set(key, html, TIMEOUT)
+        _record(variant, 'misses')
+    else:
+        _record(variant, 'hits')
+    return mark_safe(html)
+
+
+def _record(variant, outcome):
+    _stats[variant, outcome] += 1
+    if time.monotonic() - _last_flush >= STATS_FLUSH_INTERVAL:
+        flush_stats()
+
+
+def _stats_key(variant, outcome):
+    return f'{STATS_PREFIX}{variant}:{outcome}'
+
+
+def flush_stats():
+    """Add the hit and miss counts of this process to the shared counters."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    for (variant, outcome), count in list(_stats.items()):
+        key = _stats_key(variant, outcome)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            if not cache.add(key, count, None):
+                cache.incr(key, count)
+    _stats.clear()
+
+
+def stats():
+    """Return ``{variant: {'hits', 'misses', 'hit_rate'}}`` across all processes sharing the cache."""
+    flush_stats()
+    keys = {_stats_key(variant, outcome): (variant, outcome)
+            for variant in VARIANTS for outcome in ('hits', 'misses')}
+    result = {variant: {'hits': 0, 'misses': 0} for variant in VARIANTS}
+    for key, count in cache.get_many(keys).items():
+        variant, outcome = keys[key]
+        result[variant][outcome] = count
+    for counts in result.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / total, 4) if total else None
+    return result
+
+
+def reset_stats():
+    _stats.clear()
+    cache.delete_many([_stats_key(variant, outcome) for variant in VARIANTS for outcome in ('hits', 'misses')])
@@ -0,0 +1,147 @@
+"""
+Responsive image variants for uploaded pictures.
+
+When a project image or profile picture is uploaded, ``process`` reads it once
+with Pillow, records its size in the ``<field>_width`` / ``<field>_height``
+columns and stores resized copies in WebP and JPEG under ``variants/``. The
+file names depend only on the original name, the width and the format, so
+templates build a ``srcset`` from the stored width without touching storage
+(see ``portfolio.templatetags.responsive_images``).
+
+Django's ``width_field``/``height_field`` are deliberately not used: they open
+the file on every model load while the columns are empty, which would happen
+for every existing row (and fail for files missing from storage).
+
+With ``IMAGE_VARIANTS_ON_SAVE = False`` uploads are left unprocessed instead,
+keeping the eight encodes out of the save request, and
+``python manage.py generate_image_variants --interval N`` processes them in
+the background. Without ``--interval`` it processes images uploaded before
+this existed. Variants of a replaced, cleared or deleted image are deleted.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import Profile, Project
+
+logger = logging.getLogger(__name__)
+
+# Widths generated for every image (never wider than the original)
+WIDTHS = (320, 480, 768, 1200)
+# (extension, Pillow format, MIME type, save options)
+FORMATS = (
+    ('webp', 'WEBP', 'image/webp', {'quality': 78, 'method': 4}),
+    ('jpg', 'JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+VARIANT_DIR = 'variants'
+# Image fields processed on upload; each has ``<name>_width`` and ``<name>_height`` columns
+IMAGE_FIELDS = {
+    Project: ('image',),
+    Profile: ('profile_image',),
+}
+
+
+def variant_widths(width):
+    """Widths of the variants generated for an image ``width`` pixels wide."""
+    if not width:
+        return []
+    widths = [w for w in WIDTHS if w < width]
+    if width <= WIDTHS[-1]:
+        widths.append(width)
+    return widths
+
+
+def variant_name(name, width, extension):
+    """``projects/shot.png`` -> ``variants/projects/shot.480w.webp``"""
+    root, _ = posixpath.splitext(name)
+    return f'{VARIANT_DIR}/{root}.{width}w.{extension}'
+
+
+def dimensions(fieldfile):
+    """``(width, height)`` stored for ``fieldfile``; ``(None, None)`` until processed."""
+    instance, name = fieldfile.instance, fieldfile.field.name
+    return getattr(instance, f'{name}_width', None), getattr(instance, f'{name}_height', None)
+
+
+def srcset(fieldfile, extension):
+    width, _ = dimensions(fieldfile)
+    return ', '.join(
+        f'{fieldfile.storage.url(variant_name(fieldfile.name, w, extension))} {w}w'
+        for w in variant_widths(width)
+    )
+
+
+def fallback_url(fieldfile, target=WIDTHS[2]):
+    """JPEG variant closest to ``target`` pixels, for browsers ignoring ``srcset``."""
+    widths = variant_widths(dimensions(fieldfile)[0])
+    width = min(widths, key=lambda w: abs(w - target))
+    return fieldfile.storage.url(variant_name(fieldfile.name, width, 'jpg'))
+
+
+def delete_variants(storage, name, width):
+    """Delete the variants of the image ``name`` that was ``width`` pixels wide."""
+    for w in variant_widths(width):
+        for extension, *_ in FORMATS:
+            try:
+                storage.delete(variant_name(name, w, extension))
+            except OSError:
+                logger.exception('Could not delete a variant of %s', name)
+
+
+def _flatten(image):
+    """Drop transparency onto white: JPEG has no alpha channel."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_variants(fieldfile):
+    """Write every variant of ``fieldfile``; returns the original ``(width, height)``."""
+    storage = fieldfile.storage
+    with fieldfile.open('rb') as handle, Image.open(handle) as source:
+        # Phone pictures are often stored sideways with an EXIF rotation
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    width, height = image.size
+    webp_source = image if image.mode in ('RGB', 'RGBA') else image.convert('RGBA')
+    jpeg_source = _flatten(image)
+    for w in variant_widths(width):
+        size = (w, max(1, round(height * w / width)))
+        for extension, format, _, options in FORMATS:
+            source = webp_source if format == 'WEBP' else jpeg_source
+            resized = source.resize(size, Image.LANCZOS) if size != source.size else source
+            buffer = BytesIO()
+            resized.save(buffer, format, **options)
+            name = variant_name(fieldfile.name, w, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+    return width, height
+
+
+def process(instance, field_name):
+    """
+    Generate the variants of ``instance.<field_name>`` and store its size.
+
+    Failures are logged and leave the size empty, so templates keep serving
+    the original file.
+    """
+    fieldfile = getattr(instance, field_name)
+    size = (None, None)
+    if fieldfile:
+        try:
+            size = generate_variants(fieldfile)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            logger.exception('Could not generate variants of %s', fieldfile.name)
+    changes = {f'{field_name}_width': size[0], f'{field_name}_height': size[1]}
+    # update() rather than save(): no second round of post_save handlers
+    type(instance).objects.filter(pk=instance.pk).update(**changes)
+    for attname, value in changes.items():
+        setattr(instance, attname, value)
+    return size
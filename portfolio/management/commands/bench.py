@@ -0,0 +1,175 @@
+import json
+import statistics
+import sys
+import time
+from urllib.parse import quote_plus
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from portfolio.models import Profile, Project, Skill
+from portfolio.synthetic import generate
+
+# (label, URL name, URL kwargs, query string); kwargs name keys of ``fixtures``
+CASES = (
+    ('home', 'home', {}, ''),
+    ('about', 'about', {}, ''),
+    ('projects', 'projects', {}, ''),
+    ('projects?tech', 'projects', {}, 'tech={tech}'),
+    ('project_detail', 'project_detail', {'project_id': 'project_id'}, ''),
+    ('contact', 'contact', {}, ''),
+    ('projects_api', 'projects_api', {}, ''),
+    ('projects_api?page', 'projects_api', {}, 'page=5'),
+    ('projects_api?filter', 'projects_api', {}, 'filter={tech}'),
+    ('projects_api?cursor', 'projects_api', {}, 'cursor=&limit=12'),
+    ('project_detail_api', 'project_detail_api', {'project_id': 'project_id'}, ''),
+    ('skills_api', 'skills_api', {}, ''),
+    ('search_projects', 'search_projects', {}, 'q=django api'),
+    ('autocomplete', 'autocomplete', {}, 'q=dash'),
+    ('sitemap', 'sitemap', {}, ''),
+    ('robots', 'robots', {}, ''),
+)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+
+class QueryRecorder:
+    """``execute_wrapper`` keeping the SQL and parameters of each statement."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append((sql, params, many))
+        return execute(sql, params, many, context)
+
+
+def rows_fetched(statements):
+    """Re-run each captured SELECT wrapped in COUNT(*) to learn how many rows it returned."""
+    total = 0
+    with connection.cursor() as cursor:
+        for sql, params, many in statements:
+            if many or not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            cursor.execute(f'SELECT COUNT(*) FROM ({sql}) bench_subquery', params)
+            total += cursor.fetchone()[0]
+    return total
+
+
+def response_bytes(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every portfolio URL through the test client on synthetic datasets '
+            '(runs against a throwaway test database)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                            help='Number of projects in each dataset')
+        parser.add_argument('--skills', type=int, default=50)
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per URL')
+        parser.add_argument('--modes', nargs='+', choices=['cold', 'warm'], default=['cold', 'warm'],
+                            help='cold clears the cache before every request')
+        parser.add_argument('--only', nargs='+', metavar='LABEL', help='Benchmark only these cases')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', metavar='FILE', help="Write the results as JSON ('-' for stdout)")
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs')
+
+    def handle(self, *args, **options):
+        # Keep stdout clean for ``--json -``
+        self.log_stream = self.stderr if options['json'] == '-' else self.stdout
+        cases = [case for case in CASES if not options['only'] or case[0] in options['only']]
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            # The benchmark hammers one client address and must not be throttled
+            with override_settings(THROTTLE_RATES={}, COUNTER_FLUSH_INTERVAL=None):
+                results = self.run(cases, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+        report = {
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'seed': options['seed'],
+            'results': results,
+        }
+        if options['json'] == '-':
+            json.dump(report, sys.stdout, indent=2)
+            sys.stdout.write('\n')
+        elif options['json']:
+            with open(options['json'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['json']}"))
+
+    def run(self, cases, options):
+        results = []
+        current = 0
+        for size in sorted(options['sizes']):
+            self.log(f'Seeding {size} projects...')
+            generate(projects=size - current, skills=0 if current else options['skills'],
+                     seed=options['seed'] + current, contacts=0)
+            current = size
+            if not Profile.objects.exists():
+                Profile.objects.create(name='Bench', title='Developer', bio='Bio', email='bench@example.com')
+            fixtures = {
+                'project_id': Project.objects.order_by('-views').values_list('pk', flat=True).first(),
+                'tech': Skill.objects.order_by('name').values_list('name', flat=True).first(),
+            }
+            self.log(f"\n{size} projects\n{'case':<22}{'mode':<6}{'p50 ms':>9}{'p95 ms':>9}"
+                     f"{'queries':>9}{'rows':>9}{'bytes':>10}")
+            for label, name, kwargs, query in cases:
+                path = reverse(name, kwargs={key: fixtures[value] for key, value in kwargs.items()})
+                if query:
+                    path = f'{path}?' + query.format(**{key: quote_plus(str(value)) for key, value in fixtures.items()})
+                for mode in options['modes']:
+                    result = self.measure(path, mode, options['iterations'])
+                    result.update(case=label, path=path, projects=size, mode=mode)
+                    results.append(result)
+                    self.log(f"{label:<22}{mode:<6}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                             f"{result['queries']:>9}{result['rows']:>9}{result['bytes']:>10}")
+        return results
+
+    def measure(self, path, mode, iterations):
+        client = Client()
+        # Untimed warm-up (imports, in-process indexes, and the page cache for warm mode)
+        cache.clear()
+        client.get(path)
+        if mode == 'cold':
+            cache.clear()
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = client.get(path)
+            size = response_bytes(response)
+        timings = []
+        for _ in range(iterations):
+            if mode == 'cold':
+                cache.clear()
+            start = time.perf_counter()
+            # Streaming responses are only produced while being consumed
+            response_bytes(client.get(path))
+            timings.append((time.perf_counter() - start) * 1000)
+        return {
+            'status': response.status_code,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': len(recorder.statements),
+            'rows': rows_fetched(recorder.statements),
+            'bytes': size,
+        }
+
+    def log(self, message):
+        self.log_stream.write(message)
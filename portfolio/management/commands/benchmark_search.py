@@ -0,0 +1,51 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from portfolio.search import FallbackBackend, get_backend
+from portfolio.synthetic import WORDS, generate
+
+
+class Command(BaseCommand):
+    help = 'Measure project search latency on a synthetic dataset (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=10000, help='Synthetic projects to create')
+        parser.add_argument('--queries', type=int, default=200, help='Queries per backend')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.seed(rng, options['projects'])
+            queries = [self.make_query(rng) for _ in range(options['queries'])]
+            for label, backend in (('fulltext', get_backend()), ('icontains', FallbackBackend())):
+                self.report(label, backend, queries)
+            # Leave the database exactly as we found it
+            transaction.set_rollback(True)
+
+    def seed(self, rng, count):
+        self.stdout.write(f'Creating {count} synthetic projects...')
+        generate(projects=count, skills=12, seed=rng.randrange(2 ** 32), technologies=(3, 3),
+                 likes=(0, 0), ratings=(0, 0))
+
+    def make_query(self, rng):
+        word = rng.choice(WORDS)
+        # Mix whole words, prefixes and two-term queries
+        return rng.choice((word, word[:3], f'{word} {rng.choice(WORDS)}'))
+
+    def report(self, label, backend, queries):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            backend.search(query, limit=10)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f'{label:>10}: p50 {statistics.median(timings):.2f} ms  '
+            f'p95 {p95:.2f} ms  mean {statistics.fmean(timings):.2f} ms'
+        )
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio.counters import flush_exclusive
+
+
+class Command(BaseCommand):
+    help = 'Write buffered project view/like/bookmark counters to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and flush every N seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            touched = flush_exclusive(options['batch_size'])
+            if touched is None:
+                self.stdout.write('Another flush is in progress, skipping')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'Flushed {touched} counter(s)'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio import images
+from portfolio.cache import bump_tags
+from portfolio.pagecache import ALL_PAGES, purge
+
+
+class Command(BaseCommand):
+    help = 'Generate the responsive WebP/JPEG variants of uploaded images and record their size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate images that already have variants')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and process new uploads every N seconds '
+                                 '(with IMAGE_VARIANTS_ON_SAVE = False)')
+
+    def handle(self, *args, **options):
+        # Images that failed are not retried by a running worker
+        failed_images = set()
+        force = options['force']
+        while True:
+            processed, failed = self.process(force, failed_images)
+            if processed or failed or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(f'Processed {processed} image(s), {failed} failed'))
+            if not options['interval']:
+                break
+            force = False
+            time.sleep(options['interval'])
+
+    def process(self, force, failed_images):
+        processed = failed = 0
+        for model, fields in images.IMAGE_FIELDS.items():
+            for name in fields:
+                rows = model.objects.exclude(**{f'{name}__isnull': True}).exclude(**{name: ''})
+                if not force:
+                    rows = rows.filter(**{f'{name}_width__isnull': True})
+                for instance in rows.iterator():
+                    fieldfile = getattr(instance, name)
+                    if fieldfile.name in failed_images:
+                        continue
+                    width, _ = images.process(instance, name)
+                    if width is None:
+                        failed += 1
+                        failed_images.add(fieldfile.name)
+                        self.stderr.write(f'Failed: {fieldfile.name}')
+                    else:
+                        processed += 1
+        if processed:
+            # Sizes are written with update(), which no signal sees
+            bump_tags('projects', 'profile')
+            purge({ALL_PAGES})
+        return processed, failed
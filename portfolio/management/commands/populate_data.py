@@ -1,14 +1,34 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from portfolio.models import Profile, Skill, Project, Experience, Education, Contact
+from portfolio import synthetic
 from django.utils import timezone
 from datetime import date, timedelta
+import time
 
 
 class Command(BaseCommand):
-    help = 'Populate the database with sample portfolio data'
+    help = 'Populate the database with sample portfolio data, or a synthetic dataset of any size'
+
+    def add_arguments(self, parser):
+        scale = parser.add_argument_group('scale mode', 'Generate a synthetic dataset instead of the sample content')
+        scale.add_argument('--projects', type=int, default=0)
+        scale.add_argument('--skills', type=int, default=0)
+        scale.add_argument('--contacts', type=int, default=0)
+        scale.add_argument('--likes', type=int, nargs=2, default=[0, 20], metavar=('MIN', 'MAX'),
+                           help='Likes per project')
+        scale.add_argument('--ratings', type=int, nargs=2, default=[0, 10], metavar=('MIN', 'MAX'),
+                           help='Ratings per project')
+        scale.add_argument('--technologies', type=int, nargs=2, default=[1, 6], metavar=('MIN', 'MAX'),
+                           help='Skills linked to each project')
+        scale.add_argument('--seed', type=int, default=0)
+        scale.add_argument('--batch-size', type=int, default=1000)
+        scale.add_argument('--no-reindex', action='store_true', help='Skip rebuilding the search index')
 
     def handle(self, *args, **options):
+        if options['projects'] or options['skills'] or options['contacts']:
+            return self.generate(options)
+
         self.stdout.write(self.style.SUCCESS('Starting to populate database with sample data...'))
 
         # Create or get superuser
@@ -449,3 +469,22 @@ Projects Completed:
                 '3. Add your own content and customize the portfolio\n'
             )
         )
+
+    def generate(self, options):
+        start = time.monotonic()
+        counts = synthetic.generate(
+            projects=options['projects'],
+            skills=options['skills'],
+            contacts=options['contacts'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            reindex=not options['no_reindex'],
+            likes=tuple(options['likes']),
+            ratings=tuple(options['ratings']),
+            technologies=tuple(options['technologies']),
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Generated {projects} projects, {skills} skills and {contacts} contact messages'.format(**counts)
+            + f' in {time.monotonic() - start:.1f}s'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from portfolio.engagement import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recompute rating average, count and histogram on every project from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rated = rebuild_rating_aggregates(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates ({rated} rated project(s))'))
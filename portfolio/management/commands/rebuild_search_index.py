@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from portfolio.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the project full-text search index from scratch'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt search index ({type(backend).__name__} on {connection.vendor})'
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio.outbox import MAX_ATTEMPTS, send_all
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and poll the outbox every N seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_all(options['batch_size'], options['max_attempts'])
+            if sent or failed or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent} email(s), {failed} failed'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
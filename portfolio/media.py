@@ -0,0 +1,151 @@
+"""
+Serving files from disk in production: uploaded media, thumbnails, the resume.
+
+``serve_file`` answers conditional requests (``If-None-Match``,
+``If-Modified-Since``) with 304 and single byte ranges with 206. The body is a
+``FileResponse`` over the open file, which gunicorn hands to ``os.sendfile``
+through ``wsgi.file_wrapper``, so the bytes never pass through Python. A range
+is served by seeking to its start and announcing its length; gunicorn's
+sendfile stops at ``Content-Length`` and other servers read through
+``_FileRange``, which stops there too.
+
+Behind a reverse proxy the file can be handed off entirely: with
+``MEDIA_ACCEL = 'X-Accel-Redirect'`` (nginx) the response names the internal
+location from ``MEDIA_ACCEL_LOCATIONS`` mapped to the file's directory, with
+``'X-Sendfile'`` (Apache, lighttpd) its absolute path. The proxy then handles
+ranges itself.
+"""
+import mimetypes
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _FileRange:
+    """``length`` bytes of ``handle`` from its current position."""
+
+    def __init__(self, handle, length):
+        self.handle = handle
+        self.name = handle.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # Lets the WSGI server sendfile() from the handle's position
+        return self.handle.fileno()
+
+    def close(self):
+        self.handle.close()
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) of a single-range ``Range`` header,
+    ``None`` to serve the whole file, or ``False`` when unsatisfiable.
+    """
+    match = _RANGE.match(header.strip()) if header else None
+    if match is None:
+        # Absent, malformed or several ranges: the full response is allowed
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if not length:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # Syntactically invalid (RFC 9110 14.1.1): ignored
+        return None
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _accel_response(path, content_type):
+    mode = getattr(settings, 'MEDIA_ACCEL', '')
+    if mode == 'X-Sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = str(path)
+        return response
+    if mode == 'X-Accel-Redirect':
+        for root, location in getattr(settings, 'MEDIA_ACCEL_LOCATIONS', {}).items():
+            try:
+                relative = path.relative_to(Path(root).resolve())
+            except ValueError:
+                continue
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = location + quote(relative.as_posix())
+            return response
+    return None
+
+
+def serve_file(request, path, content_type=None, as_attachment=False, filename=None, cache_control=None):
+    """Stream the file at ``path`` with validators, ranges and proxy hand-off."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    etag, last_modified = file_etag(stat), int(stat.st_mtime)
+    if content_type is None:
+        content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _accel_response(path, content_type)
+    if response is None:
+        handle = open(path, 'rb')
+        byte_range = None
+        if request.method == 'GET' and _if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        if byte_range is False:
+            handle.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        elif byte_range is None:
+            response = FileResponse(handle, content_type=content_type)
+        else:
+            start, end = byte_range
+            handle.seek(start)
+            response = FileResponse(_FileRange(handle, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = end - start + 1
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    if as_attachment or filename:
+        disposition = 'attachment' if as_attachment else 'inline'
+        name = filename or path.name
+        response['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(name)}"
+    return response
@@ -0,0 +1,32 @@
+from django.db import DatabaseError, migrations
+
+
+def create_search_index(apps, schema_editor):
+    from portfolio.search import get_backend
+
+    backend = get_backend(schema_editor.connection.vendor)
+    try:
+        backend.setup(schema_editor)
+    except DatabaseError:
+        if schema_editor.connection.vendor != 'sqlite':
+            raise
+        # SQLite compiled without FTS5: search falls back to icontains
+        return
+    backend.rebuild()
+
+
+def drop_search_index(apps, schema_editor):
+    from portfolio.search import get_backend
+
+    get_backend(schema_editor.connection.vendor).teardown(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_project_bookmarks_project_challenges_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
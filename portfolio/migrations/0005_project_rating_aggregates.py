@@ -0,0 +1,60 @@
+# Generated by Django 5.1.2 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    from portfolio.engagement import rebuild_rating_aggregates
+
+    rebuild_rating_aggregates(apps.get_model('portfolio', 'Project'), apps.get_model('portfolio', 'ProjectRating'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_project_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, help_text='Number of 1-star ratings'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, help_text='Number of 2-star ratings'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, help_text='Number of 3-star ratings'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, help_text='Number of 4-star ratings'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, help_text='Number of 5-star ratings'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
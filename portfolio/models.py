@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.validators import URLValidator
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 
@@ -22,11 +23,43 @@ class Skill(models.Model):
         ordering = ['-proficiency', 'name']
 
 
+# Columns a project card (home, listing, related projects, API) needs
+CARD_FIELDS = (
+    'id', 'title', 'short_description', 'image', 'image_width', 'image_height', 'featured',
+    'github_url', 'live_url', 'created_date', 'updated_date', 'rating_avg', 'rating_count',
+)
+
+
+class ProjectQuerySet(models.QuerySet):
+    def with_technologies(self, *fields):
+        """Prefetch technologies, loading only ``fields`` of each skill"""
+        skills = Skill.objects.only('id', *fields)
+        return self.prefetch_related(models.Prefetch('technologies', queryset=skills))
+    
+    def with_tech_count(self):
+        """Annotate ``tech_count`` so templates never call ``technologies.count``"""
+        Through = Project.technologies.through
+        count = (Through.objects.filter(project_id=models.OuterRef('pk'))
+                 .order_by().values('project_id').annotate(n=models.Count('*')).values('n'))
+        return self.annotate(tech_count=Coalesce(models.Subquery(count), 0))
+    
+    def cards(self):
+        """Projects rendered as cards: no long text columns"""
+        return self.only(*CARD_FIELDS).with_technologies('name').with_tech_count()
+    
+    def detail(self):
+        """Projects rendered on their own page"""
+        return self.with_technologies('name', 'icon').with_tech_count()
+
+
 class Project(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     short_description = models.CharField(max_length=300, help_text="Brief description for cards")
     image = models.ImageField(upload_to='projects/', blank=True, null=True)
+    # Filled in with the responsive variants, see portfolio.images
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     technologies = models.ManyToManyField(Skill, blank=True)
     github_url = models.URLField(blank=True, validators=[URLValidator()])
     live_url = models.URLField(blank=True, validators=[URLValidator()])
@@ -51,6 +84,22 @@ class Project(models.Model):
     team_size = models.PositiveIntegerField(blank=True, null=True)
     views = models.PositiveIntegerField(default=0)
     
+    objects = ProjectQuerySet.as_manager()
+    
+    # Rating aggregates maintained from ProjectRating (see portfolio.engagement)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0, help_text='Number of 1-star ratings')
+    rating_2 = models.PositiveIntegerField(default=0, help_text='Number of 2-star ratings')
+    rating_3 = models.PositiveIntegerField(default=0, help_text='Number of 3-star ratings')
+    rating_4 = models.PositiveIntegerField(default=0, help_text='Number of 4-star ratings')
+    rating_5 = models.PositiveIntegerField(default=0, help_text='Number of 5-star ratings')
+    
+    @property
+    def rating_histogram(self):
+        return [self.rating_1, self.rating_2, self.rating_3, self.rating_4, self.rating_5]
+    
     def __str__(self):
         return self.title
     
@@ -109,6 +158,34 @@ class Contact(models.Model):
         ordering = ['-created_date']
 
 
+class OutboxEmail(models.Model):
+    """Email queued in the same transaction as the row that triggered it (see portfolio.outbox)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField(help_text="Comma-separated recipient addresses")
+    reply_to = models.CharField(max_length=254, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    sent_date = models.DateTimeField(blank=True, null=True)
+    
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+    
+    class Meta:
+        ordering = ['-created_date']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+
 class ProjectComment(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='comments')
     name = models.CharField(max_length=100)
@@ -169,6 +246,8 @@ class Profile(models.Model):
     email = models.EmailField()
     phone = models.CharField(max_length=20, blank=True)
     profile_image = models.ImageField(upload_to='profile/', blank=True, null=True)
+    profile_image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    profile_image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     resume = models.FileField(upload_to='documents/', blank=True, null=True)
     
     # Social Links
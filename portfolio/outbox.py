@@ -0,0 +1,137 @@
+"""
+Transactional email outbox.
+
+Views never talk to the mail server. They ``enqueue`` an ``OutboxEmail`` row
+inside the transaction that saves the record the email is about, so a message
+is queued if and only if that record is committed. The ``send_outbox``
+management command drains the table in batches over one reused connection and
+retries failures with exponential backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# Retry after 30s, 1m, 2m, 4m, ... capped at one hour
+BACKOFF_BASE = 30
+BACKOFF_MAX = 60 * 60
+# Claimed emails are hidden from other senders this long, so a sender that
+# dies mid-batch only delays its emails
+CLAIM_TIMEOUT = 10 * 60
+
+
+def enqueue(subject, body, recipients, from_email=None, reply_to=''):
+    """Queue an email; call it inside the transaction that owns the triggering row."""
+    return OutboxEmail.objects.create(
+        subject=subject[:255],
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=','.join(recipients),
+        reply_to=reply_to,
+    )
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying an email that failed ``attempts`` times."""
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def _message(email, connection):
+    return EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=[address for address in email.recipients.split(',') if address],
+        reply_to=[email.reply_to] if email.reply_to else None,
+        connection=connection,
+    )
+
+
+def _failed(email, error, now, max_attempts):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+        logger.error('Giving up on outbox email %s after %s attempts: %s', email.pk, email.attempts, error)
+    else:
+        email.next_attempt_at = now + timedelta(seconds=backoff(email.attempts))
+        logger.warning('Outbox email %s failed (attempt %s): %s', email.pk, email.attempts, error)
+
+
+def _claim(batch_size, now):
+    """Take up to ``batch_size`` due emails for this sender in a short transaction."""
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT))
+    return batch
+
+
+def send_pending(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """
+    Send up to ``batch_size`` due emails; return ``(sent, failed)``.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+    database supports it and moved ``CLAIM_TIMEOUT`` into the future, so
+    several senders can drain the same table. The mail server is only talked
+    to once that transaction has committed: on SQLite it would otherwise hold
+    the write lock, and block contact posts, for the whole SMTP exchange.
+    """
+    now = timezone.now()
+    sent = failed = 0
+    batch = _claim(batch_size, now)
+    if not batch:
+        return sent, failed
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        # Mail server unreachable: the whole batch waits for the next attempt
+        connection = None
+        for email in batch:
+            _failed(email, exc, now, max_attempts)
+        failed = len(batch)
+    if connection is not None:
+        try:
+            for email in batch:
+                try:
+                    _message(email, connection).send()
+                except Exception as exc:
+                    _failed(email, exc, now, max_attempts)
+                    failed += 1
+                else:
+                    email.status = 'sent'
+                    email.sent_date = timezone.now()
+                    email.attempts += 1
+                    email.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+    OutboxEmail.objects.bulk_update(
+        batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_date'])
+    return sent, failed
+
+
+def send_all(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """Drain every due email; return ``(sent, failed)`` totals."""
+    totals = [0, 0]
+    while True:
+        sent, failed = send_pending(batch_size, max_attempts)
+        totals[0] += sent
+        totals[1] += failed
+        # A batch without any success means the server is down; retry later
+        if sent + failed < batch_size or not sent:
+            return tuple(totals)
@@ -0,0 +1,208 @@
+"""
+Full-page cache for anonymous visitors.
+
+Views opt in with ``@page_cache``. ``AnonymousPageCacheMiddleware`` answers a
+GET or HEAD for such a view from the cache when the request carries no
+cookies, so the stored page cannot depend on a session, a login, flash
+messages or a CSRF token. A response is only stored when it is a plain 200
+that sets no cookies and never asked for a CSRF token. Pages with forms, such
+as ``contact``, therefore always run their view.
+
+Entries are keyed by the path and the normalized query string, bound to
+version tags (see ``portfolio.cache``) for the path, the view, the whole site
+and the per-object tags the view declares. ``purge`` drops pages by path or
+view. Any save or delete purges exactly the pages showing the object
+(``model_pages``) through ``portfolio.signals``, whether the edit came from
+the admin, the shell or a management command; likes, bookmarks and ratings
+bump the project's own tag, which drops its detail page. Only the buffered
+view counters show up late, when entries expire after ``PAGE_CACHE_TIMEOUT``
+seconds.
+"""
+import hashlib
+from urllib.parse import parse_qsl, urlencode
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+
+from .cache import bump_tags, get_tag_versions
+from .models import Education, Experience, Profile, Project, Skill
+
+KEY_PREFIX = 'portfolio:page:'
+ALL_PAGES = '*'
+# Query parameters that never change the page
+IGNORED_PARAMS = ('fbclid', 'gclid')
+IGNORED_PARAM_PREFIXES = ('utm_',)
+# Detail pages list the first projects (excluding their own) as related
+RELATED_PROJECTS = 3
+
+
+def page_cache(view=None, on_hit=None, tags=()):
+    """
+    Let ``AnonymousPageCacheMiddleware`` serve ``view`` from the cache.
+
+    ``tags`` are per-object tags of what the page shows, or a callable
+    ``tags(request, *args, **kwargs)`` returning them; bumping any of them
+    drops the stored page. ``on_hit(request, *args, **kwargs)`` runs when a
+    stored page is served in place of the view, for side effects such as
+    counting a visit.
+    """
+    def decorator(view):
+        # Read by the middleware from the resolved view, so this must be the outermost decorator
+        view.page_cache = {'on_hit': on_hit, 'tags': tags}
+        return view
+    return decorator(view) if view is not None else decorator
+
+
+def normalize_query(query_string):
+    params = [
+        (key, value) for key, value in parse_qsl(query_string, keep_blank_values=True)
+        if key not in IGNORED_PARAMS and not key.startswith(IGNORED_PARAM_PREFIXES)
+    ]
+    # Stable sort: repeated keys keep their relative order
+    return urlencode(sorted(params, key=lambda param: param[0]))
+
+
+def _path_tag(path):
+    return f'page:{path}'
+
+
+def _view_tag(url_name):
+    return f'page:view:{url_name}'
+
+
+def page_key(request, url_name, model_tags=()):
+    tags = ('pages', _view_tag(url_name), _path_tag(request.path), *model_tags)
+    versions = '.'.join(str(version) for version in get_tag_versions(tags))
+    query = normalize_query(request.META.get('QUERY_STRING', ''))
+    digest = hashlib.md5(f'{request.path}?{query}'.encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}{url_name}:{versions}:{digest}'
+
+
+def purge(targets):
+    """
+    Drop the stored pages named by ``targets``.
+
+    A target is a path (``'/project/3/'``, every query string of it), a view
+    (``'view:projects'``, every page it renders) or ``ALL_PAGES``.
+    """
+    tags = set()
+    for target in targets:
+        if target == ALL_PAGES:
+            tags.add('pages')
+        elif target.startswith('view:'):
+            tags.add(_view_tag(target[len('view:'):]))
+        else:
+            tags.add(_path_tag(target))
+    bump_tags(*sorted(tags))
+
+
+def _listed_as_related(project_ids):
+    shown = Project.objects.values_list('pk', flat=True)[:RELATED_PROJECTS + 1]
+    return not set(project_ids).isdisjoint(shown)
+
+
+def project_pages(project_ids):
+    """Pages showing any of ``project_ids``."""
+    targets = {reverse('home'), 'view:projects'}
+    targets.update(reverse('project_detail', args=[pk]) for pk in project_ids)
+    if _listed_as_related(project_ids):
+        targets.add('view:project_detail')
+    return targets
+
+
+def skill_pages(skill):
+    """Pages showing ``skill``, on its own or as a technology of a project."""
+    project_ids = list(Project.technologies.through.objects.filter(skill=skill).values_list('project_id', flat=True))
+    return {reverse('about')} | project_pages(project_ids)
+
+
+def model_pages(instance):
+    """Pages showing ``instance`` of any model the pages are built from."""
+    if isinstance(instance, Project):
+        return project_pages([instance.pk])
+    if isinstance(instance, Skill):
+        return skill_pages(instance)
+    if isinstance(instance, Experience):
+        return {reverse('home'), reverse('about')}
+    if isinstance(instance, Education):
+        return {reverse('about')}
+    if isinstance(instance, Profile):
+        return {ALL_PAGES}
+    return set()
+
+
+def _stored(response):
+    return (response.status_code, list(response.items()), response.content)
+
+
+def _restore(entry):
+    status, headers, content = entry
+    response = HttpResponse(content, status=status)
+    for header, value in headers:
+        response[header] = value
+    return response
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Serve ``@page_cache`` views to cookie-free GET requests from the cache.
+
+    Must come before the session, CSRF and message middleware so that it sees
+    every cookie they set on the way out.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.store(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.store(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        options = getattr(view_func, 'page_cache', None)
+        timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 0)
+        if (options is None or not timeout or request.method not in ('GET', 'HEAD')
+                or request.COOKIES or 'HTTP_AUTHORIZATION' in request.META):
+            return None
+        tags = options['tags']
+        if callable(tags):
+            tags = tags(request, *view_args, **view_kwargs)
+        key = page_key(request, request.resolver_match.url_name, tags)
+        entry = cache.get(key)
+        if entry is None:
+            if request.method == 'GET':
+                request.page_cache_key = key
+            return None
+        if options['on_hit'] is not None:
+            options['on_hit'](request, *view_args, **view_kwargs)
+        response = _restore(entry)
+        response['X-Page-Cache'] = 'hit'
+        return get_conditional_response(request, etag=response.get('ETag'), response=response)
+
+    def store(self, request, response):
+        key = getattr(request, 'page_cache_key', None)
+        cache_control = response.get('Cache-Control', '')
+        if (key is None or response.status_code != 200 or response.streaming
+                # Sessions, flash messages and CSRF tokens all come with a cookie
+                or response.cookies or request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+                or 'private' in cache_control or 'no-store' in cache_control):
+            return
+        cache.set(key, _stored(response), settings.PAGE_CACHE_TIMEOUT)
+        response['X-Page-Cache'] = 'miss'
+
@@ -0,0 +1,95 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of ``COUNT`` + ``OFFSET``, each page continues from the sort key of the
+last row of the previous page. The cursor handed to clients is an opaque,
+URL-safe encoding of that sort key.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Deterministic ordering used to page through projects; ``id`` breaks ties
+PROJECT_ORDERING = ('-featured', '-created_date', 'id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _field_names(ordering):
+    return [field.lstrip('-') for field in ordering]
+
+
+def encode_cursor(obj, ordering=PROJECT_ORDERING):
+    """Return the cursor pointing just after ``obj`` (a model instance or a ``values()`` row)."""
+    values = []
+    for name in _field_names(ordering):
+        value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, model, ordering=PROJECT_ORDERING):
+    """Turn a cursor back into typed sort key values for ``model``."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor('Malformed cursor') from exc
+    names = _field_names(ordering)
+    if not isinstance(values, list) or len(values) != len(names):
+        raise InvalidCursor('Malformed cursor')
+    try:
+        return [model._meta.get_field(name).to_python(value) for name, value in zip(names, values)]
+    except ValidationError as exc:
+        raise InvalidCursor('Malformed cursor') from exc
+
+
+def keyset_filter(values, ordering=PROJECT_ORDERING):
+    """
+    Build the ``Q`` selecting rows that sort strictly after ``values``.
+
+    For ``(-a, b)`` this is ``a < A OR (a = A AND b > B)``.
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def _cursor_queryset(queryset, cursor, ordering):
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        queryset = queryset.filter(keyset_filter(values, ordering))
+    return queryset
+
+
+def _cursor_page(rows, limit, ordering):
+    next_cursor = encode_cursor(rows[limit - 1], ordering) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def paginate_by_cursor(queryset, cursor=None, limit=6, ordering=PROJECT_ORDERING):
+    """
+    Return ``(rows, next_cursor)`` for the page following ``cursor``.
+
+    One extra row is fetched to know whether another page exists, so no
+    ``COUNT`` query is needed. ``next_cursor`` is ``None`` on the last page.
+    """
+    queryset = _cursor_queryset(queryset, cursor, ordering)
+    return _cursor_page(list(queryset[:limit + 1]), limit, ordering)
+
+
+async def apaginate_by_cursor(queryset, cursor=None, limit=6, ordering=PROJECT_ORDERING):
+    """Async version of ``paginate_by_cursor``."""
+    queryset = _cursor_queryset(queryset, cursor, ordering)
+    return _cursor_page([row async for row in queryset[:limit + 1]], limit, ordering)
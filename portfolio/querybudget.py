@@ -0,0 +1,138 @@
+"""
+N+1 detection and per-view query budgets.
+
+``QueryBudgetMiddleware`` records every statement a request executes through
+``connection.execute_wrapper`` and groups them by shape (the SQL with literals
+and placeholder lists collapsed). A shape repeated ``QUERY_REPEAT_THRESHOLD``
+times in one request is the signature of a query issued per row of a loop.
+Requests to URLs listed in ``portfolio.urls.QUERY_BUDGETS`` are also checked
+against their budget.
+
+Violations are logged as warnings. With ``QUERY_BUDGET_STRICT`` (used by the
+test suite) they raise ``QueryBudgetExceeded`` instead, so a regression fails
+the build rather than waiting to be noticed in the logs. Queries run while a
+streaming response is consumed happen after the check and are not counted.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_SPACE = re.compile(r'\s+')
+# Transaction control is not work done for the response
+_IGNORED = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def normalize(sql):
+    """Reduce ``sql`` to its shape: literals become ``?`` and ``IN`` lists ``(...)``."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _cache_tables():
+    return tuple(
+        config['LOCATION'] for config in settings.CACHES.values()
+        if config['BACKEND'].endswith('DatabaseCache')
+    )
+
+
+class QueryShapeRecorder:
+    """``execute_wrapper`` counting executed statements by shape."""
+
+    def __init__(self):
+        self.shapes = Counter()
+        # A database cache backend is not the view querying the database
+        self.ignored_tables = _cache_tables()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(_IGNORED) and not self._on_cache_table(sql):
+            self.shapes[normalize(sql)] += 1
+        return execute(sql, params, many, context)
+
+    def _on_cache_table(self, sql):
+        return any(f'"{table}"' in sql or f'`{table}`' in sql for table in self.ignored_tables)
+
+    @property
+    def count(self):
+        return sum(self.shapes.values())
+
+    def repeated(self, threshold):
+        """Shapes executed at least ``threshold`` times, most frequent first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def problems(self, budget=None, threshold=None):
+        """Human-readable descriptions of every violation; empty when within limits."""
+        if threshold is None:
+            threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 3)
+        problems = [f'{count}x {shape}' for shape, count in self.repeated(threshold)]
+        if budget is not None and self.count > budget:
+            problems.insert(0, f'{self.count} queries, budget is {budget}')
+        return problems
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryShapeRecorder()
+    with connection.execute_wrapper(recorder):
+        yield recorder
+
+
+def get_budget(resolver_match):
+    from .urls import QUERY_BUDGETS
+
+    if resolver_match is None or resolver_match.namespaces:
+        return None
+    return QUERY_BUDGETS.get(resolver_match.url_name)
+
+
+def report(label, problems):
+    if not problems:
+        return
+    message = f'Query problems in {label}: ' + '; '.join(problems)
+    if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        with record_queries() as recorder:
+            response = await self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        match = request.resolver_match
+        label = match.view_name if match else request.path
+        report(label, recorder.problems(get_budget(match)))
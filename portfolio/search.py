@@ -0,0 +1,234 @@
+"""
+Full-text search over projects.
+
+On SQLite the index is an FTS5 virtual table (``portfolio_project_fts``) whose
+rowid is the project id. On PostgreSQL it is a weighted ``search_vector``
+tsvector column on the project table behind a GIN index. Both are created by
+migration 0004 and refreshed from signals whenever a project or one of its
+technologies changes. Other databases fall back to ``icontains`` matching.
+
+Every search term is treated as a prefix, so ``dja`` finds ``Django``.
+"""
+import re
+
+from django.db import DatabaseError, connection
+from django.db.models import Q
+
+from .models import Project, Skill
+
+FTS_TABLE = 'portfolio_project_fts'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SEARCH_CONFIG = 'english'
+
+# Keep pathological queries from producing huge MATCH expressions
+MAX_TERMS = 8
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def parse_terms(query):
+    """Split a user query into lowercase word terms, dropping punctuation."""
+    return _TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+def _tables():
+    through = Project.technologies.through._meta
+    return {
+        'fts': FTS_TABLE,
+        'project': Project._meta.db_table,
+        'skill': Skill._meta.db_table,
+        'through': through.db_table,
+        'through_project': through.get_field('project').column,
+        'through_skill': through.get_field('skill').column,
+        'vector': SEARCH_VECTOR_COLUMN,
+    }
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+class FallbackBackend:
+    """Unranked ``icontains`` matching for databases without a text index."""
+
+    def setup(self, schema_editor):
+        pass
+
+    def teardown(self, schema_editor):
+        pass
+
+    def index(self, project_ids):
+        pass
+
+    def remove(self, project_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit=10):
+        terms = parse_terms(query)
+        if not terms:
+            return []
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(title__icontains=term) |
+                Q(description__icontains=term) |
+                Q(short_description__icontains=term) |
+                Q(pk__in=Project.technologies.through.objects.filter(
+                    skill__name__icontains=term).values('project_id'))
+            )
+        return list(Project.objects.filter(condition).values_list('id', flat=True)[:limit])
+
+
+class SQLiteFTSBackend:
+    """FTS5 index ranked with weighted BM25 (title > summary/technologies > body)."""
+
+    CREATE_SQL = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        "title, short_description, technologies, description, "
+        "tokenize = 'porter unicode61')"
+    )
+    INSERT_SQL = (
+        "INSERT INTO {fts} (rowid, title, short_description, technologies, description) "
+        "SELECT p.id, p.title, p.short_description, "
+        "COALESCE((SELECT group_concat(s.name, ' ') FROM {through} t "
+        "JOIN {skill} s ON s.id = t.{through_skill} WHERE t.{through_project} = p.id), ''), "
+        "p.description FROM {project} p"
+    )
+    SEARCH_SQL = (
+        "SELECT rowid FROM {fts} WHERE {fts} MATCH %s "
+        "ORDER BY bm25({fts}, 10.0, 4.0, 4.0, 1.0) LIMIT %s"
+    )
+
+    def setup(self, schema_editor):
+        schema_editor.execute(self.CREATE_SQL.format(**_tables()))
+
+    def teardown(self, schema_editor):
+        schema_editor.execute('DROP TABLE IF EXISTS {fts}'.format(**_tables()))
+
+    def index(self, project_ids):
+        project_ids = list(project_ids)
+        if not project_ids:
+            return
+        marks = _placeholders(project_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({marks})', project_ids)
+            cursor.execute(self.INSERT_SQL.format(**_tables()) + f' WHERE p.id IN ({marks})', project_ids)
+
+    def remove(self, project_ids):
+        project_ids = list(project_ids)
+        if project_ids:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({_placeholders(project_ids)})', project_ids)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(self.INSERT_SQL.format(**_tables()))
+
+    def search(self, query, limit=10):
+        terms = parse_terms(query)
+        if not terms:
+            return []
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(self.SEARCH_SQL.format(**_tables()), [match, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresBackend:
+    """Weighted tsvector column with a GIN index, ranked with ``ts_rank_cd``."""
+
+    DOCUMENT_SQL = (
+        "setweight(to_tsvector('{config}', coalesce(p.title, '')), 'A') || "
+        "setweight(to_tsvector('{config}', coalesce(p.short_description, '')), 'B') || "
+        "setweight(to_tsvector('{config}', coalesce((SELECT string_agg(s.name, ' ') FROM {through} t "
+        "JOIN {skill} s ON s.id = t.{through_skill} WHERE t.{through_project} = p.id), '')), 'B') || "
+        "setweight(to_tsvector('{config}', coalesce(p.description, '')), 'C')"
+    )
+    SEARCH_SQL = (
+        "SELECT id FROM {project}, to_tsquery(%s::regconfig, %s) query "
+        "WHERE {vector} @@ query "
+        "ORDER BY ts_rank_cd({vector}, query) DESC, featured DESC, id LIMIT %s"
+    )
+
+    def _update_sql(self):
+        return ('UPDATE {project} p SET {vector} = ' + self.DOCUMENT_SQL).format(config=SEARCH_CONFIG, **_tables())
+
+    def setup(self, schema_editor):
+        tables = _tables()
+        schema_editor.execute('ALTER TABLE {project} ADD COLUMN IF NOT EXISTS {vector} tsvector'.format(**tables))
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS portfolio_project_search_gin ON {project} USING GIN ({vector})'.format(**tables)
+        )
+
+    def teardown(self, schema_editor):
+        schema_editor.execute('DROP INDEX IF EXISTS portfolio_project_search_gin')
+        schema_editor.execute('ALTER TABLE {project} DROP COLUMN IF EXISTS {vector}'.format(**_tables()))
+
+    def index(self, project_ids):
+        project_ids = list(project_ids)
+        if project_ids:
+            with connection.cursor() as cursor:
+                cursor.execute(self._update_sql() + ' WHERE p.id = ANY(%s)', [project_ids])
+
+    def remove(self, project_ids):
+        # The vector lives on the project row and goes away with it
+        pass
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(self._update_sql())
+
+    def search(self, query, limit=10):
+        terms = parse_terms(query)
+        if not terms:
+            return []
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(self.SEARCH_SQL.format(**_tables()), [SEARCH_CONFIG, tsquery, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend(vendor=None):
+    return BACKENDS.get(vendor or connection.vendor, FallbackBackend)()
+
+
+def search_project_ids(query, limit=10):
+    """Return ids of projects matching ``query``, most relevant first."""
+    backend = get_backend()
+    try:
+        return backend.search(query, limit)
+    except DatabaseError:
+        if connection.vendor != 'sqlite':
+            raise
+        # SQLite builds without FTS5 never got the index table
+        return FallbackBackend().search(query, limit)
+
+
+def index_projects(project_ids):
+    try:
+        get_backend().index(project_ids)
+    except DatabaseError:
+        if connection.vendor != 'sqlite':
+            raise
+
+
+def remove_projects(project_ids):
+    try:
+        get_backend().remove(project_ids)
+    except DatabaseError:
+        if connection.vendor != 'sqlite':
+            raise
+
+
+def rebuild_index():
+    get_backend().rebuild()
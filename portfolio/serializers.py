@@ -0,0 +1,272 @@
+"""
+Declarative JSON serializers reading ``values()`` rows.
+
+A serializer lists its output keys as fields. It selects only the columns
+those fields need, so no model instances or ``FieldFile`` objects are built.
+Each field prepares once per batch of rows: technology names are resolved with
+one query for the whole page, and dates are formatted once per distinct day
+or month instead of once per row.
+
+Clients may ask for a subset of the keys (``?fields=id,title``); only the
+columns and lookups for those keys are then touched.
+"""
+from asgiref.sync import sync_to_async
+from django.core.files.storage import default_storage
+
+from . import counters
+from .models import Project
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class Field:
+    """Output the ``column`` value, optionally through ``format`` (memoized per value)."""
+
+    def __init__(self, column=None, format=None):
+        self.column = column
+        self.format = format
+
+    def columns(self, name):
+        return (self.column or name,)
+
+    def prepare(self, name, rows, context):
+        """Return a function computing this field for one row of ``rows``."""
+        column = self.column or name
+        if self.format is None:
+            return lambda row: row[column]
+        return _memoized(lambda row: row[column], self.format)
+
+    async def aprepare(self, name, rows, context):
+        """``prepare`` for async views; fields that query the database override it."""
+        return self.prepare(name, rows, context)
+
+
+def _memoized(key, format):
+    memo = {}
+
+    def value(row):
+        raw = key(row)
+        try:
+            return memo[raw]
+        except KeyError:
+            memo[raw] = result = format(raw)
+            return result
+    return value
+
+
+class DateField(Field):
+    """``strftime`` once per distinct month, day or timestamp, whichever the format shows."""
+
+    def __init__(self, fmt, column=None):
+        super().__init__(column)
+        self.fmt = fmt
+        if any(directive in fmt for directive in ('%H', '%I', '%M', '%S', '%p', '%f')):
+            self.granularity = None
+        elif any(directive in fmt for directive in ('%d', '%a', '%A', '%j', '%w')):
+            self.granularity = lambda value: value.date()
+        else:
+            self.granularity = lambda value: (value.year, value.month)
+
+    def prepare(self, name, rows, context):
+        column = self.column or name
+        fmt = self.fmt
+        if self.granularity is None:
+            return _memoized(lambda row: row[column], lambda value: value.strftime(fmt))
+        granularity = self.granularity
+        memo = {}
+
+        def value(row):
+            raw = row[column]
+            key = granularity(raw)
+            try:
+                return memo[key]
+            except KeyError:
+                memo[key] = result = raw.strftime(fmt)
+                return result
+        return value
+
+
+class MediaURLField(Field):
+    """URL of a stored file, or ``None``."""
+
+    def __init__(self, column=None, storage=default_storage):
+        super().__init__(column)
+        self.storage = storage
+
+    def prepare(self, name, rows, context):
+        column = self.column or name
+        return lambda row: self.storage.url(row[column]) if row[column] else None
+
+
+class MethodField(Field):
+    """Computed from several columns of the row."""
+
+    def __init__(self, columns, function):
+        super().__init__()
+        self._columns = tuple(columns)
+        self.function = function
+
+    def columns(self, name):
+        return self._columns
+
+    def prepare(self, name, rows, context):
+        return self.function
+
+
+class TechnologiesField(Field):
+    """Technology names of each project, fetched for the whole batch in one query."""
+
+    def columns(self, name):
+        return ('id',)
+
+    def _links(self, names):
+        return (Project.technologies.through.objects
+                .filter(project_id__in=names)
+                .order_by('-skill__proficiency', 'skill__name')
+                .values_list('project_id', 'skill__name'))
+
+    def prepare(self, name, rows, context):
+        names = {row['id']: [] for row in rows}
+        for project_id, skill_name in self._links(names):
+            names[project_id].append(skill_name)
+        return lambda row: names[row['id']]
+
+    async def aprepare(self, name, rows, context):
+        names = {row['id']: [] for row in rows}
+        async for project_id, skill_name in self._links(names):
+            names[project_id].append(skill_name)
+        return lambda row: names[row['id']]
+
+
+class PendingCounterField(Field):
+    """Stored counter plus the delta still buffered in ``portfolio.counters``."""
+
+    def columns(self, name):
+        return ('id', name)
+
+    def prepare(self, name, rows, context):
+        if 'pending' not in context:
+            context['pending'] = counters.pending([row['id'] for row in rows])
+        pending = context['pending']
+        return lambda row: row[name] + pending[row['id']][name]
+
+    async def aprepare(self, name, rows, context):
+        if 'pending' not in context:
+            # The cache may be a database table, which async code may not query
+            context['pending'] = await sync_to_async(counters.pending)([row['id'] for row in rows])
+        return self.prepare(name, rows, context)
+
+
+class Serializer:
+    fields = {}
+
+    def __init__(self, fields=None):
+        """``fields`` restricts the output keys (a list or a comma-separated string)."""
+        if isinstance(fields, str):
+            fields = [name.strip() for name in fields.split(',') if name.strip()]
+        if fields:
+            unknown = [name for name in fields if name not in self.fields]
+            if unknown:
+                raise InvalidFields(f"Unknown field(s): {', '.join(unknown)}")
+            self.selected = {name: field for name, field in self.fields.items() if name in fields}
+        else:
+            self.selected = dict(self.fields)
+
+    def columns(self):
+        columns = {}
+        for name, field in self.selected.items():
+            columns.update(dict.fromkeys(field.columns(name)))
+        return list(columns)
+
+    def values(self, queryset, *extra):
+        """``queryset.values()`` with the columns the selected fields (and ``extra``) need."""
+        return queryset.values(*dict.fromkeys([*self.columns(), *extra]))
+
+    def serialize(self, rows):
+        rows = list(rows)
+        context = {}
+        getters = [(name, field.prepare(name, rows, context)) for name, field in self.selected.items()]
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+    async def aserialize(self, rows):
+        """``serialize`` for async views; ``rows`` may be an async iterable."""
+        if hasattr(rows, '__aiter__'):
+            rows = [row async for row in rows]
+        else:
+            rows = list(rows)
+        context = {}
+        getters = [(name, await field.aprepare(name, rows, context)) for name, field in self.selected.items()]
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+
+class ProjectCardSerializer(Serializer):
+    fields = {
+        'id': Field(),
+        'title': Field(),
+        'short_description': Field(),
+        'image': MediaURLField(),
+        'github_url': Field(),
+        'live_url': Field(),
+        'technologies': TechnologiesField(),
+        'featured': Field(),
+        'rating_avg': Field(format=lambda value: round(value, 2)),
+        'rating_count': Field(),
+        'created_date': DateField('%B %Y'),
+    }
+
+
+class ProjectDetailSerializer(Serializer):
+    fields = {
+        'id': Field(),
+        'title': Field(),
+        'description': Field(),
+        'short_description': Field(),
+        'image': MediaURLField(),
+        'github_url': Field(),
+        'live_url': Field(),
+        'technologies': TechnologiesField(),
+        'featured': Field(),
+        'created_date': DateField('%B %d, %Y'),
+        'updated_date': DateField('%B %d, %Y'),
+        'views': PendingCounterField(),
+        'likes': PendingCounterField(),
+        'bookmarks': PendingCounterField(),
+        'rating': MethodField(
+            ('rating_avg', 'rating_count', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5'),
+            lambda row: {
+                'average': round(row['rating_avg'], 2),
+                'count': row['rating_count'],
+                'histogram': [row[f'rating_{star}'] for star in range(1, 6)],
+            },
+        ),
+    }
+
+
+class ProjectSearchSerializer(Serializer):
+    fields = {
+        'id': Field(),
+        'title': Field(),
+        'short_description': Field(),
+        'url': MethodField(('id',), lambda row: f"/project/{row['id']}/"),
+        'image': MediaURLField(),
+    }
+
+
+class SkillSerializer(Serializer):
+    fields = {
+        'name': Field(),
+        'proficiency': Field(),
+        'category': Field(),
+        'icon': Field(),
+    }
+
+
+class ContactSummarySerializer(Serializer):
+    fields = {
+        'name': Field(),
+        'subject': Field(),
+        'created_date': DateField('%Y-%m-%d %H:%M'),
+        'is_read': Field(),
+    }
@@ -0,0 +1,236 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.utils import timezone
+
+from . import autocomplete, images, pagecache, search
+from .autocomplete import index as autocomplete_index
+from .cache import bump_tags
+from .models import Education, Experience, Profile, Project, Skill
+
+# Cache tags invalidated when a row of the model is saved or deleted
+MODEL_TAGS = {
+    Project: ('projects',),
+    Skill: ('skills',),
+    Profile: ('profile',),
+    Experience: ('experiences',),
+    Education: ('education',),
+}
+
+
+def invalidate_model_tags(sender, **kwargs):
+    bump_tags(*MODEL_TAGS[sender])
+
+
+def invalidate_project_technologies(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_tags('projects')
+
+
+for model in MODEL_TAGS:
+    post_save.connect(invalidate_model_tags, sender=model, dispatch_uid=f'cache_tags_save_{model.__name__}')
+    post_delete.connect(invalidate_model_tags, sender=model, dispatch_uid=f'cache_tags_delete_{model.__name__}')
+
+m2m_changed.connect(
+    invalidate_project_technologies,
+    sender=Project.technologies.through,
+    dispatch_uid='cache_tags_project_technologies',
+)
+
+
+# Search index maintenance
+
+def index_saved_project(sender, instance, **kwargs):
+    search.index_projects([instance.pk])
+
+
+def unindex_deleted_project(sender, instance, **kwargs):
+    search.remove_projects([instance.pk])
+
+
+def reindex_project_technologies(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # pk_set is not provided for clear(); remember who loses the skill
+        instance._search_project_ids = list(instance.project_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        search.index_projects(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        search.index_projects(getattr(instance, '_search_project_ids', []) if reverse else [instance.pk])
+
+
+def reindex_skill_projects(sender, instance, **kwargs):
+    search.index_projects(instance.project_set.values_list('pk', flat=True))
+
+
+def remember_skill_projects(sender, instance, **kwargs):
+    instance._search_project_ids = list(instance.project_set.values_list('pk', flat=True))
+
+
+def reindex_deleted_skill_projects(sender, instance, **kwargs):
+    search.index_projects(getattr(instance, '_search_project_ids', []))
+
+
+post_save.connect(index_saved_project, sender=Project, dispatch_uid='search_index_project_save')
+post_delete.connect(unindex_deleted_project, sender=Project, dispatch_uid='search_index_project_delete')
+m2m_changed.connect(
+    reindex_project_technologies,
+    sender=Project.technologies.through,
+    dispatch_uid='search_index_project_technologies',
+)
+post_save.connect(reindex_skill_projects, sender=Skill, dispatch_uid='search_index_skill_save')
+pre_delete.connect(remember_skill_projects, sender=Skill, dispatch_uid='search_index_skill_pre_delete')
+post_delete.connect(reindex_deleted_skill_projects, sender=Skill, dispatch_uid='search_index_skill_delete')
+
+
+# Cached project cards are keyed by updated_date, which auto_now only moves on
+# save(); changing the technologies is an edit of the project as well
+
+def _technology_project_ids(instance, action, reverse, pk_set):
+    """Projects whose technologies an m2m change altered, or ``None`` for the pre_ actions."""
+    if action in ('post_add', 'post_remove'):
+        return pk_set if reverse else [instance.pk]
+    if action == 'post_clear':
+        return getattr(instance, '_search_project_ids', []) if reverse else [instance.pk]
+    return None
+
+
+def touch_project_technologies(sender, instance, action, reverse, pk_set, **kwargs):
+    pks = _technology_project_ids(instance, action, reverse, pk_set)
+    if not pks:
+        return
+    now = timezone.now()
+    Project.objects.filter(pk__in=pks).update(updated_date=now)
+    if not reverse:
+        instance.updated_date = now
+
+
+m2m_changed.connect(
+    touch_project_technologies,
+    sender=Project.technologies.through,
+    dispatch_uid='touch_project_technologies',
+)
+
+
+# Full-page cache: purge the pages showing the object, before and after the
+# change, so pages it leaves are purged as well as those it appears on
+
+def note_cached_pages(sender, instance, **kwargs):
+    instance._cached_pages = set() if instance._state.adding else pagecache.model_pages(instance)
+
+
+def purge_saved_pages(sender, instance, **kwargs):
+    pagecache.purge(getattr(instance, '_cached_pages', set()) | pagecache.model_pages(instance))
+
+
+def purge_deleted_pages(sender, instance, **kwargs):
+    pagecache.purge(getattr(instance, '_cached_pages', set()))
+
+
+def purge_technology_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    pks = _technology_project_ids(instance, action, reverse, pk_set)
+    if pks:
+        pagecache.purge(pagecache.project_pages(pks))
+
+
+for model in MODEL_TAGS:
+    pre_save.connect(note_cached_pages, sender=model, dispatch_uid=f'page_cache_note_{model.__name__}')
+    post_save.connect(purge_saved_pages, sender=model, dispatch_uid=f'page_cache_save_{model.__name__}')
+    pre_delete.connect(note_cached_pages, sender=model, dispatch_uid=f'page_cache_note_delete_{model.__name__}')
+    post_delete.connect(purge_deleted_pages, sender=model, dispatch_uid=f'page_cache_delete_{model.__name__}')
+
+m2m_changed.connect(
+    purge_technology_pages,
+    sender=Project.technologies.through,
+    dispatch_uid='page_cache_project_technologies',
+)
+
+
+# Autocomplete index maintenance
+
+def autocomplete_note_changes(sender, instance, update_fields=None, **kwargs):
+    fields = autocomplete.INDEXED_FIELDS[sender]
+    if update_fields is not None and not set(fields) & set(update_fields):
+        instance._autocomplete_changed = False
+        return
+    stored = None
+    if not instance._state.adding:
+        stored = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    instance._autocomplete_changed = stored != tuple(getattr(instance, name) for name in fields)
+
+
+def autocomplete_saved_project(sender, instance, **kwargs):
+    if getattr(instance, '_autocomplete_changed', True):
+        autocomplete_index.update_project(instance)
+
+
+def autocomplete_saved_skill(sender, instance, **kwargs):
+    if getattr(instance, '_autocomplete_changed', True):
+        autocomplete_index.update_skill(instance)
+
+
+def autocomplete_deleted(sender, instance, **kwargs):
+    autocomplete_index.remove('project' if sender is Project else 'skill', instance.pk)
+
+
+for model in autocomplete.INDEXED_FIELDS:
+    pre_save.connect(autocomplete_note_changes, sender=model, dispatch_uid=f'autocomplete_note_{model.__name__}')
+post_save.connect(autocomplete_saved_project, sender=Project, dispatch_uid='autocomplete_project_save')
+post_save.connect(autocomplete_saved_skill, sender=Skill, dispatch_uid='autocomplete_skill_save')
+post_delete.connect(autocomplete_deleted, sender=Project, dispatch_uid='autocomplete_project_delete')
+post_delete.connect(autocomplete_deleted, sender=Skill, dispatch_uid='autocomplete_skill_delete')
+
+
+# Responsive image variants
+
+
+def note_new_images(sender, instance, update_fields=None, **kwargs):
+    fields = images.IMAGE_FIELDS[sender]
+    if update_fields is not None:
+        fields = [name for name in fields if name in update_fields]
+    # Uploads are only written to storage during save, after this signal
+    instance._new_images = [
+        name for name in fields
+        if getattr(instance, name) and not getattr(instance, name)._committed
+    ]
+    for name in fields:
+        if not getattr(instance, name) or name in instance._new_images:
+            # Until processed, templates serve the original file
+            setattr(instance, f'{name}_width', None)
+            setattr(instance, f'{name}_height', None)
+    # Variants of the files being replaced or cleared, deleted once saved
+    instance._replaced_images = []
+    if not instance._state.adding:
+        columns = [column for name in fields for column in (name, f'{name}_width')]
+        stored = sender.objects.filter(pk=instance.pk).values(*columns).first() or {}
+        for name in fields:
+            old_name = stored.get(name)
+            if old_name and old_name != getattr(instance, name).name:
+                instance._replaced_images.append((getattr(instance, name).storage, old_name, stored[f'{name}_width']))
+
+
+def _delete_variants_on_commit(replaced):
+    for storage, name, width in replaced:
+        transaction.on_commit(lambda storage=storage, name=name, width=width:
+                              images.delete_variants(storage, name, width))
+
+
+def process_new_images(sender, instance, **kwargs):
+    _delete_variants_on_commit(getattr(instance, '_replaced_images', ()))
+    instance._replaced_images = []
+    if getattr(settings, 'IMAGE_VARIANTS_ON_SAVE', True):
+        for name in getattr(instance, '_new_images', ()):
+            images.process(instance, name)
+    instance._new_images = []
+
+
+def delete_image_variants(sender, instance, **kwargs):
+    _delete_variants_on_commit([
+        (getattr(instance, name).storage, getattr(instance, name).name, getattr(instance, f'{name}_width'))
+        for name in images.IMAGE_FIELDS[sender] if getattr(instance, name)
+    ])
+
+
+for model in images.IMAGE_FIELDS:
+    pre_save.connect(note_new_images, sender=model, dispatch_uid=f'images_note_{model.__name__}')
+    post_save.connect(process_new_images, sender=model, dispatch_uid=f'images_process_{model.__name__}')
+    post_delete.connect(delete_image_variants, sender=model, dispatch_uid=f'images_delete_{model.__name__}')
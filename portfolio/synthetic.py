@@ -0,0 +1,153 @@
+"""
+Deterministic synthetic datasets for load testing and benchmarks.
+
+``generate`` bulk-inserts skills, projects with their technologies, likes and
+ratings, and contact messages in batches. Each project is drawn from its own
+RNG derived from the seed, so the same arguments always produce the same rows,
+and the denormalized counters on ``Project`` (likes, rating aggregates) are
+computed while generating instead of being re-aggregated afterwards.
+
+``bulk_create`` bypasses signals, so the search index and cache tags are
+refreshed once at the end.
+"""
+import ipaddress
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+
+from . import search
+from .cache import bump_tags
+from .pagecache import ALL_PAGES, purge
+from .models import Contact, Project, ProjectLike, ProjectRating, Skill
+
+WORDS = (
+    'django python react api dashboard portfolio analytics commerce realtime chat '
+    'machine learning vision mobile cloud serverless docker kubernetes payment '
+    'search recommendation pipeline streaming graph weather finance health game '
+    'inventory booking social blog scraper automation testing security monitoring'
+).split()
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'pha', 'dri', 'gon']
+CATEGORIES = ['frontend', 'backend', 'database', 'tools', 'other']
+STATUSES = ['completed', 'in_progress', 'maintained', 'archived']
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+# Synthetic visitors come from 10.0.0.0/8
+FIRST_IP = int(ipaddress.IPv4Address('10.0.0.0'))
+
+
+def _ip(n):
+    return str(ipaddress.IPv4Address(FIRST_IP + n))
+
+
+def _batched_ids(model, objs, after):
+    """Primary keys of just-inserted ``objs`` (queried when the backend cannot return them)."""
+    if objs and objs[0].pk is not None:
+        return [obj.pk for obj in objs]
+    return list(model.objects.filter(pk__gt=after).order_by('pk').values_list('pk', flat=True)[:len(objs)])
+
+
+class Generator:
+    def __init__(self, seed=0, batch_size=1000, technologies=(1, 6), likes=(0, 20),
+                 ratings=(0, 10), log=None):
+        self.seed = seed
+        self.batch_size = batch_size
+        self.technologies = technologies
+        self.likes = likes
+        self.ratings = ratings
+        self.log = log or (lambda message: None)
+        rng = random.Random(seed)
+        # A large filler vocabulary keeps the topic words selective for search
+        self.filler = [''.join(rng.choices(SYLLABLES, k=3)) for _ in range(3000)]
+
+    def skills(self, count):
+        rng = random.Random(f'{self.seed}:skills')
+        last = Skill.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        skills = [
+            Skill(
+                name=f'{WORDS[n % len(WORDS)].title()} {n // len(WORDS) + 1}',
+                proficiency=rng.randint(40, 100),
+                category=rng.choice(CATEGORIES),
+            )
+            for n in range(count)
+        ]
+        created = Skill.objects.bulk_create(skills, batch_size=self.batch_size)
+        return _batched_ids(Skill, created, last)
+
+    def _project(self, index, skill_ids):
+        rng = random.Random(f'{self.seed}:project:{index}')
+        likes = rng.randint(*self.likes)
+        ratings = [rng.randint(1, 5) for _ in range(rng.randint(*self.ratings))]
+        histogram = {f'rating_{star}': ratings.count(star) for star in range(1, 6)}
+        project = Project(
+            title=' '.join(rng.sample(WORDS, 3)).title(),
+            short_description=' '.join(rng.sample(WORDS, 8)),
+            description=' '.join(rng.choices(self.filler, k=75) + rng.sample(WORDS, 5)),
+            featured=rng.random() < 0.05,
+            status=rng.choice(STATUSES),
+            created_date=EPOCH + timedelta(minutes=rng.randrange(60 * 24 * 365 * 5)),
+            views=rng.randint(0, 5000),
+            likes=likes,
+            rating_count=len(ratings),
+            rating_sum=sum(ratings),
+            rating_avg=sum(ratings) / len(ratings) if ratings else 0,
+            **histogram,
+        )
+        low, high = self.technologies
+        technologies = rng.sample(skill_ids, min(len(skill_ids), rng.randint(low, high))) if skill_ids else []
+        return project, technologies, likes, ratings
+
+    def projects(self, count, skill_ids):
+        Through = Project.technologies.through
+        for start in range(0, count, self.batch_size):
+            rows = [self._project(index, skill_ids) for index in range(start, min(start + self.batch_size, count))]
+            last = Project.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+            created = Project.objects.bulk_create([row[0] for row in rows])
+            links, likes, ratings = [], [], []
+            for pk, (_, technologies, like_count, scores) in zip(_batched_ids(Project, created, last), rows):
+                links.extend(Through(project_id=pk, skill_id=skill_id) for skill_id in technologies)
+                likes.extend(ProjectLike(project_id=pk, ip_address=_ip(n)) for n in range(like_count))
+                ratings.extend(ProjectRating(project_id=pk, ip_address=_ip(n), rating=score)
+                               for n, score in enumerate(scores))
+            Through.objects.bulk_create(links, batch_size=self.batch_size)
+            ProjectLike.objects.bulk_create(likes, batch_size=self.batch_size)
+            ProjectRating.objects.bulk_create(ratings, batch_size=self.batch_size)
+            self.log(f'  {min(start + self.batch_size, count)}/{count} projects')
+
+    def contacts(self, count):
+        rng = random.Random(f'{self.seed}:contacts')
+        for start in range(0, count, self.batch_size):
+            Contact.objects.bulk_create([
+                Contact(
+                    name=f'Visitor {n}',
+                    email=f'visitor{n}@example.com',
+                    subject=' '.join(rng.sample(WORDS, 3)).capitalize(),
+                    message=' '.join(rng.choices(WORDS + self.filler[:200], k=40)),
+                    is_read=rng.random() < 0.5,
+                )
+                for n in range(start, min(start + self.batch_size, count))
+            ])
+
+
+def generate(projects=0, skills=0, contacts=0, seed=0, batch_size=1000, reindex=True, log=None, **options):
+    """
+    Insert a synthetic dataset in one transaction and return the row counts.
+
+    ``options`` are passed on to ``Generator`` (``technologies``, ``likes``
+    and ``ratings`` ranges per project).
+    """
+    generator = Generator(seed=seed, batch_size=batch_size, log=log, **options)
+    with transaction.atomic():
+        generator.log(f'Creating {skills} skills...')
+        skill_ids = generator.skills(skills)
+        if not skill_ids:
+            skill_ids = list(Skill.objects.values_list('pk', flat=True).order_by('pk'))
+        generator.log(f'Creating {projects} projects...')
+        generator.projects(projects, skill_ids)
+        generator.log(f'Creating {contacts} contact messages...')
+        generator.contacts(contacts)
+        if reindex and projects:
+            generator.log('Rebuilding the search index...')
+            search.rebuild_index()
+    bump_tags('projects', 'skills', 'autocomplete')
+    purge({ALL_PAGES})
+    return {'projects': projects, 'skills': skills, 'contacts': contacts}
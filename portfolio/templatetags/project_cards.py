@@ -0,0 +1,16 @@
+from django import template
+
+from ..cache import get_tag_versions
+from ..fragments import render_card
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def project_card(context, project, variant):
+    """Render the cached ``variant`` card of ``project``: ``{% project_card project 'grid' %}``"""
+    # One tag lookup per template render, not per card
+    render_context = context.render_context
+    if 'skills_version' not in render_context:
+        render_context['skills_version'], = get_tag_versions(('skills',))
+    return render_card(project, variant, render_context['skills_version'])
@@ -0,0 +1,47 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from .. import images, thumbnails
+
+register = template.Library()
+
+# Cards take a third of the row on large screens, half on tablets
+CARD_SIZES = '(min-width: 992px) 33vw, (min-width: 768px) 50vw, 100vw'
+
+
+@register.filter
+def srcset(image, extension='webp'):
+    """``{{ project.image|srcset:'jpg' }}``; empty until the variants exist"""
+    return images.srcset(image, extension) if image else ''
+
+
+@register.simple_tag
+def responsive_image(image, alt, sizes=CARD_SIZES, **attrs):
+    """
+    ``<picture>`` with WebP and JPEG variants of ``image``, its intrinsic size
+    and any extra ``attrs`` on the ``<img>`` (use ``class_`` for ``class``).
+
+    ``{% responsive_image project.image project.title sizes="100vw" class_="img-fluid" %}``
+    Images without variants are rendered as a plain ``<img>`` of the original.
+    """
+    attrs = {key.rstrip('_').replace('_', '-'): value for key, value in attrs.items()}
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    width, height = images.dimensions(image)
+    if not width:
+        return format_html('<img src="{}" alt="{}"{}>', image.url, alt, flatatt(attrs))
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}"{}></picture>',
+        images.srcset(image, 'webp'), sizes,
+        images.fallback_url(image), images.srcset(image, 'jpg'), sizes, width, height, alt, flatatt(attrs),
+    )
+
+
+@register.simple_tag
+def thumbnail_url(image, width, height=0):
+    """URL of an on-demand thumbnail: ``{% thumbnail_url testimonial.photo 96 96 %}``"""
+    if not image:
+        return ''
+    return thumbnails.thumbnail_url(image.name, width, height)
@@ -1,6 +1,33 @@
-from django.test import TestCase, Client
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from PIL import Image
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import AsyncClient, AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
-from .models import Project, Skill, Profile, Contact
+from django.utils import timezone
+from .cache import LOCK_PREFIX, bump_tags, cached, get_or_compute, get_tag_versions
+from . import api_views, cache_backends, counters, engagement, fragments, images, outbox, querybudget, throttling, thumbnails, views
+from .search import search_project_ids
+from .autocomplete import index as autocomplete_index
+from .models import Experience, Project, ProjectLike, ProjectRating, Skill, Profile, Contact, OutboxEmail
 
 
 class APITests(TestCase):
@@ -23,6 +50,30 @@ class APITests(TestCase):
         self.assertTrue(data['success'])
         self.assertGreaterEqual(len(data['projects']), 1)
 
+    def test_projects_api_cursor_pages_through_all(self):
+        for i in range(6):
+            Project.objects.create(title=f'P{i}', description='D', short_description='S', featured=i % 2 == 0)
+        url = reverse('projects_api')
+        seen, cursor = [], ''
+        while True:
+            data = self.client.get(url, {'cursor': cursor, 'limit': 3}).json()
+            seen += [p['id'] for p in data['projects']]
+            self.assertNotIn('total', data)
+            if not data['has_next']:
+                break
+            cursor = data['next_cursor']
+        expected = list(Project.objects.order_by('-featured', '-created_date', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_projects_api_cursor_count_and_filter(self):
+        data = self.client.get(reverse('projects_api'), {'cursor': '', 'filter': 'python', 'count': '1'}).json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual([p['id'] for p in data['projects']], [self.project.id])
+
+    def test_projects_api_invalid_cursor(self):
+        resp = self.client.get(reverse('projects_api'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(resp.status_code, 400)
+
     def test_skills_api(self):
         url = reverse('skills_api')
         resp = self.client.get(url)
@@ -31,6 +82,30 @@ class APITests(TestCase):
         self.assertTrue(data['success'])
         self.assertEqual(len(data['skills']), 1)
 
+    def test_project_card_fields(self):
+        self.project.technologies.add(Skill.objects.create(name='Django', proficiency=95, category='backend'))
+        card = self.client.get(reverse('projects_api')).json()['projects'][0]
+        self.assertEqual(card['technologies'], ['Django', 'Python'])
+        self.assertEqual(card['created_date'], self.project.created_date.strftime('%B %Y'))
+        self.assertIsNone(card['image'])
+
+    def test_sparse_fieldsets(self):
+        data = self.client.get(reverse('projects_api'), {'cursor': '', 'fields': 'id,title'}).json()
+        self.assertEqual(data['projects'], [{'id': self.project.id, 'title': 'Proj'}])
+        resp = self.client.get(reverse('project_detail_api', args=[self.project.id]), {'fields': 'id,secret'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('secret', resp.json()['message'])
+
+    def test_project_detail_api_includes_pending_counters(self):
+        cache.clear()
+        with override_settings(COUNTER_FLUSH_INTERVAL=None):
+            counters.increment(self.project.id, 'views', 2)
+            data = self.client.get(reverse('project_detail_api', args=[self.project.id])).json()
+        self.assertEqual((data['views'], data['technologies']), (2, ['Python']))
+        self.assertEqual(data['rating'], {'average': 0, 'count': 0, 'histogram': [0, 0, 0, 0, 0]})
+        resp = self.client.get(reverse('project_detail_api', args=[999]))
+        self.assertEqual(resp.status_code, 404)
+
 
 class ContactFormTests(TestCase):
     def setUp(self):
@@ -55,6 +130,1408 @@ class ContactFormTests(TestCase):
         # Should not create message
         self.assertEqual(Contact.objects.count(), 0)
         self.assertEqual(resp.status_code, 200)
+
+    def test_contact_form_submitted_too_fast(self):
+        resp = self.client.post(reverse('contact'), {
+            'name': 'Bot', 'email': 'bot@example.com', 'subject': 'Spam', 'message': 'Spam',
+            'website': '', 'timestamp': str(int(time.time()))
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(Contact.objects.count(), 0)
+
+    def test_contact_form_timestamp_rendered(self):
+        resp = self.client.get(reverse('contact'))
+        self.assertContains(resp, 'name="timestamp"')
+        self.assertRegex(resp.content.decode(), r'name="timestamp" value="\d+"')
+
+
+@override_settings(THROTTLE_RATES={'contact': '2/m', 'api': '3/m'})
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        Profile.objects.create(name='Test User', title='Dev', bio='Bio', email='test@example.com')
+
+    def test_api_rejected_over_budget(self):
+        url = reverse('skills_api')
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        with self.assertNumQueries(0):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(resp.json()['success'], False)
+        self.assertGreaterEqual(int(resp['Retry-After']), 1)
+        # Budgets are per client address
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_forged_forwarded_for_keeps_the_budget(self):
+        url = reverse('skills_api')
+        statuses = [
+            self.client.get(url, HTTP_X_FORWARDED_FOR=f'192.0.2.{i}, 10.0.0.1').status_code
+            for i in range(4)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_contact_throttles_posts_only(self):
+        data = {'name': 'Alice', 'email': 'alice@example.com', 'subject': 'Hi', 'message': 'Test', 'website': '', 'timestamp': ''}
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse('contact'), data).status_code, 302)
+        self.assertEqual(self.client.post(reverse('contact'), data).status_code, 429)
+        self.assertEqual(self.client.get(reverse('contact')).status_code, 200)
+        self.assertEqual(Contact.objects.count(), 2)
+
+    def test_sliding_window_weighs_previous_window(self):
+        # Two requests at the end of one window, then halfway into the next
+        self.assertIsNone(throttling.check('contact', 'ip', now=6000 + 59))
+        self.assertIsNone(throttling.check('contact', 'ip', now=6000 + 59))
+        # 2 * 0.5 + 0 = 1 request in the last minute: one more is allowed
+        self.assertIsNone(throttling.check('contact', 'ip', now=6060 + 30))
+        self.assertIsNotNone(throttling.check('contact', 'ip', now=6060 + 30))
+        # Once the previous window has slid out, the budget is back
+        self.assertIsNone(throttling.check('contact', 'ip', now=6120 + 59))
+
+    def test_unconfigured_scope_is_not_throttled(self):
+        for _ in range(10):
+            self.assertIsNone(throttling.check('search', 'ip'))
+
+
+class FailingEmailBackend(LocmemEmailBackend):
+    def send_messages(self, messages):
+        raise OSError('SMTP server unavailable')
+
+
+class ObservingEmailBackend(LocmemEmailBackend):
+    """Records whether a transaction is open and what other senders find due, while sending."""
+    observed = []
+
+    def send_messages(self, messages):
+        due = OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=timezone.now()).count()
+        ObservingEmailBackend.observed.append((connection.in_atomic_block, due))
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        Profile.objects.create(name='Test User', title='Dev', bio='Bio', email='test@example.com')
+
+    def post_contact(self):
+        return self.client.post(reverse('contact'), {
+            'name': 'Alice', 'email': 'alice@example.com', 'subject': 'Hi', 'message': 'Test message',
+            'website': '', 'timestamp': ''
+        })
+
+    def test_contact_queues_email_without_sending(self):
+        self.post_contact()
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.recipients, 'test@example.com')
+        self.assertEqual(email.reply_to, 'alice@example.com')
+
+    def test_send_outbox_delivers_pending_emails(self):
+        self.post_contact()
+        self.post_contact()
+        out = StringIO()
+        call_command('send_outbox', stdout=out)
+        self.assertIn('Sent 2 email(s), 0 failed', out.getvalue())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].subject, 'Portfolio Contact: Hi')
+        self.assertEqual(mail.outbox[0].reply_to, ['alice@example.com'])
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+        # Nothing left to send
+        self.assertEqual(outbox.send_pending(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='portfolio.tests.FailingEmailBackend')
+    def test_failed_send_is_retried_with_backoff(self):
+        self.post_contact()
+        self.assertEqual(outbox.send_pending(), (0, 1))
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertIn('SMTP server unavailable', email.last_error)
+        self.assertGreater(email.next_attempt_at, email.created_date)
+        # Not due yet
+        self.assertEqual(outbox.send_pending(), (0, 0))
+        OutboxEmail.objects.update(next_attempt_at=email.created_date)
+        self.assertEqual(outbox.send_pending(max_attempts=2), (0, 1))
+        self.assertEqual(OutboxEmail.objects.get().status, 'failed')
+
+
+@override_settings(EMAIL_BACKEND='portfolio.tests.ObservingEmailBackend')
+class OutboxClaimTests(TransactionTestCase):
+    def test_sends_outside_the_claiming_transaction(self):
+        for subject in ('One', 'Two'):
+            outbox.enqueue(subject, 'Body', ['owner@example.com'])
+        ObservingEmailBackend.observed = []
+        self.assertEqual(outbox.send_pending(), (2, 0))
+        # No lock held, and the claimed rows are hidden from other senders
+        self.assertEqual(ObservingEmailBackend.observed, [(False, 0), (False, 0)])
+        self.assertEqual(set(OutboxEmail.objects.values_list('status', flat=True)), {'sent'})
 from django.test import TestCase
 
 # Create your tests here.
+
+
+# Context caching, below the full-page cache
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.profile = Profile.objects.create(
+            name='Test User', title='Developer', bio='Bio', email='test@example.com'
+        )
+        self.skill = Skill.objects.create(name='Python', proficiency=90, category='backend')
+        self.project = Project.objects.create(
+            title='Proj', description='Desc', short_description='Short desc', featured=True
+        )
+
+    def test_pages_served_from_cache(self):
+        for name in ('home', 'about', 'projects'):
+            self.client.get(reverse(name))
+            with self.assertNumQueries(0):
+                resp = self.client.get(reverse(name))
+            self.assertEqual(resp.status_code, 200)
+
+    def test_save_bumps_only_matching_tags(self):
+        before = dict(zip(('projects', 'skills'), get_tag_versions(('projects', 'skills'))))
+        self.project.title = 'Renamed'
+        self.project.save()
+        after = dict(zip(('projects', 'skills'), get_tag_versions(('projects', 'skills'))))
+        self.assertNotEqual(before['projects'], after['projects'])
+        self.assertEqual(before['skills'], after['skills'])
+
+    def test_edits_invalidate_cached_pages(self):
+        self.client.get(reverse('projects'))
+        self.project.technologies.add(self.skill)
+        resp = self.client.get(reverse('projects'))
+        self.assertContains(resp, 'badge bg-primary me-1 mb-1">Python')
+
+        self.project.delete()
+        resp = self.client.get(reverse('projects'))
+        self.assertContains(resp, 'No Projects Found')
+
+    def test_cached_stores_none(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+
+        cached('nothing', ('profile',), build)
+        cached('nothing', ('profile',), build)
+        self.assertEqual(len(calls), 1)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.django = Skill.objects.create(name='Django', proficiency=90, category='backend')
+        self.body_match = Project.objects.create(
+            title='Shop', description='An online shop built with django', short_description='Store'
+        )
+        self.title_match = Project.objects.create(
+            title='Django Blog', description='A blog', short_description='Writing'
+        )
+
+    def test_ranks_title_matches_first_and_supports_prefixes(self):
+        self.assertEqual(search_project_ids('djan'), [self.title_match.id, self.body_match.id])
+
+    def test_index_follows_technologies_and_deletes(self):
+        self.assertEqual(search_project_ids('writing django'), [self.title_match.id])
+        other = Project.objects.create(title='Tool', description='CLI', short_description='Util')
+        other.technologies.add(self.django)
+        self.assertIn(other.id, search_project_ids('django'))
+        self.django.name = 'Flask'
+        self.django.save()
+        self.assertNotIn(other.id, search_project_ids('django'))
+        self.title_match.delete()
+        self.assertEqual(search_project_ids('blog'), [])
+
+    def test_search_api_shape(self):
+        data = self.client.get(reverse('search_projects'), {'q': 'blog'}).json()
+        self.assertEqual(data['projects'], [{
+            'id': self.title_match.id,
+            'title': 'Django Blog',
+            'short_description': 'Writing',
+            'url': f'/project/{self.title_match.id}/',
+            'image': None,
+        }])
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Skill.objects.create(name='Django', proficiency=90, category='backend')
+        self.popular = Project.objects.create(
+            title='Django Shop', description='D', short_description='S', views=50
+        )
+        self.featured = Project.objects.create(
+            title='Django Blog', description='D', short_description='S', featured=True
+        )
+
+    def test_suggestions_ranked_without_queries(self):
+        autocomplete_index.suggest('dj')
+        with self.assertNumQueries(0):
+            labels = [s['label'] for s in autocomplete_index.suggest('dj')]
+        self.assertEqual(labels, ['Django Blog', 'Django Shop', 'Django'])
+        self.assertEqual([s['label'] for s in autocomplete_index.suggest('bl dja')], ['Django Blog'])
+
+    def test_incremental_updates(self):
+        autocomplete_index.suggest('dj')
+        self.popular.title = 'Flask Shop'
+        self.popular.save()
+        self.featured.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual([s['label'] for s in autocomplete_index.suggest('dj')], ['Django'])
+            self.assertEqual([s['label'] for s in autocomplete_index.suggest('fla')], ['Flask Shop'])
+
+    def test_unindexed_edits_keep_the_index(self):
+        autocomplete_index.suggest('dj')
+        self.popular.description = 'Rewritten'
+        self.popular.save()
+        bump_tags('projects', 'skills')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(autocomplete_index.suggest('dj')), 3)
+
+    def test_edit_from_another_worker_is_not_missed(self):
+        autocomplete_index.suggest('dj')
+        # Another worker renames a project, then we save one ourselves
+        Project.objects.filter(pk=self.popular.pk).update(title='Flask Shop')
+        bump_tags('autocomplete')
+        self.featured.title = 'Django Journal'
+        self.featured.save()
+        self.assertEqual([s['label'] for s in autocomplete_index.suggest('fla')], ['Flask Shop'])
+        self.assertEqual([s['label'] for s in autocomplete_index.suggest('jo')], ['Django Journal'])
+
+    def test_endpoint(self):
+        data = self.client.get(reverse('autocomplete'), {'q': 'shop', 'limit': 1}).json()
+        self.assertEqual(data['suggestions'], [{
+            'type': 'project', 'id': self.popular.id, 'label': 'Django Shop',
+            'url': f'/project/{self.popular.id}/',
+        }])
+
+
+@override_settings(COUNTER_FLUSH_INTERVAL=None)
+class CounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.project = Project.objects.create(title='Proj', description='D', short_description='S', views=10)
+
+    def test_views_buffered_until_flush(self):
+        url = reverse('project_detail', args=[self.project.id])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.views, 10)
+        data = self.client.get(reverse('project_detail_api', args=[self.project.id])).json()
+        self.assertEqual(data['views'], 12)
+
+        self.assertEqual(counters.flush(), 1)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.views, 12)
+        self.assertEqual(counters.pending([self.project.id])[self.project.id]['views'], 0)
+
+    def test_increments_after_flush_are_journaled_again(self):
+        other = Project.objects.create(title='Other', description='D', short_description='S')
+        counters.increment(self.project.id, 'views', 3)
+        counters.increment(other.id, 'bookmarks')
+        counters.flush()
+        counters.increment(self.project.id, 'views')
+        counters.flush()
+        self.project.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.project.views, other.bookmarks), (14, 1))
+
+    def test_flush_waits_for_a_journal_entry_being_written(self):
+        counters.increment(self.project.id, 'views', 2)
+        # A writer has taken the next sequence number but not written its entry
+        other = Project.objects.create(title='Other', description='D', short_description='S')
+        cache.set(counters._delta_key('views', other.id), 5)
+        cache.incr(counters.SEQ_KEY)
+        counters.increment(self.project.id, 'likes')
+        self.assertEqual(counters.flush(), 1)
+        cache.set(counters._journal_key(2), ('views', other.id))
+        self.assertEqual(counters.flush(), 2)
+        other.refresh_from_db()
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.views, self.project.likes, other.views), (12, 1, 5))
+
+    def test_flush_gives_up_on_a_journal_entry_never_written(self):
+        # Taken by a writer that died before writing its entry
+        cache.set(counters.SEQ_KEY, 1, None)
+        counters.increment(self.project.id, 'views')
+        self.assertEqual(counters.flush(), 0)
+        with mock.patch('portfolio.counters.JOURNAL_WAIT', 0):
+            self.assertEqual(counters.flush(), 1)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.views, 11)
+
+
+class EngagementTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(title='Proj', description='D', short_description='S')
+
+    def test_like_is_idempotent_per_ip(self):
+        url = reverse('like_project', args=[self.project.id])
+        first = self.client.post(url, REMOTE_ADDR='10.0.0.1').json()
+        again = self.client.post(url, REMOTE_ADDR='10.0.0.1').json()
+        other = self.client.post(url, REMOTE_ADDR='10.0.0.2').json()
+        self.assertEqual((first['created'], first['likes']), (True, 1))
+        self.assertEqual((again['created'], again['likes']), (False, 1))
+        self.assertEqual(other['likes'], 2)
+        self.assertEqual(self.project.project_likes.count(), 2)
+
+    def test_forged_forwarded_for_is_not_a_new_voter(self):
+        url = reverse('like_project', args=[self.project.id])
+        with override_settings(TRUSTED_PROXY_COUNT=1):
+            # The proxy appends the address it saw; earlier entries come from the client
+            self.client.post(url, HTTP_X_FORWARDED_FOR='1.1.1.1, 10.0.0.1')
+            again = self.client.post(url, HTTP_X_FORWARDED_FOR='2.2.2.2, 10.0.0.1').json()
+        self.assertEqual((again['created'], again['likes']), (False, 1))
+        with override_settings(TRUSTED_PROXY_COUNT=0):
+            self.client.post(url, HTTP_X_FORWARDED_FOR='3.3.3.3', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(self.project.project_likes.count(), 1)
+
+    def test_bookmark_per_session(self):
+        url = reverse('bookmark_project', args=[self.project.id])
+        self.assertTrue(self.client.post(url).json()['created'])
+        self.assertFalse(self.client.post(url).json()['created'])
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.bookmarks, 1)
+
+    def test_rating_upsert_and_validation(self):
+        url = reverse('rate_project', args=[self.project.id])
+        self.client.post(url, {'rating': 2})
+        self.client.post(url, {'rating': 5})
+        self.assertEqual(list(ProjectRating.objects.values_list('rating', flat=True)), [5])
+        self.assertEqual(self.client.post(url, {'rating': 9}).status_code, 400)
+
+    def test_rating_aggregates_follow_changes(self):
+        engagement.rate(self.project.id, '10.0.0.1', 4)
+        engagement.rate(self.project.id, '10.0.0.2', 2)
+        engagement.rate(self.project.id, '10.0.0.2', 5)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.rating_count, 2)
+        self.assertAlmostEqual(self.project.rating_avg, 4.5)
+        self.assertEqual(self.project.rating_histogram, [0, 0, 0, 1, 1])
+
+        Project.objects.update(rating_count=0, rating_sum=0, rating_avg=0, rating_4=0, rating_5=0)
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.rating_count, self.project.rating_sum), (2, 9))
+        self.assertEqual(self.project.rating_histogram, [0, 0, 0, 1, 1])
+
+    @override_settings(PAGE_CACHE_TIMEOUT=60)
+    def test_rebuilt_aggregates_drop_cached_pages(self):
+        engagement.rate(self.project.id, '10.0.0.1', 4)
+        urls = [reverse('home'), reverse('projects'), reverse('project_detail', args=[self.project.id])]
+        for url in urls:
+            self.client.get(url)
+        Project.objects.update(rating_count=0, rating_sum=0, rating_avg=0, rating_4=0)
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(Client().get(url)['X-Page-Cache'], 'miss')
+
+    def test_unknown_project(self):
+        resp = self.client.post(reverse('like_project', args=[999]))
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(self.client.get(reverse('like_project', args=[self.project.id])).status_code, 405)
+
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        self.projects = [
+            Project.objects.create(title=f'P{i}', description='D', short_description='S') for i in range(3)
+        ]
+
+    def test_single_urlset_with_lastmod_and_304(self):
+        resp = self.client.get(reverse('sitemap'))
+        body = b''.join(resp.streaming_content).decode()
+        self.assertIn('<urlset', body)
+        self.assertEqual(body.count('<url>'), 7)
+        self.assertIn(f'/project/{self.projects[0].id}/</loc><lastmod>', body)
+
+        resp = self.client.get(reverse('sitemap'), HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+        self.projects[0].save()
+        resp = self.client.get(reverse('sitemap'), HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 200)
+
+    @override_settings(SITEMAP_SHARD_SIZE=2)
+    def test_index_and_shards(self):
+        body = b''.join(self.client.get(reverse('sitemap')).streaming_content).decode()
+        self.assertIn('<sitemapindex', body)
+        shards = [int(n) for n in re.findall(r'sitemap-(\d+)\.xml', body)]
+        seen = 0
+        for shard in shards:
+            resp = self.client.get(reverse('sitemap_shard', args=[shard]))
+            seen += b''.join(resp.streaming_content).decode().count('<url>')
+        self.assertEqual(seen, 7)
+        self.assertEqual(self.client.get(reverse('sitemap_shard', args=[len(shards)])).status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.skill = Skill.objects.create(name='Python', proficiency=90, category='backend')
+        self.project = Project.objects.create(title='Proj', description='D', short_description='S')
+
+    def test_api_304_without_queries(self):
+        url = reverse('skills_api')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.skill.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_varies_with_query_and_page(self):
+        url = reverse('projects_api')
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url, {'page': 2})['ETag'])
+        etag = self.client.get(reverse('projects'))['ETag']
+        self.assertEqual(self.client.get(reverse('projects'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_detail_api_changes_with_likes(self):
+        url = reverse('project_detail_api', args=[self.project.id])
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            engagement.like(self.project.id, '10.0.0.1')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_contact_page_has_no_etag(self):
+        self.assertFalse(self.client.get(reverse('contact')).has_header('ETag'))
+
+
+class SyntheticDataTests(TestCase):
+    def populate(self):
+        call_command('populate_data', projects=30, skills=5, contacts=4, seed=3, batch_size=8, stdout=StringIO())
+
+    def test_scale_mode_creates_consistent_rows(self):
+        self.populate()
+        self.assertEqual(Project.objects.count(), 30)
+        self.assertEqual(Skill.objects.count(), 5)
+        self.assertEqual(Contact.objects.count(), 4)
+        self.assertTrue(Project.technologies.through.objects.exists())
+        project = Project.objects.filter(likes__gt=0, rating_count__gt=0).first()
+        self.assertEqual(project.likes, ProjectLike.objects.filter(project=project).count())
+        ratings = list(project.ratings.values_list('rating', flat=True))
+        self.assertEqual((project.rating_count, project.rating_sum), (len(ratings), sum(ratings)))
+        self.assertEqual(project.rating_histogram, [ratings.count(star) for star in range(1, 6)])
+        # bulk_create skips signals, so the search index is rebuilt explicitly
+        self.assertIn(project.pk, search_project_ids(project.title))
+
+    def test_same_seed_same_data(self):
+        self.populate()
+        self.populate()
+        titles = list(Project.objects.order_by('pk').values_list('title', 'views', 'likes'))
+        self.assertEqual(titles[:30], titles[30:])
+
+
+class ProjectQuerySetTests(TestCase):
+    def setUp(self):
+        self.skills = [Skill.objects.create(name=f'Skill {n}', proficiency=50, category='backend') for n in range(3)]
+        self.project = Project.objects.create(title='Proj', description='Long', short_description='Short')
+        self.project.technologies.add(*self.skills)
+        Project.objects.create(title='Bare', description='Long', short_description='Short')
+
+    def test_cards_skip_long_text_and_count_technologies(self):
+        cards = {project.title: project for project in Project.objects.cards()}
+        card = cards['Proj']
+        self.assertEqual(card.get_deferred_fields() & {'description', 'challenges', 'learned'},
+                         {'description', 'challenges', 'learned'})
+        self.assertEqual((card.tech_count, cards['Bare'].tech_count), (3, 0))
+        with self.assertNumQueries(0):
+            self.assertEqual(sorted(tech.name for tech in card.technologies.all()), ['Skill 0', 'Skill 1', 'Skill 2'])
+
+    def test_detail_loads_everything_in_two_queries(self):
+        with self.assertNumQueries(2):
+            project = Project.objects.detail().get(pk=self.project.pk)
+            self.assertEqual(project.description, 'Long')
+            self.assertEqual(project.tech_count, 3)
+            self.assertEqual(len([tech.icon for tech in project.technologies.all()]), 3)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, THROTTLE_RATES={})
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Profile.objects.create(name='Test User', title='Dev', bio='Bio', email='test@example.com')
+        Experience.objects.create(company='Acme', position='Dev', description='Work', start_date='2020-01-01')
+        skills = [Skill.objects.create(name=f'Skill {n}', proficiency=50 + n, category='backend') for n in range(4)]
+        self.projects = []
+        for n in range(8):
+            project = Project.objects.create(
+                title=f'Project {n}', description='Desc', short_description='Short', featured=n < 4)
+            project.technologies.add(*skills[:n % 4 + 1])
+            self.projects.append(project)
+
+    def requests(self):
+        pk = self.projects[0].pk
+        return [
+            ('get', reverse('home'), {}),
+            ('get', reverse('about'), {}),
+            ('get', reverse('projects'), {}),
+            ('get', reverse('projects') + '?tech=Skill', {}),
+            ('get', reverse('project_detail', args=[pk]), {}),
+            ('get', reverse('contact'), {}),
+            ('get', reverse('resume_download'), {}),
+            ('get', reverse('projects_api'), {}),
+            ('get', reverse('projects_api') + '?filter=Skill', {}),
+            ('get', reverse('projects_api') + '?cursor=&count=1', {}),
+            ('get', reverse('project_detail_api', args=[pk]), {}),
+            ('post', reverse('like_project', args=[pk]), {}),
+            ('post', reverse('bookmark_project', args=[pk]), {}),
+            ('post', reverse('rate_project', args=[pk]), {'rating': 4}),
+            ('get', reverse('skills_api'), {}),
+            ('get', reverse('search_projects') + '?q=project', {}),
+            ('get', reverse('autocomplete') + '?q=pro', {}),
+            ('get', reverse('contact_stats'), {}),
+            ('get', reverse('card_cache_stats'), {}),
+            ('get', reverse('sitemap'), {}),
+            ('get', reverse('robots'), {}),
+        ]
+
+    def test_views_within_query_budgets(self):
+        for method, url, data in self.requests():
+            with self.subTest(url=url):
+                cache.clear()
+                # Raises QueryBudgetExceeded on N+1 patterns or an exceeded budget
+                getattr(self.client, method)(url, data)
+
+    def test_home_tops_up_within_budget(self):
+        Project.objects.exclude(pk=self.projects[0].pk).update(featured=False)
+        cache.clear()
+        resp = self.client.get(reverse('home'))
+        self.assertEqual(
+            [project.pk for project in resp.context['featured_projects']],
+            [self.projects[0].pk, self.projects[7].pk, self.projects[6].pk],
+        )
+
+    def test_repeated_shape_detected(self):
+        with querybudget.record_queries() as recorder:
+            for project in Project.objects.all():
+                project.technologies.count()
+        self.assertEqual(recorder.count, 9)
+        shape, count = recorder.repeated(3)[0]
+        self.assertEqual(count, 8)
+        self.assertIn('COUNT(*)', shape)
+        self.assertNotRegex(shape, r'= \d')
+
+    def test_normalize(self):
+        self.assertEqual(
+            querybudget.normalize("SELECT * FROM t WHERE a IN (%s, %s,  %s) AND b = 'x' LIMIT 21"),
+            'SELECT * FROM t WHERE a IN (...) AND b = ? LIMIT ?',
+        )
+
+    @override_settings(QUERY_BUDGET_STRICT=False, QUERY_REPEAT_THRESHOLD=1)
+    def test_middleware_logs_in_production(self):
+        with self.assertLogs('portfolio.querybudget', 'WARNING') as logs:
+            self.client.get(reverse('skills_api'))
+        self.assertIn('skills_api', logs.output[0])
+
+
+class AsyncAPITests(TestCase):
+    def setUp(self):
+        cache.clear()
+        python = Skill.objects.create(name='Python', proficiency=90, category='backend')
+        django = Skill.objects.create(name='Django', proficiency=95, category='backend')
+        for i in range(8):
+            project = Project.objects.create(
+                title=f'Dashboard {i}', description='Django dashboard', short_description='Short', featured=i % 3 == 0
+            )
+            project.technologies.add(python, *([django] if i % 2 else []))
+        self.project_id = project.id
+
+    def requests(self):
+        return [
+            ('projects_api', (), {}),
+            ('projects_api', (), {'page': '2', 'filter': 'django'}),
+            ('projects_api', (), {'page': '99'}),
+            ('projects_api', (), {'cursor': '', 'limit': '3', 'count': '1', 'fields': 'id,technologies'}),
+            ('projects_api', (), {'cursor': 'bogus'}),
+            ('project_detail_api', (self.project_id,), {}),
+            ('project_detail_api', (999,), {}),
+            ('skills_api', (), {'fields': 'name'}),
+            ('search_projects', (), {'q': 'dashboard'}),
+            ('search_projects', (), {'q': 'dashboard', 'fields': 'nope'}),
+        ]
+
+    async def test_async_views_match_sync_views(self):
+        sync_factory, async_factory = RequestFactory(), AsyncRequestFactory()
+        for name, args, params in self.requests():
+            with self.subTest(view=name, params=params):
+                # The async views use the async ORM; the sync ones must run in a thread
+                expected = await sync_to_async(getattr(views, name))(sync_factory.get('/api/', params), *args)
+                actual = await getattr(api_views, name)(async_factory.get('/api/', params), *args)
+                self.assertEqual(actual.status_code, expected.status_code)
+                self.assertEqual(json.loads(actual.content), json.loads(expected.content))
+
+    @override_settings(THROTTLE_RATES={'api': '2/m'})
+    async def test_async_views_throttled(self):
+        factory = AsyncRequestFactory()
+        statuses = [(await api_views.skills_api(factory.get('/api/skills/'))).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    async def test_async_middleware_chain(self):
+        # Runs every middleware, including the hybrid WhiteNoise and query budget ones, on the event loop
+        response = await AsyncClient().get(reverse('skills_api'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['skills']), 2)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class ProjectCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        fragments.reset_stats()
+        self.skill = Skill.objects.create(name='Python', proficiency=90, category='backend')
+        self.projects = []
+        for n in range(3):
+            project = Project.objects.create(title=f'Project {n}', description='D', short_description='S')
+            project.technologies.add(self.skill)
+            self.projects.append(project)
+
+    def counts(self):
+        return fragments.stats()['grid']
+
+    def test_cards_rendered_once_until_project_changes(self):
+        html = self.client.get(reverse('projects')).content.decode()
+        self.assertIn('Project 2', html)
+        self.assertEqual(html.count('badge bg-primary me-1 mb-1">Python'), 3)
+        self.assertEqual((self.counts()['hits'], self.counts()['misses']), (0, 3))
+
+        self.projects[0].title = 'Renamed'
+        self.projects[0].save()
+        html = self.client.get(reverse('projects')).content.decode()
+        self.assertIn('Renamed', html)
+        self.assertEqual((self.counts()['hits'], self.counts()['misses']), (2, 4))
+
+    def test_technology_and_skill_changes_rerender(self):
+        django = Skill.objects.create(name='Django', proficiency=95, category='backend')
+        self.client.get(reverse('projects'))
+        self.projects[1].technologies.add(django)
+        html = self.client.get(reverse('projects')).content.decode()
+        self.assertIn('>Django</span>', html)
+        self.assertEqual(self.counts()['misses'], 4)
+
+        self.skill.name = 'CPython'
+        self.skill.save()
+        html = self.client.get(reverse('projects')).content.decode()
+        self.assertEqual(html.count('>CPython</span>'), 3)
+        self.assertEqual(self.counts()['misses'], 7)
+
+    def test_stats_endpoint_is_staff_only(self):
+        from django.contrib.auth import get_user_model
+
+        url = reverse('card_cache_stats')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.get(reverse('projects'))
+        self.client.force_login(get_user_model().objects.create_user('staff', password='x', is_staff=True))
+        data = self.client.get(url).json()['cards']
+        self.assertEqual(data['grid'], {'hits': 0, 'misses': 3, 'hit_rate': 0.0})
+        self.assertIsNone(data['related']['hit_rate'])
+
+
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Profile.objects.create(name='Test User', title='Dev', bio='Bio', email='test@example.com')
+        self.skill = Skill.objects.create(name='Python', proficiency=90, category='backend')
+        self.projects = []
+        for n in range(6):
+            project = Project.objects.create(title=f'Project {n}', description='D', short_description='S')
+            self.projects.append(project)
+        self.projects[0].technologies.add(self.skill)
+        # Newest first, so the oldest project is nobody's related project
+        self.oldest, self.newest = self.projects[0], self.projects[-1]
+
+    def get(self, url, **extra):
+        return Client().get(url, **extra)
+
+    def test_anonymous_pages_served_from_cache(self):
+        for name in ('home', 'about', 'projects'):
+            with self.subTest(page=name):
+                self.assertEqual(self.get(reverse(name))['X-Page-Cache'], 'miss')
+                with self.assertNumQueries(0):
+                    resp = self.get(reverse(name))
+                self.assertEqual((resp.status_code, resp['X-Page-Cache']), (200, 'hit'))
+
+    def test_query_string_normalized(self):
+        self.get(reverse('projects'), data={'tech': 'Python', 'utm_source': 'mail'})
+        resp = self.get(reverse('projects') + '?utm_medium=x&tech=Python')
+        self.assertEqual(resp['X-Page-Cache'], 'hit')
+        self.assertEqual(self.get(reverse('projects'), data={'tech': 'Go'})['X-Page-Cache'], 'miss')
+
+    def test_conditional_hit(self):
+        etag = self.get(reverse('about'))['ETag']
+        self.assertEqual(self.get(reverse('about'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_bypassed_with_cookies_and_forms(self):
+        client = Client()
+        client.cookies['sessionid'] = 'abc'
+        client.get(reverse('home'))
+        self.assertFalse(client.get(reverse('home')).has_header('X-Page-Cache'))
+        # The contact form needs a fresh CSRF token
+        self.get(reverse('contact'))
+        self.assertFalse(self.get(reverse('contact')).has_header('X-Page-Cache'))
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=None)
+    def test_detail_hits_count_views(self):
+        url = reverse('project_detail', args=[self.oldest.pk])
+        self.get(url)
+        self.assertEqual(self.get(url)['X-Page-Cache'], 'hit')
+        self.assertEqual(counters.pending([self.oldest.pk])[self.oldest.pk]['views'], 2)
+
+    def test_admin_edits_purge_affected_pages(self):
+        from django.contrib.auth import get_user_model
+
+        pages = [reverse('about'), reverse('projects'), reverse('project_detail', args=[self.oldest.pk]),
+                 reverse('project_detail', args=[self.newest.pk]), reverse('project_detail', args=[self.projects[3].pk])]
+        for url in pages:
+            self.get(url)
+        admin = Client()
+        admin.force_login(get_user_model().objects.create_superuser('admin', 'a@example.com', 'x'))
+        resp = admin.post(reverse('admin:portfolio_skill_change', args=[self.skill.pk]),
+                          {'name': 'CPython', 'proficiency': 90, 'category': 'backend', 'icon': ''})
+        self.assertEqual(resp.status_code, 302)
+
+        # Only the pages showing the skill are rebuilt
+        states = [self.get(url)['X-Page-Cache'] for url in pages]
+        self.assertEqual(states, ['miss', 'miss', 'miss', 'hit', 'hit'])
+        self.assertContains(self.get(pages[2]), 'CPython')
+
+        # The newest project is listed as related on every detail page
+        admin.post(reverse('admin:portfolio_project_delete', args=[self.newest.pk]), {'post': 'yes'})
+        self.assertEqual(self.get(pages[4])['X-Page-Cache'], 'miss')
+
+    def test_edits_outside_the_admin_drop_pages(self):
+        for name in ('about', 'projects'):
+            self.get(reverse(name))
+        Experience.objects.create(position='Engineer', company='Acme', start_date='2020-01-01',
+                                  description='Built things')
+        resp = self.get(reverse('about'))
+        self.assertEqual(resp['X-Page-Cache'], 'miss')
+        self.assertContains(resp, 'Acme')
+
+        self.oldest.title = 'Renamed'
+        self.oldest.save()
+        resp = self.get(reverse('projects'))
+        self.assertEqual(resp['X-Page-Cache'], 'miss')
+        self.assertContains(resp, 'Renamed')
+        self.get(reverse('projects'))
+        self.oldest.technologies.clear()
+        self.assertEqual(self.get(reverse('projects'))['X-Page-Cache'], 'miss')
+
+    def test_project_edits_keep_unrelated_pages(self):
+        # Neither the oldest project nor the second oldest is listed as related
+        pages = [reverse('about'), reverse('project_detail', args=[self.projects[3].pk]),
+                 reverse('project_detail', args=[self.oldest.pk]), reverse('project_detail', args=[self.projects[1].pk])]
+        for url in pages:
+            self.get(url)
+        self.oldest.title = 'Renamed'
+        self.oldest.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            engagement.rate(self.projects[1].pk, '10.0.0.1', 5)
+        self.assertEqual([self.get(url)['X-Page-Cache'] for url in pages], ['hit', 'hit', 'miss', 'miss'])
+
+    def test_likes_drop_the_detail_page(self):
+        url = reverse('project_detail', args=[self.oldest.pk])
+        self.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('like_project', args=[self.oldest.pk]))
+        self.assertEqual(self.get(url)['X-Page-Cache'], 'miss')
+
+
+class ResponsiveImageTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        self.settings_override = override_settings(MEDIA_ROOT=media)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        cache.clear()
+
+    def upload(self, size, mode='RGBA', name='shot.png'):
+        buffer = BytesIO()
+        Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_upload_generates_variants(self):
+        project = Project.objects.create(
+            title='P', description='D', short_description='S', image=self.upload((1600, 900)))
+        project.refresh_from_db()
+        self.assertEqual((project.image_width, project.image_height), (1600, 900))
+        for width in (320, 480, 768, 1200):
+            for extension, mode in (('webp', 'RGBA'), ('jpg', 'RGB')):
+                with default_storage.open(images.variant_name(project.image.name, width, extension)) as handle:
+                    variant = Image.open(handle)
+                    self.assertEqual((variant.size, variant.mode), ((width, round(900 * width / 1600)), mode))
+
+    def test_small_images_are_not_upscaled(self):
+        self.assertEqual(images.variant_widths(200), [200])
+        self.assertEqual(images.variant_widths(500), [320, 480, 500])
+        self.assertEqual(images.variant_widths(None), [])
+
+    def test_responsive_image_tag(self):
+        project = Project.objects.create(
+            title='P', description='D', short_description='S', image=self.upload((600, 400), 'RGB'))
+        html = Template('{% load responsive_images %}{% responsive_image project.image "Shot" class_="card-img-top" %}'
+                        ).render(Context({'project': project}))
+        self.assertIn('<source type="image/webp" srcset="/media/variants/projects/shot', html)
+        self.assertIn('.480w.webp 480w, ', html)
+        self.assertIn('width="600" height="400" alt="Shot" class="card-img-top" decoding="async" loading="lazy"', html)
+
+        Project.objects.filter(pk=project.pk).update(image_width=None, image_height=None)
+        project.refresh_from_db()
+        html = Template('{% load responsive_images %}{% responsive_image project.image "Shot" %}'
+                        ).render(Context({'project': project}))
+        self.assertTrue(html.startswith(f'<img src="{project.image.url}" alt="Shot"'))
+
+    def variant_exists(self, name, width):
+        return default_storage.exists(images.variant_name(name, width, 'webp'))
+
+    def test_replaced_and_deleted_images_lose_their_variants(self):
+        project = Project.objects.create(
+            title='P', description='D', short_description='S', image=self.upload((600, 400), 'RGB'))
+        first = project.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            project.image = self.upload((500, 400), 'RGB', 'other.png')
+            project.save()
+        self.assertFalse(self.variant_exists(first, 600))
+        self.assertTrue(self.variant_exists(project.image.name, 500))
+        with self.captureOnCommitCallbacks(execute=True):
+            project.delete()
+        self.assertFalse(self.variant_exists(project.image.name, 500))
+
+    @override_settings(IMAGE_VARIANTS_ON_SAVE=False)
+    def test_generation_deferred_to_the_command(self):
+        project = Project.objects.create(
+            title='P', description='D', short_description='S', image=self.upload((600, 400), 'RGB'))
+        project.refresh_from_db()
+        self.assertIsNone(project.image_width)
+        self.assertFalse(self.variant_exists(project.image.name, 600))
+        call_command('generate_image_variants', stdout=StringIO())
+        project.refresh_from_db()
+        self.assertEqual(project.image_width, 600)
+        self.assertTrue(self.variant_exists(project.image.name, 600))
+
+    def test_command_processes_existing_uploads(self):
+        profile = Profile.objects.create(name='N', title='T', bio='B', email='n@example.com',
+                                         profile_image=self.upload((400, 400), 'RGB', 'me.png'))
+        Profile.objects.update(profile_image_width=None, profile_image_height=None)
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        profile.refresh_from_db()
+        self.assertEqual(profile.profile_image_width, 400)
+        self.assertIn('Processed 1 image(s), 0 failed', out.getvalue())
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.media, self.thumbs = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        self.addCleanup(shutil.rmtree, self.thumbs)
+        override = override_settings(MEDIA_ROOT=self.media, THUMBNAIL_CACHE_DIR=self.thumbs)
+        override.enable()
+        self.addCleanup(override.disable)
+        thumbnails._size['bytes'] = None
+        os.makedirs(os.path.join(self.media, 'testimonials'))
+        Image.new('RGB', (800, 400), (10, 120, 200)).save(os.path.join(self.media, 'testimonials', 'jane.jpg'))
+
+    def url(self, width, height, path='testimonials/jane.jpg'):
+        return thumbnails.thumbnail_url(path, width, height)
+
+    def fetch(self, width, height):
+        resp = self.client.get(self.url(width, height))
+        self.assertEqual(resp.status_code, 200)
+        return resp, Image.open(BytesIO(b''.join(resp.streaming_content)))
+
+    def test_builds_and_serves_derivative(self):
+        resp, image = self.fetch(100, 100)
+        self.assertEqual((image.size, resp['Content-Type']), ((100, 100), 'image/jpeg'))
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertTrue(os.path.isfile(os.path.join(self.thumbs, '100x100', 'testimonials', 'jane.jpg')))
+        self.assertEqual(self.fetch(200, 0)[1].size, (200, 100))
+        # Never upscaled
+        self.assertEqual(self.fetch(0, 1000)[1].size, (800, 400))
+
+    def test_invalid_requests(self):
+        for url in (self.url(100, 100, 'testimonials/missing.jpg'), self.url(5000, 10), self.url(0, 0),
+                    self.url(10, 10, '../settings.py'), self.url(10, 10, 'testimonials/../../x.png')):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_unsigned_sizes_refused(self):
+        unsigned = reverse('thumbnail', kwargs={'width': 123, 'height': 45, 'path': 'testimonials/jane.jpg'})
+        self.assertEqual(self.client.get(unsigned).status_code, 404)
+        self.assertEqual(self.client.get(unsigned + '?s=forged').status_code, 404)
+        self.assertEqual(self.client.get(self.url(123, 45)).status_code, 200)
+        with override_settings(THUMBNAIL_SIZES={(123, 45)}):
+            self.assertEqual(self.client.get(unsigned).status_code, 200)
+
+    def test_corrupt_image_is_not_found(self):
+        with open(os.path.join(self.media, 'testimonials', 'broken.png'), 'wb') as handle:
+            handle.write(b'not a png')
+        self.assertEqual(self.client.get(self.url(50, 50, 'testimonials/broken.png')).status_code, 404)
+
+    def test_concurrent_requests_resize_once(self):
+        import threading
+
+        calls, real_render = [], thumbnails.render
+
+        def slow_render(*args):
+            calls.append(1)
+            time.sleep(0.05)
+            return real_render(*args)
+
+        with mock.patch.object(thumbnails, 'render', slow_render):
+            workers = [threading.Thread(target=thumbnails.get_thumbnail, args=('testimonials/jane.jpg', 64, 64))
+                       for _ in range(6)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        self.assertEqual(len(calls), 1)
+
+    def test_least_recently_used_evicted(self):
+        paths = [thumbnails.get_thumbnail('testimonials/jane.jpg', width, 0)[0] for width in (300, 200, 100)]
+        # Reading the oldest derivative makes it the most recently used
+        os.utime(paths[1], (1, 1))
+        os.utime(paths[2], (2, 2))
+        os.utime(paths[0], (3, 3))
+        keep = paths[0].stat().st_size
+        self.assertEqual(thumbnails.evict(max_bytes=int(keep / thumbnails.EVICT_TO) + 1), 2)
+        self.assertEqual([path.exists() for path in paths], [True, False, False])
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        override = override_settings(MEDIA_ROOT=self.media, MEDIA_ACCEL_LOCATIONS={self.media: '/internal/media/'})
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(self.media, 'documents'))
+        self.data = bytes(range(256)) * 40
+        with open(os.path.join(self.media, 'documents', 'cv 2024.pdf'), 'wb') as handle:
+            handle.write(self.data)
+        self.url = reverse('media', args=['documents/cv 2024.pdf'])
+
+    def body(self, resp):
+        return b''.join(resp.streaming_content)
+
+    def test_full_and_conditional(self):
+        resp = self.client.get(self.url)
+        self.assertEqual((resp.status_code, resp['Content-Type'], resp['Accept-Ranges']), (200, 'application/pdf', 'bytes'))
+        self.assertEqual(self.body(resp), self.data)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 304)
+
+    def test_ranges(self):
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual((resp.status_code, resp['Content-Range'], resp['Content-Length']),
+                         (206, f'bytes 100-199/{len(self.data)}', '100'))
+        self.assertEqual(self.body(resp), self.data[100:200])
+        self.assertEqual(self.body(self.client.get(self.url, HTTP_RANGE='bytes=-10')), self.data[-10:])
+        self.assertEqual(self.body(self.client.get(self.url, HTTP_RANGE='bytes=10000-')), self.data[10000:])
+        resp = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.data)}-')
+        self.assertEqual((resp.status_code, resp['Content-Range']), (416, f'bytes */{len(self.data)}'))
+        # An invalid range is ignored
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=5-2').status_code, 200)
+        # A stale If-Range gets the whole file
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_proxy_handoff(self):
+        with override_settings(MEDIA_ACCEL='X-Accel-Redirect'):
+            resp = self.client.get(self.url)
+        self.assertEqual(resp['X-Accel-Redirect'], '/internal/media/documents/cv%202024.pdf')
+        self.assertEqual(resp.content, b'')
+        with override_settings(MEDIA_ACCEL='X-Sendfile'):
+            resp = self.client.get(self.url)
+        self.assertEqual(resp['X-Sendfile'], os.path.join(os.path.realpath(self.media), 'documents', 'cv 2024.pdf'))
+
+    def test_outside_media_root(self):
+        for path in ('../etc/passwd', 'documents/missing.pdf', 'documents'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(reverse('media', args=[path])).status_code, 404)
+
+    def test_resume_download_serves_file(self):
+        Profile.objects.create(name='N', title='T', bio='B', email='n@example.com', resume='documents/cv 2024.pdf')
+        resp = self.client.get(reverse('resume_download'))
+        self.assertEqual(resp['Content-Disposition'], "attachment; filename*=UTF-8''cv%202024.pdf")
+        self.assertEqual(self.body(resp), self.data)
+        self.assertEqual(self.body(self.client.get(reverse('resume_download'), HTTP_RANGE='bytes=0-3')), self.data[:4])
+
+
+class CacheContractTests:
+    """Behaviour every cache backend of the project must share with Django's; ``make_cache`` returns a fresh one."""
+
+    def make_cache(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.cache = self.make_cache()
+        self.cache.clear()
+
+    def test_get_set_delete(self):
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+        self.cache.set('key', {'a': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'a': [1, 2]})
+        self.assertTrue(self.cache.has_key('key'))
+        self.assertTrue(self.cache.delete('key'))
+        self.assertFalse(self.cache.delete('key'))
+        self.assertFalse(self.cache.has_key('key'))
+
+    def test_add_and_versions(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+        self.cache.set('key', 'v2', version=2)
+        self.assertEqual((self.cache.get('key'), self.cache.get('key', version=2)), (1, 'v2'))
+
+    def test_many(self):
+        self.assertEqual(self.cache.set_many({'a': 1, 'b': 2, 'c': 3}), [])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'x']), {'a': 1, 'b': 2})
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': 3})
+
+    def test_incr_decr(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('counter')
+        self.cache.set('counter', 10)
+        self.assertEqual(self.cache.incr('counter', 5), 15)
+        self.assertEqual(self.cache.decr('counter'), 14)
+        self.assertEqual(self.cache.get('counter'), 14)
+
+    def test_timeouts(self):
+        self.cache.set('gone', 1, 0)
+        self.assertIsNone(self.cache.get('gone'))
+        self.cache.set('short', 1, 1)
+        self.cache.set('forever', 1, None)
+        self.assertTrue(self.cache.touch('forever', 1))
+        self.assertFalse(self.cache.touch('missing'))
+        time.sleep(1.1)
+        self.assertEqual(self.cache.get_many(['short', 'forever']), {})
+
+    def test_values_are_copies(self):
+        value = {'items': [1]}
+        self.cache.set('key', value)
+        value['items'].append(2)
+        self.cache.get('key')['items'].append(3)
+        self.assertEqual(self.cache.get('key'), {'items': [1]})
+
+    def test_clear(self):
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.clear()
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_async_incr(self):
+        self.cache.set('counter', 1, 60)
+        self.assertEqual(async_to_sync(self.cache.aincr)('counter', 2), 3)
+        self.assertEqual(async_to_sync(self.cache.aget)('counter'), 3)
+
+
+TWO_TIER_L2 = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'two-tier-tests'}
+
+
+@override_settings(CACHES={**settings.CACHES, 'two-tier-l2': TWO_TIER_L2})
+class TwoTierCacheTests(CacheContractTests, TestCase):
+    def make_cache(self, **options):
+        options = {'STAMP_INTERVAL': 0, 'L1_BYPASS': ('counter:',), **options}
+        return cache_backends.TwoTierCache('two-tier-l2', {'OPTIONS': options})
+
+    def worker(self, **options):
+        # Another process: same L2, its own L1
+        other = self.make_cache(**options)
+        other._tier = cache_backends._Tier(other._buckets)
+        return other
+
+    def test_hits_are_served_from_l1(self):
+        fast = self.worker(STAMP_INTERVAL=60)
+        fast.set('key', 'value')
+        fast.get('key')
+        l2 = caches['two-tier-l2']
+        with mock.patch.object(l2, 'get', side_effect=AssertionError), \
+                mock.patch.object(l2, 'get_many', side_effect=AssertionError):
+            self.assertEqual(fast.get('key'), 'value')
+
+    def test_writes_invalidate_other_workers(self):
+        other = self.worker()
+        self.cache.set('key', 'old')
+        self.assertEqual(other.get('key'), 'old')
+        self.cache.set('key', 'new')
+        self.assertEqual(other.get('key'), 'new')
+        self.cache.set('number', 1)
+        self.assertEqual(other.get('number'), 1)
+        self.cache.incr('number')
+        self.assertEqual(other.get('number'), 2)
+        self.cache.delete('key')
+        self.assertIsNone(other.get('key'))
+
+    def test_stale_for_at_most_the_stamp_interval(self):
+        other = self.worker(STAMP_INTERVAL=60)
+        self.cache.set('key', 'old')
+        self.assertEqual(other.get('key'), 'old')
+        self.cache.set('key', 'new')
+        self.assertEqual(other.get('key'), 'old')
+        other._tier.checked = float('-inf')
+        self.assertEqual(other.get('key'), 'new')
+
+    def test_cleared_l2_is_noticed(self):
+        other = self.worker()
+        self.cache.set('key', 'value')
+        other.get('key')
+        caches['two-tier-l2'].clear()
+        self.assertIsNone(other.get('key'))
+
+    def test_bypassed_keys_are_never_held(self):
+        other = self.worker()
+        self.cache.set('counter:hits', 1)
+        other.get('counter:hits')
+        caches['two-tier-l2'].incr('counter:hits')
+        self.assertEqual(other.get('counter:hits'), 2)
+        self.assertEqual(len(other._tier.entries), 0)
+
+    def test_l1_is_bounded(self):
+        small = self.worker(L1_MAX_ENTRIES=3)
+        small.set_many({f'k{i}': i for i in range(6)})
+        small.get_many([f'k{i}' for i in range(5)])
+        small.get('k2')
+        small.get('k5')
+        self.assertEqual(list(small._tier.entries), [small.make_key(key) for key in ('k4', 'k2', 'k5')])
+
+    def test_racing_writers_leave_no_stale_copy(self):
+        other = self.worker()
+        bump = self.cache._bump
+
+        def bump_after_other_write(buckets):
+            # The other worker writes L2 between our write and our bump
+            other.set('key', 'theirs')
+            bump(buckets)
+
+        with mock.patch.object(self.cache, '_bump', bump_after_other_write):
+            self.cache.set('key', 'ours')
+        self.assertEqual(self.cache.get('key'), 'theirs')
+
+    def test_expiry_set_elsewhere_is_overrun_by_at_most_l1_timeout(self):
+        reader = self.worker(L1_TIMEOUT=1)
+        self.cache.set('key', 'value', 1)
+        self.assertEqual(reader.get('key'), 'value')
+        time.sleep(1.1)
+        self.assertIsNone(reader.get('key'))
+
+    def test_database_tier_is_not_a_view_query(self):
+        l2 = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'portfolio_cache_tests'}
+        with override_settings(CACHES={**settings.CACHES, 'two-tier-l2': l2}):
+            call_command('createcachetable', verbosity=0)
+            db_cache = self.make_cache()
+            db_cache.set('key', 'value')
+            with querybudget.record_queries() as recorder:
+                for _ in range(3):
+                    db_cache._tier.checked = float('-inf')
+                    self.assertEqual(db_cache.get('key'), 'value')
+            self.assertEqual(recorder.problems(budget=0), [])
+
+
+@override_settings(CACHES={**settings.CACHES, 'shared-db': {
+    'BACKEND': 'portfolio.cache_backends.DatabaseCache', 'LOCATION': 'portfolio_cache_tests',
+}})
+class DatabaseCacheTests(CacheContractTests, TestCase):
+    def make_cache(self):
+        call_command('createcachetable', verbosity=0)
+        return caches['shared-db']
+
+    def test_incr_keeps_the_expiry(self):
+        self.cache.set('forever', 1, None)
+        self.cache.set('short', 1, 1)
+        self.assertEqual(self.cache.incr('forever'), 2)
+        self.assertEqual(self.cache.incr('short'), 2)
+        time.sleep(1.1)
+        self.assertEqual(self.cache.get_many(['forever', 'short']), {'forever': 2})
+
+    def test_concurrent_increments_are_not_lost(self):
+        self.cache.set('counter', 1, None)
+        process_clob = connection.ops.process_clob
+        raced = []
+
+        def read_then_race(value):
+            # Another worker increments between our read and our write
+            if not raced:
+                raced.append(True)
+                self.cache.incr('counter', 10)
+            return process_clob(value)
+
+        with mock.patch.object(connection.ops, 'process_clob', read_then_race):
+            self.assertEqual(self.cache.incr('counter'), 12)
+        self.assertEqual(self.cache.get('counter'), 12)
+
+
+class FileBasedCacheTests(CacheContractTests, TestCase):
+    def make_cache(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        return cache_backends.FileBasedCache(directory, {})
+
+    def test_incr_keeps_the_expiry(self):
+        self.cache.set('forever', 1, None)
+        self.cache.set('short', 1, 1)
+        self.assertEqual(self.cache.incr('forever'), 2)
+        self.assertEqual(self.cache.incr('short'), 2)
+        time.sleep(1.1)
+        self.assertEqual(self.cache.get_many(['forever', 'short']), {'forever': 2})
+
+    def test_shared_between_processes(self):
+        self.cache.set('shared', 0, None)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_incr_in_process, args=(self.cache, 100)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('shared'), 400)
+
+
+def _incr_in_process(cache, times):
+    for _ in range(times):
+        cache.incr('shared')
+
+
+class MmapCacheTests(CacheContractTests, TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'cache.mmap')
+        self.addCleanup(cache_backends._tables.pop, self.path, None)
+        super().setUp()
+
+    def make_cache(self, **options):
+        options = {'MAX_ENTRIES': 64, 'WAYS': 4, 'SLOT_SIZE': 1024, **options}
+        return cache_backends.MmapCache(self.path, {'OPTIONS': options})
+
+    def test_bounded_with_lru_eviction(self):
+        self.assertEqual(os.path.getsize(self.path), cache_backends.HEADER_SIZE + 64 * 1024)
+        for i in range(200):
+            self.cache.set(f'key{i}', i)
+        self.assertEqual(sum(self.cache.has_key(f'key{i}') for i in range(200)), 64)
+        # Same set, 4 ways: touching the oldest entry makes the next one the victim
+        keys = [key for key in (f'k{i}' for i in range(2000)) if self.cache._locate(key, None)[2] == 0][:5]
+        for key in keys[:4]:
+            self.cache.set(key, key)
+            time.sleep(0.001)
+        self.cache.get(keys[0])
+        self.cache.set(keys[4], keys[4])
+        self.assertEqual([self.cache.has_key(key) for key in keys], [True, False, True, True, True])
+
+    def test_values_too_large_for_a_slot(self):
+        self.cache.set('big', 'small')
+        self.assertEqual(self.cache.set_many({'big': os.urandom(2000), 'ok': 1}), ['big'])
+        self.assertFalse(self.cache.add('other', os.urandom(2000)))
+        self.assertEqual(self.cache.get_many(['big', 'ok', 'other']), {'ok': 1})
+        # Compressible values are stored compressed
+        self.cache.set('page', '<p>text</p>' * 500)
+        self.assertEqual(self.cache.get('page'), '<p>text</p>' * 500)
+
+    def test_shared_between_processes(self):
+        self.cache.set('shared', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_incr_in_process, args=(self.make_cache(), 200)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('shared'), 800)
+
+    def test_geometry_change_starts_empty(self):
+        self.cache.set('key', 1)
+        # As after a restart with new settings
+        old = cache_backends._tables.pop(self.path)
+        self.assertEqual(self.make_cache(SLOT_SIZE=2048).get('key'), None)
+        cache_backends._tables.pop(self.path)
+        self.assertEqual(self.make_cache(SLOT_SIZE=512).get('key'), None)
+        self.assertEqual(os.path.getsize(self.path), cache_backends.HEADER_SIZE + 64 * 512)
+        # A worker still mapping the old file keeps reading it instead of crashing
+        cache_backends._tables[self.path] = old
+        self.assertEqual(self.cache.get('key'), 1)
+
+
+class StampedeProtectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def build(self, value='new'):
+        def builder():
+            self.calls.append(value)
+            return value
+        return builder
+
+    def expired(self, key, value='old', tags=()):
+        versions = tuple(get_tag_versions(tags)) if tags else ()
+        cache.set(key, (value, versions, time.time() - 1, 0.01), 60)
+
+    def test_concurrent_misses_build_once(self):
+        def slow():
+            time.sleep(0.2)
+            self.calls.append(1)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_or_compute('key', slow))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((results, self.calls), (['value'] * 8, [1]))
+        self.assertFalse(cache.has_key(LOCK_PREFIX + 'key'))
+
+    def test_expired_value_served_while_rebuilding(self):
+        self.expired('key')
+        cache.add(LOCK_PREFIX + 'key', 1)
+        self.assertEqual(get_or_compute('key', self.build()), 'old')
+        cache.delete(LOCK_PREFIX + 'key')
+        self.assertEqual(get_or_compute('key', self.build()), 'new')
+        self.assertEqual(get_or_compute('key', self.build()), 'new')
+        self.assertEqual(self.calls, ['new'])
+
+    def test_bumped_tags_are_never_served_stale(self):
+        self.expired('key', tags=('projects',))
+        bump_tags('projects')
+        cache.add(LOCK_PREFIX + 'key', 1)
+        with mock.patch('portfolio.cache.LOCK_WAIT', 0.1):
+            self.assertEqual(get_or_compute('key', self.build(), tags=('projects',)), 'new')
+
+    def test_slow_rebuild_keeps_the_next_owners_lock(self):
+        def slow():
+            # Our lock expired meanwhile and another caller took it
+            cache.delete(LOCK_PREFIX + 'key')
+            cache.add(LOCK_PREFIX + 'key', 'theirs')
+            return 'value'
+
+        self.assertEqual(get_or_compute('key', slow), 'value')
+        self.assertEqual(cache.get(LOCK_PREFIX + 'key'), 'theirs')
+
+    def test_failed_rebuild_serves_expired_value(self):
+        self.expired('key')
+
+        def broken():
+            raise RuntimeError('database down')
+
+        with self.assertLogs('portfolio.cache', 'ERROR'):
+            self.assertEqual(get_or_compute('key', broken), 'old')
+        with self.assertRaises(RuntimeError):
+            get_or_compute('other', broken)
+
+    def test_early_refresh_probability(self):
+        # -log(1 - 0.5) ~ 0.69: refresh once 0.69 x the last build time is left
+        with mock.patch('portfolio.cache.random.random', return_value=0.5):
+            cache.set('slow', ('old', (), time.time() + 5, 10.0), 60)
+            self.assertEqual(get_or_compute('slow', self.build()), 'new')
+            cache.set('fast', ('old', (), time.time() + 5, 1.0), 60)
+            self.assertEqual(get_or_compute('fast', self.build()), 'old')
+            cache.set('never', ('old', (), time.time() + 5, 10.0), 60)
+            self.assertEqual(get_or_compute('never', self.build(), beta=0), 'old')
+        self.assertEqual(self.calls, ['new'])
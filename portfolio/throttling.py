@@ -0,0 +1,149 @@
+"""
+Per-IP request throttling backed by the cache.
+
+Each scope (``contact``, ``search``, ...) gets a budget such as ``'5/m'`` in
+``settings.THROTTLE_RATES``. Requests are counted in fixed windows and the
+sliding-window estimate weighs the previous window by how much of it still
+overlaps the last ``period`` seconds, which smooths out bursts at window
+boundaries without storing a timestamp per request.
+
+Checking a request reads both windows with one ``get_many``; a rejected request
+stops there, so a flood costs one cache operation per request and never
+reaches the view or the database. Accepted requests add one ``incr``.
+"""
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+from .utils import get_client_ip
+
+PREFIX = 'portfolio:throttle:'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """``'5/m'`` -> ``(5, 60)``; ``None`` disables the scope."""
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0].lower()]
+
+
+def get_rate(scope):
+    return parse_rate(getattr(settings, 'THROTTLE_RATES', {}).get(scope))
+
+
+def _key(scope, ident, window):
+    return f'{PREFIX}{scope}:{ident}:{window}'
+
+
+def _plan(scope, ident, now):
+    rate = get_rate(scope)
+    if rate is None:
+        return None
+    limit, period = rate
+    now = time.time() if now is None else now
+    window, elapsed = divmod(now, period)
+    window = int(window)
+    return limit, period, elapsed, _key(scope, ident, window), _key(scope, ident, window - 1)
+
+
+def _verdict(plan, counts):
+    limit, period, elapsed, current_key, previous_key = plan
+    current = counts.get(current_key, 0)
+    previous = counts.get(previous_key, 0)
+    weight = 1 - elapsed / period
+    if previous * weight + current >= limit:
+        return _retry_after(previous, current, limit, elapsed, period)
+    return None
+
+
+def check(scope, ident, now=None):
+    """
+    Count a request from ``ident`` against ``scope``.
+
+    Returns ``None`` when the request is allowed, otherwise the number of
+    seconds after which it would be.
+    """
+    plan = _plan(scope, ident, now)
+    if plan is None:
+        return None
+    retry_after = _verdict(plan, cache.get_many(plan[3:]))
+    if retry_after is None:
+        current_key, period = plan[3], plan[1]
+        try:
+            cache.incr(current_key)
+        except ValueError:
+            # Both windows must outlive the one after them
+            if not cache.add(current_key, 1, period * 2):
+                cache.incr(current_key)
+    return retry_after
+
+
+async def acheck(scope, ident, now=None):
+    """``check`` for async views, using the cache's async API."""
+    plan = _plan(scope, ident, now)
+    if plan is None:
+        return None
+    retry_after = _verdict(plan, await cache.aget_many(plan[3:]))
+    if retry_after is None:
+        current_key, period = plan[3], plan[1]
+        try:
+            await cache.aincr(current_key)
+        except ValueError:
+            if not await cache.aadd(current_key, 1, period * 2):
+                await cache.aincr(current_key)
+    return retry_after
+
+
+def _retry_after(previous, current, limit, elapsed, period):
+    if current >= limit or not previous:
+        wait = period - elapsed
+    else:
+        # Wait until enough of the previous window has slid out
+        wait = period * (1 - (limit - 1 - current) / previous) - elapsed
+    return max(1, math.ceil(wait))
+
+
+def throttled_response(request, retry_after):
+    message = 'Too many requests. Please try again later.'
+    if request.path.startswith('/api/') or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        response = JsonResponse({'success': False, 'message': message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def throttle(scope, methods=None):
+    """
+    Reject requests over the ``scope`` budget with ``429 Too Many Requests``.
+
+    Only requests whose method is in ``methods`` are counted (all by default).
+    Works on sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapped(request, *args, **kwargs):
+                if methods is None or request.method in methods:
+                    retry_after = await acheck(scope, get_client_ip(request))
+                    if retry_after is not None:
+                        return throttled_response(request, retry_after)
+                return await view(request, *args, **kwargs)
+            return wrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = check(scope, get_client_ip(request))
+                if retry_after is not None:
+                    return throttled_response(request, retry_after)
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
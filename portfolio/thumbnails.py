@@ -0,0 +1,270 @@
+"""
+On-demand thumbnails of media images: ``/media/thumb/<w>x<h>/<path>``.
+
+The first request for a size builds the derivative with Pillow and writes it
+to ``THUMBNAIL_CACHE_DIR``; later requests are served straight from that
+file. With both dimensions the image is cropped to fill exactly ``w`` x ``h``;
+with one of them ``0`` it is scaled to the other, never up.
+
+Concurrent requests for a derivative that is not built yet wait for a single
+resize: threads of one process share a lock per derivative, and processes
+take an ``fcntl`` lock (where it exists) on one of ``LOCK_STRIPES`` lock
+files chosen by the derivative's name, so lock files never pile up.
+
+Every size and image would otherwise be a resize anyone can trigger, so the
+URLs carry a signature (``?s=``) made by ``thumbnail_url``, which is what
+``{% thumbnail_url %}`` renders. Sizes listed in ``THUMBNAIL_SIZES`` are also
+served unsigned.
+
+The cache is bounded to ``THUMBNAIL_CACHE_MAX_BYTES``. A hit bumps the file's
+modification time, so evicting the oldest files first evicts the least
+recently used. Eviction walks the directory, which only happens once the
+running size estimate of this process says the limit was crossed.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import SuspiciousFileOperation
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.utils.crypto import constant_time_compare
+from PIL import Image, ImageOps
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are coalesced
+    fcntl = None
+
+# Source extensions served, with the Pillow format and MIME type of the thumbnail
+FORMATS = {
+    '.jpg': ('JPEG', 'image/jpeg'),
+    '.jpeg': ('JPEG', 'image/jpeg'),
+    '.png': ('PNG', 'image/png'),
+    '.webp': ('WEBP', 'image/webp'),
+    '.gif': ('PNG', 'image/png'),
+}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 78, 'method': 4},
+}
+SIGNING_SALT = 'portfolio.thumbnails'
+LOCK_STRIPES = 64
+LOCK_DIR = '.locks'
+# Remove files until the cache is this much of its limit, so eviction is not
+# triggered again by the next write
+EVICT_TO = 0.9
+
+
+class InvalidThumbnail(ValueError):
+    pass
+
+
+def _max_bytes():
+    return getattr(settings, 'THUMBNAIL_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+
+def _cache_dir():
+    return Path(settings.THUMBNAIL_CACHE_DIR)
+
+
+def thumbnail_name(path, width, height):
+    """Name of the derivative; GIFs become PNGs."""
+    root, extension = os.path.splitext(path)
+    if extension.lower() == '.gif':
+        extension = '.png'
+    return f'{width}x{height}/{root}{extension}'
+
+
+def signature(path, width, height):
+    return signing.Signer(salt=SIGNING_SALT).signature(f'{width}x{height}/{path}')
+
+
+def thumbnail_url(path, width, height):
+    """Signed URL of the ``width`` x ``height`` thumbnail of the media file ``path``."""
+    url = reverse('thumbnail', kwargs={'width': width, 'height': height, 'path': path})
+    return f'{url}?s={signature(path, width, height)}'
+
+
+def authorized(path, width, height, given_signature):
+    """Whether a request may build this thumbnail: a listed size or a valid signature."""
+    if (width, height) in (getattr(settings, 'THUMBNAIL_SIZES', None) or ()):
+        return True
+    return bool(given_signature) and constant_time_compare(given_signature, signature(path, width, height))
+
+
+def resolve(path, width, height):
+    """Return ``(source, derivative, content_type)`` for a request, or raise ``InvalidThumbnail``."""
+    limit = getattr(settings, 'THUMBNAIL_MAX_SIZE', 2000)
+    if not (0 <= width <= limit and 0 <= height <= limit) or not (width or height):
+        raise InvalidThumbnail(f'Sizes must be at most {limit} pixels and not both 0')
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise InvalidThumbnail('Not an image')
+    try:
+        source = Path(safe_join(settings.MEDIA_ROOT, path))
+        derivative = Path(safe_join(_cache_dir(), thumbnail_name(path, width, height)))
+    except SuspiciousFileOperation:
+        raise InvalidThumbnail('Invalid path')
+    if not source.is_file():
+        raise InvalidThumbnail('No such image')
+    return source, derivative, FORMATS[extension][1]
+
+
+def render(source, width, height):
+    """Return the thumbnail of ``source`` as an image ready to save."""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if width and height:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    if not width:
+        width = round(image.width * height / image.height)
+    if not height:
+        height = round(image.height * width / image.width)
+    if width >= image.width:
+        return image
+    return image.resize((max(1, width), max(1, height)), Image.LANCZOS)
+
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _coalesced(derivative):
+    """Serialize builders of ``derivative`` across threads and, with ``fcntl``, processes."""
+    key = str(derivative)
+    with _locks_guard:
+        lock, users = _locks.get(key, (None, 0))
+        lock = lock or threading.Lock()
+        _locks[key] = (lock, users + 1)
+    try:
+        with lock:
+            if fcntl is None:
+                yield
+            else:
+                stripe = int(hashlib.md5(key.encode('utf-8')).hexdigest(), 16) % LOCK_STRIPES
+                lock_dir = _cache_dir() / LOCK_DIR
+                lock_dir.mkdir(parents=True, exist_ok=True)
+                with open(lock_dir / f'{stripe}.lock', 'w') as handle:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(handle, fcntl.LOCK_UN)
+    finally:
+        with _locks_guard:
+            lock, users = _locks[key]
+            if users == 1:
+                del _locks[key]
+            else:
+                _locks[key] = (lock, users - 1)
+
+
+def _fresh(derivative, source):
+    try:
+        return derivative.stat().st_mtime >= source.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def _write(derivative, image, format):
+    derivative.parent.mkdir(parents=True, exist_ok=True)
+    if format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    # Readers never see a half-written file
+    fd, temporary = tempfile.mkstemp(dir=derivative.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            image.save(handle, format, **SAVE_OPTIONS[format])
+        os.replace(temporary, derivative)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return derivative.stat().st_size
+
+
+def get_thumbnail(path, width, height):
+    """
+    Return ``(file path, content type)`` of the ``width`` x ``height`` thumbnail
+    of the media file ``path``, building it if needed.
+    """
+    source, derivative, content_type = resolve(path, width, height)
+    if _fresh(derivative, source):
+        # Mark as recently used for the LRU eviction
+        os.utime(derivative)
+        return derivative, content_type
+    with _coalesced(derivative):
+        # Someone else may have built it while we waited
+        if not _fresh(derivative, source):
+            format = FORMATS[os.path.splitext(path)[1].lower()][0]
+            try:
+                image = render(source, width, height)
+            except (OSError, Image.DecompressionBombError):
+                # Corrupt, truncated or not an image after all
+                raise InvalidThumbnail('Not a readable image')
+            size = _write(derivative, image, format)
+            _account(size)
+    return derivative, content_type
+
+
+_size = {'bytes': None}
+_size_guard = threading.Lock()
+
+
+def _account(written):
+    with _size_guard:
+        if _size['bytes'] is None:
+            _size['bytes'] = cache_size()
+        else:
+            _size['bytes'] += written
+        over = _size['bytes'] > _max_bytes()
+    if over:
+        evict()
+
+
+def _entries():
+    for directory, directories, files in os.walk(_cache_dir()):
+        if LOCK_DIR in directories:
+            directories.remove(LOCK_DIR)
+        for name in files:
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield stat.st_mtime, stat.st_size, path
+
+
+def cache_size():
+    return sum(size for _, size, _ in _entries())
+
+
+def evict(max_bytes=None):
+    """Delete least recently used derivatives until the cache is under ``EVICT_TO`` of its limit."""
+    max_bytes = _max_bytes() if max_bytes is None else max_bytes
+    entries = sorted(_entries())
+    total = sum(size for _, size, _ in entries)
+    target = max_bytes * EVICT_TO if total > max_bytes else total
+    removed = 0
+    for _, size, path in entries:
+        if total <= target:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    with _size_guard:
+        _size['bytes'] = total
+    return removed
@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api_views, views
+
+# Read-only JSON APIs: async implementations when served over ASGI
+api = api_views if settings.ASYNC_API else views
 
 urlpatterns = [
     # Main pages
@@ -9,14 +13,54 @@ urlpatterns = [
     path('project/<int:project_id>/', views.project_detail, name='project_detail'),
     path('contact/', views.contact, name='contact'),
     path('resume/', views.resume_download, name='resume_download'),
+    path(f"{settings.MEDIA_URL.lstrip('/')}thumb/<int:width>x<int:height>/<path:path>",
+         views.thumbnail, name='thumbnail'),
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", views.serve_media, name='media'),
     
     # API endpoints
-    path('api/projects/', views.projects_api, name='projects_api'),
-    path('api/project/<int:project_id>/', views.project_detail_api, name='project_detail_api'),
-    path('api/skills/', views.skills_api, name='skills_api'),
-    path('api/search/projects/', views.search_projects, name='search_projects'),
+    path('api/projects/', api.projects_api, name='projects_api'),
+    path('api/project/<int:project_id>/', api.project_detail_api, name='project_detail_api'),
+    path('api/project/<int:project_id>/like/', views.like_project, name='like_project'),
+    path('api/project/<int:project_id>/bookmark/', views.bookmark_project, name='bookmark_project'),
+    path('api/project/<int:project_id>/rate/', views.rate_project, name='rate_project'),
+    path('api/skills/', api.skills_api, name='skills_api'),
+    path('api/search/projects/', api.search_projects, name='search_projects'),
+    path('api/autocomplete/', views.autocomplete, name='autocomplete'),
     path('api/contact/stats/', views.contact_stats, name='contact_stats'),
+    path('api/cache/cards/', views.card_cache_stats, name='card_cache_stats'),
     # SEO files
     path('sitemap.xml', views.sitemap_xml, name='sitemap'),
+    path('sitemap-<int:shard>.xml', views.sitemap_shard, name='sitemap_shard'),
     path('robots.txt', views.robots_txt, name='robots'),
 ]
+
+# Most SQL queries each view may run with a cold cache, checked by
+# portfolio.querybudget.QueryBudgetMiddleware (and enforced in the tests)
+QUERY_BUDGETS = {
+    'home': 6,
+    'about': 4,
+    'projects': 3,
+    'project_detail': 4,
+    # Posting saves the message and queues its email
+    'contact': 3,
+    'resume_download': 1,
+    'thumbnail': 0,
+    'media': 0,
+    'projects_api': 3,
+    'project_detail_api': 2,
+    'like_project': 3,
+    # Includes creating the session the bookmark is tied to
+    'bookmark_project': 5,
+    # Changing an existing rating locks and rewrites it
+    'rate_project': 5,
+    'skills_api': 1,
+    'search_projects': 2,
+    'autocomplete': 2,
+    # Session and user lookups for the staff check, then three stats queries
+    'contact_stats': 5,
+    # Only the staff check; the counters live in the cache
+    'card_cache_stats': 2,
+    'sitemap': 1,
+    'sitemap_shard': 1,
+    'robots': 0,
+}
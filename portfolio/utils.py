@@ -0,0 +1,20 @@
+from django.conf import settings
+
+
+def get_client_ip(request):
+    """
+    Best-effort client address, for rate limiting and dedup.
+
+    Every proxy appends the address it received the request from to
+    ``X-Forwarded-For``, and anything before that was sent by the client, so
+    only the last ``TRUSTED_PROXY_COUNT`` entries can be believed. The
+    ``TRUSTED_PROXY_COUNT``-th entry from the end is the client as seen by the
+    outermost trusted proxy. With no trusted proxies the header is ignored.
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        entries = [entry.strip() for entry in forwarded.split(',')]
+        if len(entries) >= proxies:
+            return entries[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
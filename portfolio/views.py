@@ -1,42 +1,72 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods, require_POST
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Max, Q
 from .models import Project, Skill, Experience, Education, Profile, Contact
 from .forms import ContactForm
+from . import counters, engagement, fragments, outbox, thumbnails
+from .media import serve_file
+from .utils import get_client_ip
+from .cache import cached, get_tag_versions
+from .conditional import conditional
+from .pagecache import page_cache
+from .throttling import throttle
+from .search import search_project_ids
+from .autocomplete import index as autocomplete_index
+from .serializers import (
+    ContactSummarySerializer, InvalidFields, ProjectCardSerializer, ProjectDetailSerializer,
+    ProjectSearchSerializer, SkillSerializer,
+)
+from .pagination import InvalidCursor, PROJECT_ORDERING, encode_cursor, paginate_by_cursor
 import json
-from django.http import HttpResponse
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
 from django.urls import reverse
+from django.utils.html import escape
+import hashlib
+import logging
+import os
 
-# Simple caching placeholder (could integrate cache framework later)
+logger = logging.getLogger(__name__)
 
+# Upper bound for client-supplied page sizes
+MAX_PAGE_SIZE = 50
 
+
+def get_profile():
+    """Return the site profile, cached until it is edited"""
+    return cached('profile', ('profile',), Profile.objects.first)
+
+
+def build_home_context():
+    # Featured projects sort first, so one query returns them and, when fewer
+    # than 3 are featured, the projects that top them up to 3
+    projects = list(Project.objects.cards().order_by(*PROJECT_ORDERING)[:6])
+    featured_count = sum(project.featured for project in projects)
+    featured_projects = projects[:max(featured_count, 3)]
+
+    return {
+        'profile': get_profile(),
+        'featured_projects': featured_projects,
+        # "Load more" continues the API listing right after the last card shown
+        'next_cursor': encode_cursor(featured_projects[-1]) if featured_projects else '',
+        'skills': list(Skill.objects.all()[:8]),  # Top 8 skills
+        'experiences': list(Experience.objects.order_by('-start_date')[:3]),  # Recent 3 experiences
+    }
+
+
+@page_cache
+@conditional('profile', 'projects', 'skills', 'experiences')
 def home(request):
     """Home page view with featured projects and skills"""
     try:
-        profile = Profile.objects.first()
-        
-        # Get featured projects first, then fill with other projects if needed
-        featured_projects = Project.objects.filter(featured=True)[:6]
-        if featured_projects.count() < 3:
-            # If we don't have 3 featured projects, get additional projects to make at least 3
-            additional_projects = Project.objects.filter(featured=False)[:3-featured_projects.count()]
-            featured_projects = list(featured_projects) + list(additional_projects)
-        
-        skills = Skill.objects.all()[:8]  # Top 8 skills
-        experiences = Experience.objects.order_by('-start_date')[:3]  # Recent 3 experiences
-        
-        context = {
-            'profile': profile,
-            'featured_projects': featured_projects,
-            'skills': skills,
-            'experiences': experiences,
-        }
+        context = cached('home', ('profile', 'projects', 'skills', 'experiences'), build_home_context)
         return render(request, 'portfolio/home.html', context)
     except Exception as e:
         # Fallback context in case of any errors
@@ -49,55 +79,78 @@ def home(request):
         return render(request, 'portfolio/home.html', context)
 
 
+@page_cache
+@conditional('profile', 'experiences', 'education', 'skills')
 def about(request):
     """About page with detailed profile, experience, and education"""
-    profile = Profile.objects.first()
-    experiences = Experience.objects.all()
-    education = Education.objects.all()
-    skills = Skill.objects.all()
-    
-    context = {
-        'profile': profile,
-        'experiences': experiences,
-        'education': education,
-        'skills': skills,
-    }
+    context = cached('about', ('profile', 'experiences', 'education', 'skills'), lambda: {
+        'profile': get_profile(),
+        'experiences': list(Experience.objects.all()),
+        'education': list(Education.objects.all()),
+        'skills': list(Skill.objects.all()),
+    })
     return render(request, 'portfolio/about.html', context)
 
 
+@page_cache
+@conditional('projects', 'skills')
 def projects(request):
     """Projects page with all projects"""
-    all_projects = Project.objects.select_related().prefetch_related('technologies')
-    technologies = Skill.objects.all()
-    
     # Filter by technology if specified
     tech_filter = request.GET.get('tech')
-    if tech_filter:
-        all_projects = all_projects.filter(technologies__name__icontains=tech_filter)
-    
-    context = {
-        'projects': all_projects,
-        'technologies': technologies,
-        'current_filter': tech_filter,
-    }
+
+    def build_context():
+        all_projects = Project.objects.cards()
+        if tech_filter:
+            # Semi-join, so projects matching several skills are listed once
+            matching = Project.technologies.through.objects.filter(skill__name__icontains=tech_filter)
+            all_projects = all_projects.filter(pk__in=matching.values('project_id'))
+        return {
+            'projects': list(all_projects),
+            'technologies': list(Skill.objects.all()),
+        }
+
+    context = cached('projects', ('projects', 'skills'), build_context, tech_filter)
+    context = dict(context, current_filter=tech_filter)
     return render(request, 'portfolio/projects.html', context)
 
 
+@conditional('projects', 'skills')
+def _project_detail_page(request, project_id):
+    context = cached('project_detail', ('projects', 'skills'), lambda: {
+        'project': get_object_or_404(Project.objects.detail(), id=project_id),
+        'related_projects': list(Project.objects.cards().exclude(id=project_id)[:3]),
+    }, project_id)
+    return render(request, 'portfolio/project_detail.html', context)
+
+
+def count_project_view(request, project_id):
+    counters.increment(project_id, 'views')
+
+
+def project_detail_tags(request, project_id):
+    # Likes, bookmarks and ratings bump a per-project tag
+    return (engagement.project_tag(project_id),)
+
+
+@page_cache(on_hit=count_project_view, tags=project_detail_tags)
 def project_detail(request, project_id):
     """Individual project detail page"""
-    project = get_object_or_404(Project.objects.prefetch_related('technologies'), id=project_id)
-    related_projects = Project.objects.exclude(id=project_id)[:3]
-    
-    context = {
-        'project': project,
-        'related_projects': related_projects,
-    }
-    return render(request, 'portfolio/project_detail.html', context)
+    response = _project_detail_page(request, project_id)
+    # Revalidations (304) are views too
+    count_project_view(request, project_id)
+    return response
 
 
+def _project_counters_version(request, project_id):
+    # Likes/bookmarks bump a per-project tag; views are still pending in the cache
+    return get_tag_versions([engagement.project_tag(project_id)]), counters.pending([project_id])[project_id]
+
+
+@throttle('contact', methods=('POST',))
 def contact(request):
     """Contact page with contact form"""
-    profile = Profile.objects.first()
+    profile = get_profile()
     
     if request.method == 'POST':
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -116,25 +169,26 @@ def contact(request):
     return render(request, 'portfolio/contact.html', context)
 
 
+def save_contact(form, profile):
+    """Save the message and queue its notification email in one transaction"""
+    with transaction.atomic():
+        contact_message = form.save()
+        outbox.enqueue(
+            subject=f"Portfolio Contact: {form.cleaned_data['subject']}",
+            body=f"From: {form.cleaned_data['name']} ({form.cleaned_data['email']})\n\n{form.cleaned_data['message']}",
+            recipients=[profile.email if profile else 'your-email@example.com'],
+            reply_to=form.cleaned_data['email'],
+        )
+    return contact_message
+
+
 def handle_ajax_contact(request, profile):
     """Handle AJAX contact form submission"""
     try:
         form = ContactForm(request.POST)
         if form.is_valid():
-            # Save contact message
-            contact_message = form.save()
-            
-            # Send email notification (optional)
-            try:
-                send_mail(
-                    subject=f"Portfolio Contact: {form.cleaned_data['subject']}",
-                    message=f"From: {form.cleaned_data['name']} ({form.cleaned_data['email']})\n\n{form.cleaned_data['message']}",
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[profile.email if profile else 'your-email@example.com'],
-                    fail_silently=True,
-                )
-            except Exception as e:
-                print(f"Email sending failed: {e}")
+            # Save contact message; the email is sent by the send_outbox worker
+            save_contact(form, profile)
             
             return JsonResponse({
                 'success': True,
@@ -146,7 +200,8 @@ def handle_ajax_contact(request, profile):
                 'message': 'Please correct the errors below.',
                 'errors': form.errors
             })
-    except Exception as e:
+    except Exception:
+        logger.exception('Saving contact message failed')
         return JsonResponse({
             'success': False,
             'message': 'An error occurred while sending your message.'
@@ -157,20 +212,8 @@ def handle_regular_contact(request, profile):
     """Handle regular contact form submission"""
     form = ContactForm(request.POST)
     if form.is_valid():
-        # Save contact message
-        contact_message = form.save()
-        
-        # Send email notification (optional)
-        try:
-            send_mail(
-                subject=f"Portfolio Contact: {form.cleaned_data['subject']}",
-                message=f"From: {form.cleaned_data['name']} ({form.cleaned_data['email']})\n\n{form.cleaned_data['message']}",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[profile.email if profile else 'your-email@example.com'],
-                fail_silently=True,
-            )
-        except:
-            pass  # Email sending is optional
+        # Save contact message; the email is sent by the send_outbox worker
+        save_contact(form, profile)
         
         messages.success(request, 'Thank you for your message! I\'ll get back to you soon.')
         return redirect('contact')
@@ -184,45 +227,54 @@ def handle_regular_contact(request, profile):
 
 # API Views for AJAX functionality
 
+def invalid_fields_response(exc):
+    return JsonResponse({'success': False, 'message': str(exc)}, status=400)
+
+
+@throttle('api')
+@conditional('projects', 'skills')
 def projects_api(request):
-    """API endpoint for projects with filtering and pagination"""
+    """
+    API endpoint for projects with filtering and pagination.
+
+    Pass ``cursor`` (empty for the first page) to page by keyset instead of
+    page number; ``next_cursor`` in the response fetches the following page.
+    The total is only counted in cursor mode when ``count=1`` is given.
+    ``fields`` limits each project to the listed keys.
+    """
+    try:
+        serializer = ProjectCardSerializer(request.GET.get('fields'))
+    except InvalidFields as exc:
+        return invalid_fields_response(exc)
+    
     try:
         # Get filter parameters
         filter_param = request.GET.get('filter', 'all')
-        page = int(request.GET.get('page', 1))
-        per_page = 6
         
         # Filter projects
-        projects = Project.objects.select_related().prefetch_related('technologies')
+        projects = Project.objects.all()
         
         if filter_param != 'all':
-            projects = projects.filter(
-                Q(technologies__name__icontains=filter_param) |
-                Q(technologies__category__icontains=filter_param)
-            ).distinct()
+            # Semi-join through the M2M table so no DISTINCT is needed
+            matching = Project.technologies.through.objects.filter(
+                Q(skill__name__icontains=filter_param) |
+                Q(skill__category__icontains=filter_param)
+            ).values('project_id')
+            projects = projects.filter(pk__in=matching)
+        
+        if 'cursor' in request.GET:
+            return cursor_projects_response(request, projects, serializer)
+        
+        page = int(request.GET.get('page', 1))
+        per_page = 6
         
         # Paginate
-        paginator = Paginator(projects, per_page)
+        paginator = Paginator(serializer.values(projects), per_page)
         page_obj = paginator.get_page(page)
         
-        # Serialize projects
-        projects_data = []
-        for project in page_obj:
-            projects_data.append({
-                'id': project.id,
-                'title': project.title,
-                'short_description': project.short_description,
-                'image': project.image.url if project.image else None,
-                'github_url': project.github_url,
-                'live_url': project.live_url,
-                'technologies': [tech.name for tech in project.technologies.all()],
-                'featured': project.featured,
-                'created_date': project.created_date.strftime('%B %Y')
-            })
-        
         return JsonResponse({
             'success': True,
-            'projects': projects_data,
+            'projects': serializer.serialize(page_obj),
             'has_next': page_obj.has_next(),
             'has_previous': page_obj.has_previous(),
             'current_page': page,
@@ -236,26 +288,44 @@ def projects_api(request):
         })
 
 
+def cursor_projects_response(request, projects, serializer):
+    """Keyset-paginated variant of ``projects_api``"""
+    try:
+        limit = min(max(int(request.GET.get('limit', 6)), 1), MAX_PAGE_SIZE)
+        # The sort key columns are needed to encode the next cursor
+        rows, next_cursor = paginate_by_cursor(
+            serializer.values(projects, *(field.lstrip('-') for field in PROJECT_ORDERING)),
+            request.GET['cursor'], limit)
+    except (ValueError, InvalidCursor):
+        return JsonResponse({'success': False, 'message': 'Invalid cursor or limit.'}, status=400)
+    
+    data = {
+        'success': True,
+        'projects': serializer.serialize(rows),
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor,
+        'limit': limit,
+    }
+    if request.GET.get('count') in ('1', 'true'):
+        data['total'] = projects.count()
+    return JsonResponse(data)
+
+
+@throttle('api')
+@conditional('projects', 'skills', extra=_project_counters_version)
 def project_detail_api(request, project_id):
     """API endpoint for individual project details"""
     try:
-        project = get_object_or_404(Project.objects.prefetch_related('technologies'), id=project_id)
-        
-        project_data = {
-            'id': project.id,
-            'title': project.title,
-            'description': project.description,
-            'short_description': project.short_description,
-            'image': project.image.url if project.image else None,
-            'github_url': project.github_url,
-            'live_url': project.live_url,
-            'technologies': [tech.name for tech in project.technologies.all()],
-            'featured': project.featured,
-            'created_date': project.created_date.strftime('%B %d, %Y'),
-            'updated_date': project.updated_date.strftime('%B %d, %Y')
-        }
+        serializer = ProjectDetailSerializer(request.GET.get('fields'))
+    except InvalidFields as exc:
+        return invalid_fields_response(exc)
+    
+    try:
+        projects = serializer.serialize(serializer.values(Project.objects.filter(pk=project_id)))
+        if not projects:
+            return JsonResponse({'success': False, 'message': 'Project not found.'}, status=404)
         
-        return JsonResponse(project_data)
+        return JsonResponse(projects[0])
         
     except Exception as e:
         return JsonResponse({
@@ -264,23 +334,19 @@ def project_detail_api(request, project_id):
         })
 
 
+@throttle('api')
+@conditional('skills')
 def skills_api(request):
     """API endpoint for skills data (for charts/animations)"""
     try:
-        skills = Skill.objects.all()
-        skills_data = []
-        
-        for skill in skills:
-            skills_data.append({
-                'name': skill.name,
-                'proficiency': skill.proficiency,
-                'category': skill.category,
-                'icon': skill.icon,
-            })
-        
+        serializer = SkillSerializer(request.GET.get('fields'))
+    except InvalidFields as exc:
+        return invalid_fields_response(exc)
+    
+    try:
         return JsonResponse({
             'success': True,
-            'skills': skills_data
+            'skills': serializer.serialize(serializer.values(Skill.objects.all()))
         })
         
     except Exception as e:
@@ -290,44 +356,120 @@ def skills_api(request):
         })
 
 
+def _engagement_response(project_id, counter, created):
+    count = Project.objects.filter(pk=project_id).values_list(counter, flat=True).first()
+    return JsonResponse({'success': True, 'created': created, counter: count})
+
+
+@require_POST
+@throttle('engagement')
+def like_project(request, project_id):
+    """Like a project once per visitor IP"""
+    try:
+        created = engagement.like(project_id, get_client_ip(request))
+    except Project.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Project not found.'}, status=404)
+    return _engagement_response(project_id, 'likes', created)
+
+
+@require_POST
+@throttle('engagement')
+def bookmark_project(request, project_id):
+    """Bookmark a project for the current session"""
+    if not request.session.session_key:
+        request.session.save()
+    try:
+        created = engagement.bookmark(project_id, request.session.session_key)
+    except Project.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Project not found.'}, status=404)
+    return _engagement_response(project_id, 'bookmarks', created)
+
+
+@require_POST
+@throttle('engagement')
+def rate_project(request, project_id):
+    """Rate a project from 1 to 5; rating again replaces the previous score"""
+    try:
+        rating = int(request.POST.get('rating', ''))
+    except ValueError:
+        rating = 0
+    if not 1 <= rating <= 5:
+        return JsonResponse({'success': False, 'message': 'Rating must be between 1 and 5.'}, status=400)
+    try:
+        engagement.rate(project_id, get_client_ip(request), rating)
+    except Project.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Project not found.'}, status=404)
+    average, count = Project.objects.filter(pk=project_id).values_list('rating_avg', 'rating_count').first()
+    return JsonResponse({'success': True, 'rating': rating, 'rating_avg': round(average, 2), 'rating_count': count})
+
+
 def resume_download(request):
     """Handle resume download"""
     profile = Profile.objects.first()
     if profile and profile.resume:
-        # Redirect to the resume file
-        return redirect(profile.resume.url)
-    else:
-        messages.error(request, 'Resume not available.')
-        return redirect('about')
+        try:
+            path = profile.resume.path
+        except NotImplementedError:
+            # Remote storage serves the file itself
+            return redirect(profile.resume.url)
+        if os.path.isfile(path):
+            # Revalidated on every download, so a replaced resume shows up at once
+            return serve_file(request, path, as_attachment=True, cache_control='no-cache')
+    messages.error(request, 'Resume not available.')
+    return redirect('about')
+
+
+@require_http_methods(['GET', 'HEAD'])
+def serve_media(request, path):
+    """Uploaded files, in production too (see portfolio.media)"""
+    try:
+        file_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('No such file')
+    if not os.path.isfile(file_path):
+        raise Http404('No such file')
+    return serve_file(request, file_path, cache_control=f'public, max-age={settings.MEDIA_MAX_AGE}')
+
+
+@require_http_methods(['GET', 'HEAD'])
+def thumbnail(request, width, height, path):
+    """Thumbnail of a media image, built on first request (see portfolio.thumbnails)"""
+    if not thumbnails.authorized(path, width, height, request.GET.get('s')):
+        raise Http404('No such thumbnail')
+    # A second try covers the file being evicted between building and opening it
+    for attempt in range(2):
+        try:
+            file_path, content_type = thumbnails.get_thumbnail(path, width, height)
+            # The URL names the source and the size, so its content never changes
+            return serve_file(request, file_path, content_type,
+                              cache_control='public, max-age=31536000, immutable')
+        except thumbnails.InvalidThumbnail:
+            raise Http404('No such thumbnail')
+        except FileNotFoundError:
+            if attempt:
+                raise
 
 
 # Additional utility views
 
+@throttle('search')
+@conditional('projects', 'skills')
 def search_projects(request):
-    """Search projects by title, description, or technology"""
+    """Full-text search over projects, most relevant first"""
     query = request.GET.get('q', '')
     if not query:
         return JsonResponse({'projects': []})
     
     try:
-        projects = Project.objects.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(short_description__icontains=query) |
-            Q(technologies__name__icontains=query)
-        ).distinct()[:10]
-        
-        results = []
-        for project in projects:
-            results.append({
-                'id': project.id,
-                'title': project.title,
-                'short_description': project.short_description,
-                'url': f'/project/{project.id}/',
-                'image': project.image.url if project.image else None
-            })
+        serializer = ProjectSearchSerializer(request.GET.get('fields'))
+    except InvalidFields as exc:
+        return invalid_fields_response(exc)
+    
+    try:
+        ids = search_project_ids(query, limit=10)
+        rows = {row['id']: row for row in serializer.values(Project.objects.filter(pk__in=ids), 'id')}
         
-        return JsonResponse({'projects': results})
+        return JsonResponse({'projects': serializer.serialize(rows[pk] for pk in ids if pk in rows)})
         
     except Exception as e:
         return JsonResponse({
@@ -336,6 +478,17 @@ def search_projects(request):
         })
 
 
+@throttle('autocomplete')
+@conditional('projects', 'skills')
+def autocomplete(request):
+    """Typeahead suggestions for project titles and skills, served from memory"""
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    return JsonResponse({'suggestions': autocomplete_index.suggest(request.GET.get('q', ''), limit)})
+
+
 def contact_stats(request):
     """Get contact statistics for admin"""
     if not request.user.is_staff:
@@ -344,16 +497,8 @@ def contact_stats(request):
     try:
         total_messages = Contact.objects.count()
         unread_messages = Contact.objects.filter(is_read=False).count()
-        recent_messages = Contact.objects.order_by('-created_date')[:5]
-        
-        recent_data = []
-        for msg in recent_messages:
-            recent_data.append({
-                'name': msg.name,
-                'subject': msg.subject,
-                'created_date': msg.created_date.strftime('%Y-%m-%d %H:%M'),
-                'is_read': msg.is_read
-            })
+        serializer = ContactSummarySerializer()
+        recent_data = serializer.serialize(serializer.values(Contact.objects.order_by('-created_date'))[:5])
         
         return JsonResponse({
             'total_messages': total_messages,
@@ -367,25 +512,111 @@ def contact_stats(request):
         })
 
 
+def card_cache_stats(request):
+    """Hit and miss counts of the cached project cards, for monitoring"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    return JsonResponse({'cards': fragments.stats()})
+
+
+# Named URLs listed in the sitemap besides the project pages
+SITEMAP_PAGES = ('home', 'about', 'projects', 'contact')
+
+
+def sitemap_shard_size():
+    # The sitemap protocol caps a single file at 50,000 URLs
+    return getattr(settings, 'SITEMAP_SHARD_SIZE', 50000)
+
+
+def _sitemap_state(request):
+    """Project count, highest id and last edit, fetched once per request"""
+    if not hasattr(request, '_sitemap_state'):
+        request._sitemap_state = Project.objects.aggregate(
+            count=Count('id'), max_id=Max('id'), last_modified=Max('updated_date')
+        )
+    return request._sitemap_state
+
+
+def _sitemap_etag(request, shard=None):
+    state = _sitemap_state(request)
+    version = '{count}-{max_id}-{last_modified}'.format(**state)
+    return hashlib.md5(f'{version}-{shard}-{sitemap_shard_size()}'.encode()).hexdigest()
+
+
+def _sitemap_last_modified(request, shard=None):
+    return _sitemap_state(request)['last_modified']
+
+
+def _sitemap_shard_count(request):
+    """Number of project shards, each covering a contiguous block of ids"""
+    state = _sitemap_state(request)
+    if state['count'] + len(SITEMAP_PAGES) <= sitemap_shard_size():
+        return 0
+    return -(-state['max_id'] // sitemap_shard_size())
+
+
+def _page_entries(request):
+    for name in SITEMAP_PAGES:
+        yield '<url><loc>{}</loc></url>\n'.format(escape(request.build_absolute_uri(reverse(name))))
+
+
+def _project_entries(request, projects):
+    # Resolve the URL pattern once and splice ids in, instead of reverse() per row
+    prefix, _, suffix = escape(request.build_absolute_uri(reverse('project_detail', args=[0]))).rpartition('0')
+    rows = projects.order_by('id').values_list('id', 'updated_date').iterator(chunk_size=2000)
+    for pk, updated in rows:
+        yield '<url><loc>{}{}{}</loc><lastmod>{}</lastmod></url>\n'.format(
+            prefix, pk, suffix, updated.isoformat(timespec='seconds')
+        )
+
+
+def _urlset(*entries):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for chunk in entries:
+        yield from chunk
+    yield '</urlset>\n'
+
+
+def _sitemap_index(request, shards):
+    lastmod = _sitemap_state(request)['last_modified']
+    lastmod = '<lastmod>{}</lastmod>'.format(lastmod.isoformat(timespec='seconds')) if lastmod else ''
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for shard in range(shards + 1):
+        url = escape(request.build_absolute_uri(reverse('sitemap_shard', args=[shard])))
+        yield '<sitemap><loc>{}</loc>{}</sitemap>\n'.format(url, lastmod if shard else '')
+    yield '</sitemapindex>\n'
+
+
+@condition(etag_func=_sitemap_etag, last_modified_func=_sitemap_last_modified)
 def sitemap_xml(request):
-    """Generate a basic sitemap.xml"""
-    urls = [
-        request.build_absolute_uri(reverse('home')),
-        request.build_absolute_uri(reverse('about')),
-        request.build_absolute_uri(reverse('projects')),
-        request.build_absolute_uri(reverse('contact')),
-    ]
-    # Add project detail pages
-    for project in Project.objects.all():
-        urls.append(request.build_absolute_uri(reverse('project_detail', args=[project.id])))
-    xml_parts = [
-        '<?xml version="1.0" encoding="UTF-8"?>',
-        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
-    ]
-    for u in urls:
-        xml_parts.append('<url><loc>{}</loc></url>'.format(u))
-    xml_parts.append('</urlset>')
-    return HttpResponse('\n'.join(xml_parts), content_type='application/xml')
+    """
+    Stream sitemap.xml.
+
+    Small sites get a single urlset. Once the URLs no longer fit in one file,
+    this becomes a sitemap index pointing at sitemap-0.xml (static pages)
+    and sitemap-N.xml (projects by id block).
+    """
+    shards = _sitemap_shard_count(request)
+    if shards:
+        body = _sitemap_index(request, shards)
+    else:
+        body = _urlset(_page_entries(request), _project_entries(request, Project.objects.all()))
+    return StreamingHttpResponse(body, content_type='application/xml')
+
+
+@condition(etag_func=_sitemap_etag, last_modified_func=_sitemap_last_modified)
+def sitemap_shard(request, shard):
+    """One file of the sitemap index"""
+    shards = _sitemap_shard_count(request)
+    if shard > shards or not shards:
+        raise Http404('No such sitemap')
+    if shard == 0:
+        return StreamingHttpResponse(_urlset(_page_entries(request)), content_type='application/xml')
+    size = sitemap_shard_size()
+    projects = Project.objects.filter(id__gt=(shard - 1) * size, id__lte=shard * size)
+    return StreamingHttpResponse(_urlset(_project_entries(request, projects)), content_type='application/xml')
 
 
 def robots_txt(request):
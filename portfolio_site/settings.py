@@ -61,7 +61,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, made async-capable so ASGI requests stay on the event loop
+    'portfolio.middleware.WhiteNoiseMiddleware',
+    # Outside the session, CSRF and message middleware so it sees their cookies
+    'portfolio.pagecache.AnonymousPageCacheMiddleware',
     # 'csp.middleware.CSPMiddleware',  # enable if CSP configured
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,6 +72,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'portfolio.querybudget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'portfolio_site.urls'
@@ -190,12 +194,115 @@ LOGGING = {
     },
 }
 
-# Simple cache (in-memory by default)
+# Two-tier cache: a small LRU in each worker in front of a cache shared by all
+# workers (see portfolio.cache_backends). The shared tier is Redis when
+# REDIS_URL is set, otherwise DJANGO_CACHE_L2: 'db' (the default with
+# DATABASE_URL; build.sh creates the table), 'mmap' (workers of one host
+# sharing a memory-mapped file), 'file' or 'locmem' (one process only)
+if os.environ.get('REDIS_URL'):
+    CACHE_L2 = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+else:
+    CACHE_L2 = {
+        'db': {
+            'BACKEND': 'portfolio.cache_backends.DatabaseCache',
+            'LOCATION': 'portfolio_cache',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+        'mmap': {
+            'BACKEND': 'portfolio.cache_backends.MmapCache',
+            # Put it on a tmpfs such as /dev/shm to keep it off the disk
+            'LOCATION': os.environ.get('CACHE_MMAP_PATH', str(BASE_DIR / 'cache.mmap')),
+            # Bounded to MAX_ENTRIES x SLOT_SIZE bytes (128 MB by default)
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get('CACHE_MMAP_ENTRIES', 8192)),
+                'SLOT_SIZE': int(os.environ.get('CACHE_MMAP_SLOT_SIZE', 16 * 1024)),
+            },
+        },
+        'file': {
+            'BACKEND': 'portfolio.cache_backends.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+        'locmem': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'portfolio-cache',
+        },
+    }[os.environ.get('DJANGO_CACHE_L2', 'db' if os.environ.get('DATABASE_URL') else 'locmem')]
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'portfolio-cache'
-    }
+        'BACKEND': 'portfolio.cache_backends.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': int(os.environ.get('CACHE_L1_MAX_ENTRIES', 1000)),
+            # Longest a value read from the shared tier is reused without asking it
+            'L1_TIMEOUT': int(os.environ.get('CACHE_L1_TIMEOUT', 10)),
+            # Seconds another worker's write may go unnoticed
+            'STAMP_INTERVAL': float(os.environ.get('CACHE_STAMP_INTERVAL', 1)),
+            # Counters, throttles and locks change on every request: L2 only
+            'L1_BYPASS': ('portfolio:counter:', 'portfolio:throttle:', 'portfolio:cardstats:', 'portfolio:lock:'),
+        },
+    },
+    'shared': CACHE_L2,
+}
+
+# Generate responsive image variants while saving an upload; turn off when
+# `generate_image_variants --interval N` runs as a background worker
+IMAGE_VARIANTS_ON_SAVE = os.environ.get('IMAGE_VARIANTS_ON_SAVE', 'True').lower() == 'true'
+
+# Buffered Project.views/likes/bookmarks are written to the database at most
+# this often (seconds) from web workers; see portfolio.counters
+COUNTER_FLUSH_INTERVAL = int(os.environ.get('COUNTER_FLUSH_INTERVAL', 30))
+
+# Seconds anonymous pages stay in the full-page cache (0 disables it); admin
+# edits purge the affected pages right away
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 60 * 10))
+
+# On-demand thumbnails (/media/thumb/<w>x<h>/<path>): derivatives are kept in
+# a disk cache trimmed least recently used first once it outgrows the limit
+THUMBNAIL_CACHE_DIR = Path(os.environ.get('THUMBNAIL_CACHE_DIR', BASE_DIR / 'thumbnail_cache'))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get('THUMBNAIL_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+THUMBNAIL_MAX_SIZE = 2000
+# URLs from {% thumbnail_url %} are signed; sizes listed here, as (width, height)
+# pairs, are also served unsigned
+THUMBNAIL_SIZES = None
+
+# Browser cache lifetime of uploaded media; uploads get fresh names, and
+# revalidation by ETag is cheap
+MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', 60 * 60 * 24))
+# Let the reverse proxy send media files: 'X-Accel-Redirect' (nginx, with an
+# internal location per directory below) or 'X-Sendfile' (Apache, lighttpd)
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+MEDIA_ACCEL_LOCATIONS = {
+    MEDIA_ROOT: os.environ.get('MEDIA_ACCEL_MEDIA_LOCATION', '/internal/media/'),
+    THUMBNAIL_CACHE_DIR: os.environ.get('MEDIA_ACCEL_THUMBNAIL_LOCATION', '/internal/thumbnails/'),
+}
+
+# Route the read-only JSON APIs to the async views in portfolio.api_views; only
+# worth it when serving through ASGI (see DEPLOYMENT.md)
+ASYNC_API = os.environ.get('ASYNC_API', 'False').lower() == 'true'
+
+# N+1 detection (portfolio.querybudget): warn when one query shape repeats this
+# often in a request or a view exceeds its budget in portfolio/urls.py; strict
+# mode raises instead and is meant for tests
+QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 3))
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False').lower() == 'true'
+
+# Reverse proxies in front of the app whose X-Forwarded-For entries are trusted
+# (Render's load balancer is one); the client address is read from there
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 1 if os.environ.get('RENDER') else 0))
+
+# Per-IP request budgets ('<count>/<s|m|h|d>') enforced by portfolio.throttling;
+# set a scope to None to disable it
+THROTTLE_RATES = {
+    'contact': os.environ.get('THROTTLE_CONTACT', '5/m'),
+    'search': os.environ.get('THROTTLE_SEARCH', '60/m'),
+    'autocomplete': os.environ.get('THROTTLE_AUTOCOMPLETE', '300/m'),
+    'api': os.environ.get('THROTTLE_API', '120/m'),
+    'engagement': os.environ.get('THROTTLE_ENGAGEMENT', '30/m'),
 }
 
 # Static file cache headers suggestion for production (handled at web server / CDN)
@@ -25,6 +25,6 @@ urlpatterns = [
 ]
 
 # Serve media files during development
+# Media is served by portfolio.views.serve_media, in production too
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -282,14 +282,17 @@ document.addEventListener('DOMContentLoaded', function() {
             loading = true;
             this.querySelector('.default-text').classList.add('d-none');
             this.querySelector('.loading-text').classList.remove('d-none');
-            const nextPage = parseInt(projectsGrid.dataset.currentPage,10) + 1;
-            fetch(`/api/projects/?page=${nextPage}`)
+            // Keyset pagination: continue after the last card, no page count needed
+            const cursor = projectsGrid.dataset.nextCursor || '';
+            // Only the keys a card renders
+            const fields = 'id,title,short_description,image,live_url,technologies,created_date';
+            fetch(`/api/projects/?cursor=${encodeURIComponent(cursor)}&limit=3&fields=${fields}`)
                 .then(r => r.json())
                 .then(data => {
                     if (data.success) {
-                        projectsGrid.dataset.currentPage = nextPage;
+                        projectsGrid.dataset.nextCursor = data.next_cursor || '';
                         const frag = document.createDocumentFragment();
-                        data.projects.slice(0,3).forEach(p => {
+                        data.projects.forEach(p => {
                             const col = document.createElement('div');
                             col.className = 'col-lg-4 col-md-6 mb-4 project-item';
                             col.innerHTML = `